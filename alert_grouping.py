@@ -0,0 +1,201 @@
+import os
+import time
+import logging
+import threading
+from collections import Counter
+from clusters import split_alert_key
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+ALERT_GROUP_BY = [label.strip() for label in os.environ.get('ALERT_GROUP_BY', 'cluster,namespace,reason').split(',') if label.strip()]
+ALERT_GROUP_WAIT = float(os.environ.get('ALERT_GROUP_WAIT', '0'))  # seconds to collect a new group, 0 sends its first alert right away
+ALERT_GROUP_INTERVAL = float(os.environ.get('ALERT_GROUP_INTERVAL', '300'))  # seconds between digests of the same group, 0 disables grouping
+ALERT_DIGEST_TOP = int(os.environ.get('ALERT_DIGEST_TOP', '10'))  # offenders listed in a digest
+
+GROUP_LABELS = ('cluster', 'resource_type', 'namespace', 'node', 'owner', 'reason')
+
+
+class AlertNotification:
+    """An alert email waiting to be grouped, with the labels it can be grouped by"""
+    __slots__ = ('alert_key', 'subject', 'message', 'labels', 'resource')
+
+    def __init__(self, alert_key, subject, message, labels, resource):
+        self.alert_key = alert_key
+        self.subject = subject
+        self.message = message
+        self.labels = labels
+        self.resource = resource
+
+    @classmethod
+    def from_alert_key(cls, alert_key, subject, message, node=None, owner=None):
+        """Derive the grouping labels from an alert key like [{cluster}|]pod:{ns}/{name}:{container}:{reason}"""
+        cluster, key = split_alert_key(alert_key)
+        parts = key.split(':')
+        resource_type = parts[0]
+        resource = parts[1] if len(parts) > 1 else alert_key
+        namespace = resource.split('/', 1)[0] if '/' in resource else None
+        reason = parts[-1] if len(parts) > 2 else 'Unknown'
+
+        labels = {
+            'cluster': cluster,
+            'resource_type': resource_type,
+            'namespace': namespace,
+            'node': node if node else (resource if resource_type == 'node' else None),
+            'owner': owner,
+            'reason': reason
+        }
+        return cls(alert_key, subject, message, labels, f"{cluster}/{resource}" if cluster else resource)
+
+
+class AlertGroup:
+    """Alerts sharing the same group labels"""
+
+    def __init__(self, labels, now, group_wait):
+        self.labels = labels
+        self.alerts = []
+        self.next_flush = now + group_wait
+        self.last_flush = None
+
+    def describe(self):
+        return ' '.join(f"{name}={value}" for name, value in self.labels.items() if value) or 'all alerts'
+
+
+class AlertGrouper:
+    """Alertmanager style grouping between alert detection and email delivery
+
+    The first alert of a group waits group_wait seconds for more alerts with
+    the same labels; the group is then sent as one email. With a group_wait
+    of 0 the first alert is sent right away. Alerts arriving for a group
+    that was already sent wait until group_interval has passed since the
+    last email. A group with a single alert is sent unchanged, larger
+    groups become a digest with counts and the top offenders.
+    """
+
+    def __init__(self, deliver, group_by=ALERT_GROUP_BY, group_wait=ALERT_GROUP_WAIT,
+                 group_interval=ALERT_GROUP_INTERVAL, top=ALERT_DIGEST_TOP):
+        self.deliver = deliver
+        self.group_by = [label for label in group_by if label in GROUP_LABELS]
+        self.group_wait = group_wait
+        self.group_interval = group_interval
+        self.top = top
+        self._groups = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self.digests_sent = 0
+        self.alerts_grouped = 0
+
+    def start(self):
+        if self._thread or self.group_interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, name="alert-grouper", daemon=True)
+        self._thread.start()
+        logger.info(f"Grouping alerts by {', '.join(self.group_by) or 'nothing'} "
+                    f"(wait {self.group_wait:.0f}s, interval {self.group_interval:.0f}s)")
+
+    def submit(self, notification):
+        """Add an alert to its group, or deliver it directly when grouping is disabled"""
+        if self.group_interval <= 0:
+            return self.deliver(notification.subject, notification.message)
+
+        group_labels = {name: notification.labels.get(name) for name in self.group_by}
+        group_key = tuple(group_labels.values())
+        now = time.monotonic()
+        with self._condition:
+            group = self._groups.get(group_key)
+            send_now = group is None and self.group_wait <= 0
+            if group is None:
+                group = AlertGroup(group_labels, now, self.group_wait)
+                self._groups[group_key] = group
+            elif not group.alerts:
+                # Already notified recently, wait for the group interval
+                group.next_flush = max(now, group.last_flush + self.group_interval)
+            if send_now:
+                # Nothing to wait for, the first alert goes out now and starts the group interval
+                group.last_flush = now
+            else:
+                group.alerts.append(notification)
+                self.alerts_grouped += 1
+                self._condition.notify()
+        if send_now:
+            return self.deliver(notification.subject, notification.message)
+        return True
+
+    def flush(self, force=False):
+        """Send every group that is due (or every non-empty group when force is set)"""
+        now = time.monotonic()
+        due = []
+        with self._condition:
+            for group_key, group in list(self._groups.items()):
+                if group.alerts and (force or group.next_flush <= now):
+                    due.append((group, group.alerts))
+                    group.alerts = []
+                    group.last_flush = now
+                elif not group.alerts and group.last_flush is not None and now - group.last_flush > self.group_interval:
+                    # Quiet for a whole interval, the next alert starts a new group
+                    del self._groups[group_key]
+
+        for group, alerts in due:
+            try:
+                self._send(group, alerts)
+            except Exception as e:
+                logger.error(f"Failed to send alert group {group.describe()}: {e}")
+
+    def _send(self, group, alerts):
+        if len(alerts) == 1:
+            self.deliver(alerts[0].subject, alerts[0].message)
+            return
+
+        subject, body = self.render_digest(group, alerts)
+        self.deliver(subject, body)
+        self.digests_sent += 1
+        logger.info(f"Sent digest of {len(alerts)} alerts for {group.describe()}")
+
+    def render_digest(self, group, alerts):
+        """Return (subject, body) of a digest email for a group of alerts"""
+        reasons = Counter(alert.labels['reason'] for alert in alerts)
+        clusters = Counter(alert.labels['cluster'] for alert in alerts if alert.labels['cluster'])
+        namespaces = Counter(alert.labels['namespace'] for alert in alerts if alert.labels['namespace'])
+        nodes = Counter(alert.labels['node'] for alert in alerts if alert.labels['node'])
+        offenders = Counter(alert.resource for alert in alerts)
+
+        subject = f"{len(alerts)} alerts for {group.describe()}"
+
+        lines = [f"Kubernetes Alert Digest: {len(alerts)} alerts for {group.describe()}", ""]
+        lines.append("By reason:")
+        lines.extend(f"  {reason}: {count}" for reason, count in reasons.most_common())
+        if len(clusters) > 1:
+            lines.append("")
+            lines.append("By cluster:")
+            lines.extend(f"  {cluster}: {count}" for cluster, count in clusters.most_common(self.top))
+        if namespaces:
+            lines.append("")
+            lines.append("By namespace:")
+            lines.extend(f"  {namespace}: {count}" for namespace, count in namespaces.most_common(self.top))
+        if nodes:
+            lines.append("")
+            lines.append("By node:")
+            lines.extend(f"  {node}: {count}" for node, count in nodes.most_common(self.top))
+        lines.append("")
+        lines.append(f"Top {min(self.top, len(offenders))} of {len(offenders)} affected resources:")
+        lines.extend(f"  {resource}: {count} alerts" for resource, count in offenders.most_common(self.top))
+        lines.append("")
+        lines.append("Alerts:")
+        lines.extend(f"  {alert.subject}" for alert in alerts[:self.top])
+        if len(alerts) > self.top:
+            lines.append(f"  ... and {len(alerts) - self.top} more")
+        return subject, "\n".join(lines)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                pending = [group.next_flush for group in self._groups.values() if group.alerts]
+                if pending:
+                    timeout = max(0.0, min(pending) - time.monotonic())
+                else:
+                    timeout = self.group_interval
+                self._condition.wait(timeout)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing alert groups: {e}")
@@ -0,0 +1,150 @@
+import os
+import json
+import base64
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import and_, or_
+from models import Alert
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+ALERTS_PAGE_SIZE = int(os.environ.get('ALERTS_PAGE_SIZE', '100'))  # default page size of /api/alerts
+ALERTS_MAX_PAGE_SIZE = int(os.environ.get('ALERTS_MAX_PAGE_SIZE', '1000'))
+
+# Rows fetched from the database per round trip while a page is streamed
+STREAM_BATCH_SIZE = 200
+
+
+class AlertQueryError(ValueError):
+    """Invalid /api/alerts parameters"""
+
+
+def encode_cursor(alert):
+    """Opaque cursor pointing just after an alert in (created_at, id) descending order"""
+    raw = json.dumps([alert.created_at.isoformat(), alert.id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, alert_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(alert_id)
+    except Exception:
+        raise AlertQueryError("Invalid cursor")
+
+
+def parse_time(value, name):
+    """Parse an ISO 8601 time parameter into the naive UTC datetimes the database stores"""
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise AlertQueryError(f"Invalid {name}, expected an ISO 8601 time")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class AlertFilters:
+    """Filters and page position of an /api/alerts request"""
+
+    def __init__(self, status='active', namespace=None, resource_type=None, created_after=None,
+                 created_before=None, search=None, cursor=None, limit=ALERTS_PAGE_SIZE, cluster=None):
+        if status not in ('active', 'resolved', 'all'):
+            raise AlertQueryError("status must be active, resolved or all")
+        self.status = status
+        self.namespace = namespace or None
+        self.resource_type = resource_type or None
+        self.cluster = cluster or None
+        self.created_after = created_after
+        self.created_before = created_before
+        self.search = search.strip() if search and search.strip() else None
+        self.cursor = cursor or None
+        self.position = decode_cursor(cursor) if cursor else None
+        self.limit = limit
+
+    @classmethod
+    def from_args(cls, args):
+        """Build the filters from request query parameters"""
+        try:
+            limit = int(args.get('limit', ALERTS_PAGE_SIZE))
+        except ValueError:
+            raise AlertQueryError("limit must be an integer")
+        if limit < 1:
+            raise AlertQueryError("limit must be positive")
+
+        created_after = args.get('created_after')
+        created_before = args.get('created_before')
+        return cls(
+            status=args.get('status', 'active'),
+            namespace=args.get('namespace'),
+            resource_type=args.get('resource_type'),
+            created_after=parse_time(created_after, 'created_after') if created_after else None,
+            created_before=parse_time(created_before, 'created_before') if created_before else None,
+            search=args.get('q'),
+            cursor=args.get('cursor'),
+            limit=min(limit, ALERTS_MAX_PAGE_SIZE),
+            cluster=args.get('cluster')
+        )
+
+    def cache_key(self):
+        return (self.status, self.namespace, self.resource_type, self.created_after,
+                self.created_before, self.search, self.cursor, self.limit, self.cluster)
+
+    def query(self):
+        """Alerts matching the filters after the cursor, newest first"""
+        query = Alert.query
+        if self.status == 'active':
+            query = query.filter(Alert.is_resolved == 0)
+        elif self.status == 'resolved':
+            query = query.filter(Alert.is_resolved == 1)
+        if self.namespace:
+            query = query.filter(Alert.resource_namespace == self.namespace)
+        if self.resource_type:
+            query = query.filter(Alert.resource_type == self.resource_type)
+        if self.cluster:
+            query = query.filter(Alert.cluster == self.cluster)
+        if self.created_after:
+            query = query.filter(Alert.created_at >= self.created_after)
+        if self.created_before:
+            query = query.filter(Alert.created_at < self.created_before)
+        if self.search:
+            # Served by the pg_trgm indexes on PostgreSQL, see migrations.py
+            escaped = self.search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            pattern = f"%{escaped}%"
+            query = query.filter(or_(
+                Alert.resource_name.ilike(pattern, escape='\\'),
+                Alert.message.ilike(pattern, escape='\\')
+            ))
+        if self.position:
+            created_at, alert_id = self.position
+            query = query.filter(or_(
+                Alert.created_at < created_at,
+                and_(Alert.created_at == created_at, Alert.id < alert_id)
+            ))
+        return query.order_by(Alert.created_at.desc(), Alert.id.desc())
+
+
+def iter_alerts_page(filters):
+    """Yield the JSON response of one page of alerts in chunks
+
+    Rows are fetched in batches of STREAM_BATCH_SIZE and encoded one by
+    one, so only a batch of Alert objects is in memory at any time. One
+    row more than the page size is read to know whether a next page exists.
+    """
+    yield b'{"alerts":['
+    last = None
+    count = 0
+    has_more = False
+    for alert in filters.query().limit(filters.limit + 1).yield_per(STREAM_BATCH_SIZE):
+        if count == filters.limit:
+            has_more = True
+            break
+        prefix = b',' if count else b''
+        yield prefix + json.dumps(alert.to_dict(), separators=(',', ':')).encode('utf-8')
+        last = alert
+        count += 1
+
+    next_cursor = encode_cursor(last) if has_more else None
+    yield b'],"next_cursor":' + json.dumps(next_cursor).encode('utf-8') + b'}'
@@ -0,0 +1,314 @@
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from sqlalchemy import and_, or_, insert, update, select, bindparam
+from sqlalchemy.sql import func
+from models import db, Alert, AlertRevision, app, send_resolution_notification
+
+logger = logging.getLogger(__name__)
+
+# Resources per SELECT when looking up the alerts to resolve
+RESOLVE_BATCH_SIZE = 200
+
+
+class AlertRevisionTracker:
+    """Tells alert changes made by other processes from this process's own
+
+    Every transaction that changes alerts bumps the single alert_revisions
+    row with bump() and reports the committed revision with committed().
+    changed_elsewhere() reads the row, a primary key lookup, and is True
+    when a revision since its last call was not made by this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._own = set()  # committed revisions of this process not seen by changed_elsewhere() yet
+        self._seen = None
+
+    def bump(self):
+        """Increment the revision in the session's transaction and return it, the row stays locked until commit"""
+        db.session.execute(
+            update(AlertRevision).where(AlertRevision.id == 1).values(revision=AlertRevision.revision + 1),
+            execution_options={'synchronize_session': False}
+        )
+        return db.session.execute(select(AlertRevision.revision).where(AlertRevision.id == 1)).scalar_one()
+
+    def committed(self, revision):
+        with self._lock:
+            self._own.add(revision)
+
+    def changed_elsewhere(self):
+        with app.app_context():
+            revision = db.session.execute(select(AlertRevision.revision).where(AlertRevision.id == 1)).scalar()
+        if revision is None:
+            return False
+
+        with self._lock:
+            seen, self._seen = self._seen, revision
+            own = self._own
+            self._own = {own_revision for own_revision in own if own_revision > revision}
+        if seen is None:
+            # Changes between the first load and the first call are unknown
+            return True
+        return any(other not in own for other in range(seen + 1, revision + 1))
+
+
+# Shared by every writer of alerts in this process
+alert_revisions = AlertRevisionTracker()
+
+
+class ActiveAlertIndex:
+    """In-memory index of the active alerts in the database
+
+    With a single replica alerts only change through the monitor's flushes
+    and the resolve/delete API of this process, so after one load at
+    startup the index answers "is this alert already active?" and "which
+    alerts does this resource have?" without querying the database. With
+    several replicas the API of another one can change them too, the
+    index is then reloaded when alert_revisions.changed_elsewhere(). Entries are keyed by id and
+    indexed by alert_key and by (resource_type, cluster, namespace, name).
+    One index is shared by the monitors of all clusters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id = {}  # id -> (alert_key, (resource_type, cluster, namespace, name))
+        self._by_key = {}  # alert_key -> set of ids
+        self._by_resource = {}  # (resource_type, cluster, namespace, name) -> set of ids
+        self.loaded = False
+
+    def __len__(self):
+        with self._lock:
+            return len(self._by_id)
+
+    def load(self):
+        """Replace the index with the active alerts currently in the database"""
+        with app.app_context():
+            rows = Alert.query.with_entities(
+                Alert.id, Alert.alert_key, Alert.resource_type, Alert.resource_namespace, Alert.resource_name,
+                Alert.cluster
+            ).filter(Alert.is_resolved == 0).all()
+
+        with self._lock:
+            self._by_id = {}
+            self._by_key = {}
+            self._by_resource = {}
+            for alert_id, alert_key, resource_type, namespace, name, cluster in rows:
+                self._add(alert_id, alert_key, resource_type, name, namespace, cluster)
+            self.loaded = True
+        logger.info(f"Loaded {len(rows)} active alerts into the alert index")
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def add(self, alert_id, alert_key, resource_type, resource_name, namespace=None, cluster=None):
+        with self._lock:
+            self._add(alert_id, alert_key, resource_type, resource_name, namespace, cluster)
+
+    def _add(self, alert_id, alert_key, resource_type, resource_name, namespace, cluster):
+        resource = (resource_type, cluster, namespace, resource_name)
+        self._by_id[alert_id] = (alert_key, resource)
+        self._by_key.setdefault(alert_key, set()).add(alert_id)
+        self._by_resource.setdefault(resource, set()).add(alert_id)
+
+    def discard(self, alert_id):
+        """Remove a resolved or deleted alert"""
+        with self._lock:
+            entry = self._by_id.pop(alert_id, None)
+            if entry is None:
+                return
+            alert_key, resource = entry
+            for index, index_key in ((self._by_key, alert_key), (self._by_resource, resource)):
+                ids = index.get(index_key)
+                if ids is not None:
+                    ids.discard(alert_id)
+                    if not ids:
+                        del index[index_key]
+
+    def has_key(self, alert_key):
+        with self._lock:
+            return alert_key in self._by_key
+
+    def ids_for_resource(self, resource_type, resource_name, namespace=None, cluster=None):
+        """Ids of the active alerts of a resource (nodes have no namespace)"""
+        with self._lock:
+            return set(self._by_resource.get((resource_type, cluster, namespace, resource_name), ()))
+
+
+class AlertUnitOfWork:
+    """Collects one monitor cycle's alert writes and flushes them in one transaction
+
+    New alerts, resolutions (by resource) and message updates are only
+    recorded while the cycle runs. flush() turns them into a single SELECT
+    per batch of resolved resources, one bulk UPDATE for the resolutions,
+    one executemany UPDATE for messages and one bulk INSERT, all committed
+    together.
+
+    With an ActiveAlertIndex the alerts to resolve are looked up in the
+    index, and the index is updated once the flush is committed.
+    """
+
+    def __init__(self, index=None):
+        self.index = index
+        self.inserts = {}  # alert_key -> row values
+        self.resolved_resources = set()  # (resource_type, resource_name, namespace, cluster)
+        self.message_updates = {}  # alert_key -> message
+        self.db_seconds = 0.0  # time spent on database reads and the flush
+
+    def __bool__(self):
+        return bool(self.inserts or self.resolved_resources or self.message_updates)
+
+    def add_alert(self, alert_key, resource_type, resource_name, namespace, status, message, cluster=None):
+        """Record a new active alert"""
+        self.inserts[alert_key] = {
+            'alert_key': alert_key,
+            'resource_type': resource_type,
+            'resource_name': resource_name,
+            'resource_namespace': namespace,
+            'cluster': cluster,
+            'status': status,
+            'message': message,
+            'is_resolved': 0,
+            'resolved_at': None
+        }
+
+    def has_pending_alert(self, alert_key):
+        """Check whether an active alert with this key was added in this cycle"""
+        row = self.inserts.get(alert_key)
+        return row is not None and row['is_resolved'] == 0
+
+    def resolve_resource(self, resource_type, resource_name, namespace=None, cluster=None):
+        """Record that all active alerts of a resource are resolved"""
+        self.resolved_resources.add((resource_type, resource_name, namespace, cluster))
+
+        # Alerts added earlier in this cycle are resolved too, as if they had been written already
+        for row in self.inserts.values():
+            if (row['is_resolved'] == 0 and row['resource_type'] == resource_type
+                    and row['resource_name'] == resource_name and row['cluster'] == cluster
+                    and (namespace is None or row['resource_namespace'] == namespace)):
+                row['is_resolved'] = 1
+                # A bulk INSERT needs the same value type in every row, so use a naive UTC
+                # datetime like the CURRENT_TIMESTAMP the database would have stored
+                row['resolved_at'] = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def update_message(self, alert_key, message):
+        """Record a new message for the active alert with this key"""
+        row = self.inserts.get(alert_key)
+        if row is not None and row['is_resolved'] == 0:
+            row['message'] = message
+        else:
+            self.message_updates[alert_key] = message
+
+    def timed_query(self, query_func):
+        """Run a read query inside the app context, accounting its time to this cycle"""
+        started = time.perf_counter()
+        try:
+            with app.app_context():
+                return query_func()
+        finally:
+            self.db_seconds += time.perf_counter() - started
+
+    def flush(self):
+        """Write everything recorded in a single transaction, return the number of rows written"""
+        if not self:
+            return 0
+
+        started = time.perf_counter()
+        notices = []
+        resolved_count = 0
+        with app.app_context():
+            try:
+                resolved_ids, notices = self._load_alerts_to_resolve()
+                if resolved_ids:
+                    db.session.execute(
+                        update(Alert)
+                        .where(Alert.id.in_(resolved_ids))
+                        .values(is_resolved=1, resolved_at=func.now()),
+                        execution_options={'synchronize_session': False}
+                    )
+                    resolved_count = len(resolved_ids)
+
+                if self.message_updates:
+                    table = Alert.__table__
+                    db.session.execute(
+                        table.update()
+                        .where(table.c.alert_key == bindparam('b_alert_key'), table.c.is_resolved == 0)
+                        .values(message=bindparam('b_message')),
+                        [{'b_alert_key': key, 'b_message': message} for key, message in self.message_updates.items()]
+                    )
+
+                inserted = []
+                if self.inserts:
+                    result = db.session.execute(
+                        insert(Alert).returning(Alert.id, Alert.alert_key, sort_by_parameter_order=True),
+                        list(self.inserts.values())
+                    )
+                    inserted = result.all()
+
+                revision = alert_revisions.bump()
+                db.session.commit()
+                alert_revisions.committed(revision)
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                self.db_seconds += time.perf_counter() - started
+
+        written = len(self.inserts) + resolved_count + len(self.message_updates)
+        logger.info(f"Flushed {len(self.inserts)} new, {resolved_count} resolved "
+                    f"and {len(self.message_updates)} updated alerts in {self.db_seconds * 1000:.0f} ms")
+
+        if self.index is not None:
+            for alert_id in resolved_ids:
+                self.index.discard(alert_id)
+            for alert_id, alert_key in inserted:
+                row = self.inserts[alert_key]
+                if row['is_resolved'] == 0:
+                    self.index.add(alert_id, alert_key, row['resource_type'],
+                                   row['resource_name'], row['resource_namespace'], row['cluster'])
+
+        # Notifications go out only after the resolutions are committed
+        for alert_key, subject, message in notices:
+            send_resolution_notification(alert_key, subject, message)
+
+        self.inserts = {}
+        self.resolved_resources = set()
+        self.message_updates = {}
+        return written
+
+    def _load_alerts_to_resolve(self):
+        """Return (ids, notification notices) of the active alerts of the resolved resources"""
+        ids = []
+        notices = []
+        if self.index is not None and self.index.loaded:
+            # Only the rows the index knows about are read, for their notification emails
+            known_ids = set()
+            for resource_type, resource_name, namespace, cluster in self.resolved_resources:
+                known_ids.update(self.index.ids_for_resource(resource_type, resource_name, namespace, cluster))
+            known_ids = sorted(known_ids)
+            for i in range(0, len(known_ids), RESOLVE_BATCH_SIZE):
+                for alert in Alert.query.filter(Alert.id.in_(known_ids[i:i + RESOLVE_BATCH_SIZE]),
+                                                Alert.is_resolved == 0).all():
+                    ids.append(alert.id)
+                    notices.append((alert.alert_key, *alert.resolution_notice()))
+            # Rows that are no longer active were changed outside this process
+            for alert_id in set(known_ids).difference(ids):
+                self.index.discard(alert_id)
+            return ids, notices
+
+        resources = list(self.resolved_resources)
+        for i in range(0, len(resources), RESOLVE_BATCH_SIZE):
+            conditions = []
+            for resource_type, resource_name, namespace, cluster in resources[i:i + RESOLVE_BATCH_SIZE]:
+                condition = and_(Alert.resource_type == resource_type, Alert.resource_name == resource_name,
+                                 Alert.cluster == cluster if cluster else Alert.cluster.is_(None))
+                if namespace:
+                    condition = and_(condition, Alert.resource_namespace == namespace)
+                conditions.append(condition)
+
+            for alert in Alert.query.filter(Alert.is_resolved == 0, or_(*conditions)).all():
+                ids.append(alert.id)
+                notices.append((alert.alert_key, *alert.resolution_notice()))
+        return ids, notices
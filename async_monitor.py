@@ -0,0 +1,309 @@
+import os
+import ssl
+import time
+import asyncio
+import logging
+from collections import deque
+from urllib.parse import quote
+from kubernetes.client.rest import ApiException
+from k8s_raw import loads, to_model
+from profiling import TRACER
+
+logger = logging.getLogger(__name__)
+
+# aiohttp lets the event loop do the API requests itself; without it pages are fetched in worker threads
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+# Configuration
+ASYNC_HTTP = os.environ.get('ASYNC_HTTP', 'auto')  # 'aiohttp', 'threads' or 'auto' (aiohttp when installed)
+ASYNC_PREFETCH_PAGES = int(os.environ.get('ASYNC_PREFETCH_PAGES', '2'))  # pages fetched ahead of the evaluation
+
+_END = object()
+
+
+class _FetchFailed:
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+
+async def thread_pages(pages):
+    """Async iterator over a blocking page generator of ResourceFetcher, each page fetched in a worker thread"""
+    while True:
+        page = await asyncio.to_thread(next, pages, _END)
+        if page is _END:
+            return
+        yield page
+
+
+class PageBridge:
+    """Hands the pages fetched on the event loop to the evaluation running in a worker thread
+
+    At most prefetch pages wait in the queue, so fetching runs ahead of the
+    evaluation without holding the whole list. convert runs on each page in
+    the worker thread, keeping model deserialization off the loop. The time
+    the evaluation waited for pages is reported in wait_seconds, apart from
+    the time the requests took.
+    """
+
+    def __init__(self, loop, pages, wait_seconds, resource, convert=None, prefetch=ASYNC_PREFETCH_PAGES):
+        self.loop = loop
+        self.pages = pages
+        self.wait_seconds = wait_seconds
+        self.wait_seconds[resource] = 0.0
+        self.resource = resource
+        self.convert = convert
+        self.queue = asyncio.Queue(maxsize=max(1, prefetch))
+        self.waited = 0.0
+
+    async def produce(self):
+        """Fetch every page into the queue, ending with an end marker or the error that stopped the list"""
+        try:
+            async for page in self.pages:
+                await self.queue.put(page)
+        except Exception as e:
+            await self.queue.put(_FetchFailed(e))
+            return
+        await self.queue.put(_END)
+
+    def fetch(self):
+        """The fetch of monitor_nodes/monitor_pods: wait for the first page, so a failed list fails here"""
+        return self._items(self._next_page())
+
+    def _next_page(self):
+        started = time.perf_counter()
+        page = asyncio.run_coroutine_threadsafe(self.queue.get(), self.loop).result()
+        self.waited += time.perf_counter() - started
+        self.wait_seconds[self.resource] = self.waited
+        if isinstance(page, _FetchFailed):
+            raise page.error
+        if page is not _END and self.convert is not None:
+            page = self.convert(page)
+        return page
+
+    def _items(self, page):
+        while page is not _END:
+            yield from page
+            # Only the page being evaluated and the prefetched ones stay referenced
+            page = None
+            page = self._next_page()
+
+
+class AiohttpLister:
+    """Lists nodes and pods over aiohttp with the server and credentials of a kubernetes ApiClient
+
+    Sends the requests ResourceFetcher would send (same selectors, page
+    size and per-namespace lists). Pages are yielded as the parsed JSON
+    items; models_of() turns them into client models, which the engine
+    does in the evaluation thread.
+    """
+
+    def __init__(self, fetcher):
+        self.fetcher = fetcher
+        self.api_client = fetcher.core_v1.api_client
+        self.configuration = self.api_client.configuration
+        self.session = None
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def models_of(self, model):
+        """Convert a page of parsed items into a list of model objects, e.g. model 'V1NodeList'"""
+        return lambda items: to_model(self.api_client, {'items': items}, model).items
+
+    def _ssl_context(self):
+        configuration = self.configuration
+        if not configuration.host.startswith('https'):
+            return None
+        context = ssl.create_default_context(cafile=configuration.ssl_ca_cert)
+        if configuration.cert_file:
+            context.load_cert_chain(configuration.cert_file, configuration.key_file)
+        if not configuration.verify_ssl:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        return context
+
+    def _headers(self):
+        # Refreshes expiring tokens (exec plugins) like every request of the client does
+        headers = {'Accept': 'application/json'}
+        for auth in self.configuration.auth_settings().values():
+            if auth['in'] == 'header':
+                headers[auth['key']] = auth['value']
+        return headers
+
+    async def _get(self, resource, path, params):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=self._ssl_context() or False))
+        started = time.perf_counter()
+        try:
+            with TRACER.span('list', path=path):
+                async with self.session.get(self.configuration.host + path, params=params, headers=self._headers()) as response:
+                    body = await response.read()
+                    if not 200 <= response.status <= 299:
+                        raise ApiException(status=response.status, reason=body[:200].decode('utf-8', 'replace'))
+        finally:
+            # Like ResourceFetcher, the time of every request of the iteration
+            self.fetcher.list_seconds[resource] += time.perf_counter() - started
+        return loads(body)
+
+    def _params(self, kwargs):
+        params = {}
+        if kwargs.get('label_selector'):
+            params['labelSelector'] = kwargs['label_selector']
+        if kwargs.get('field_selector'):
+            params['fieldSelector'] = kwargs['field_selector']
+        if self.fetcher.page_size > 0:
+            params['limit'] = str(self.fetcher.page_size)
+        return params
+
+    async def pages(self, resource, path, kwargs):
+        """Yield the items of a list request page by page, following the continue token"""
+        params = self._params(kwargs)
+        while True:
+            data = await self._get(resource, path, params)
+            token = (data.get('metadata') or {}).get('continue')
+            items = data.get('items') or []
+            data = None
+            yield items
+            if not token:
+                return
+            params = dict(params, **{'continue': token})
+
+    def node_pages(self):
+        self.fetcher.list_seconds['nodes'] = 0.0
+        return self.pages('nodes', '/api/v1/nodes', self.fetcher.node_list_kwargs())
+
+    def pod_pages(self):
+        self.fetcher.list_seconds['pods'] = 0.0
+        if not self.fetcher.namespaces:
+            return self.pages('pods', '/api/v1/pods', self.fetcher.pod_list_kwargs())
+        return self._namespace_pages(self.fetcher.pod_list_kwargs(all_namespaces=False))
+
+    async def _namespace_pages(self, kwargs):
+        """Pages of the configured namespaces in order, the first pages of the next namespaces fetched ahead"""
+        namespaces = iter(self.fetcher.namespaces)
+        pending = deque()
+
+        def fetch_ahead():
+            namespace = next(namespaces, None)
+            if namespace is not None:
+                pages = self.pages('pods', f"/api/v1/namespaces/{quote(namespace, safe='')}/pods", kwargs)
+                pending.append((pages, asyncio.ensure_future(pages.__anext__())))
+
+        for _ in range(self.fetcher.workers):
+            fetch_ahead()
+        try:
+            while pending:
+                pages, first = pending.popleft()
+                # A failed namespace fails the whole iteration
+                page = await first
+                fetch_ahead()
+                yield page
+                page = None
+                async for page in pages:
+                    yield page
+        finally:
+            for _, first in pending:
+                first.cancel()
+
+
+class AsyncMonitorEngine:
+    """Runs the poll cycles of a KubernetesMonitor on an asyncio event loop
+
+    Nodes and pods are fetched concurrently, while the evaluation (the
+    monitor's own synchronous, single threaded monitor_nodes/monitor_pods)
+    runs in a worker thread over the pages as they arrive. Writing the
+    cycle's alerts to the database and publishing the snapshot run in a
+    worker thread in the background and only have to be done before the
+    next cycle evaluates; emails are already queued. A cycle so takes about
+    as long as the slowest list plus the evaluation it cannot overlap.
+    """
+
+    def __init__(self, monitor, http=ASYNC_HTTP):
+        self.monitor = monitor
+        if http == 'aiohttp' and not AIOHTTP_AVAILABLE:
+            logger.warning("aiohttp is not installed, the asyncio engine fetches pages in worker threads")
+        self.use_aiohttp = AIOHTTP_AVAILABLE and http in ('aiohttp', 'auto')
+        self.lister = None
+        self._flush = None
+
+    def run(self, interval):
+        """Run cycles every interval seconds, blocks the calling thread"""
+        logger.info(f"{self.monitor.log_prefix}Running the asyncio monitor engine "
+                    f"({'aiohttp' if self.use_aiohttp else 'threaded'} API requests)")
+        asyncio.run(self._run(interval))
+
+    async def _run(self, interval):
+        try:
+            while True:
+                try:
+                    await self.cycle()
+                    await asyncio.sleep(interval)
+                except Exception as e:
+                    logger.error(f"{self.monitor.log_prefix}Error in monitor loop: {e}")
+                    self.monitor.last_error = str(e)
+                    await asyncio.sleep(60)  # Wait before retrying
+        finally:
+            await self.wait_flushed()
+            if self.lister is not None:
+                await self.lister.close()
+
+    async def cycle(self):
+        """Fetch and evaluate nodes and pods, then start writing the alerts in the background"""
+        monitor = self.monitor
+        fetcher = monitor.fetcher
+        started = time.time()
+        monitor.last_error = None
+
+        if self.use_aiohttp:
+            if self.lister is None or self.lister.fetcher is not fetcher:
+                self.lister = AiohttpLister(fetcher)
+            node_pages, convert_nodes = self.lister.node_pages(), self.lister.models_of('V1NodeList')
+            pod_pages = self.lister.pod_pages()
+            convert_pods = None if fetcher.raw_pods else self.lister.models_of('V1PodList')
+        else:
+            node_pages, convert_nodes = thread_pages(fetcher.node_pages()), None
+            pod_pages, convert_pods = thread_pages(fetcher.pod_pages()), None
+
+        loop = asyncio.get_running_loop()
+        nodes = PageBridge(loop, node_pages, fetcher.wait_seconds, 'nodes', convert_nodes)
+        pods = PageBridge(loop, pod_pages, fetcher.wait_seconds, 'pods', convert_pods)
+        with TRACER.trace('cycle', cluster=monitor.cluster_name, engine='asyncio'):
+            producers = [asyncio.create_task(nodes.produce()), asyncio.create_task(pods.produce())]
+            try:
+                # The previous cycle's alerts must be in the database (and the alert index) before evaluating
+                with TRACER.span('wait_flushed'):
+                    await self.wait_flushed()
+                await asyncio.to_thread(self._evaluate, nodes, pods)
+            finally:
+                for producer in producers:
+                    producer.cancel()
+
+        monitor.record_cycle(started)
+        monitor.cycle_stats['cycle_ms'] = round(monitor.last_cycle_seconds * 1000, 1)
+        self._flush = asyncio.create_task(asyncio.to_thread(self._flush_and_publish))
+
+    async def wait_flushed(self):
+        if self._flush is not None:
+            flush, self._flush = self._flush, None
+            await flush
+
+    def _evaluate(self, nodes, pods):
+        self.monitor.monitor_nodes(nodes.fetch)
+        self.monitor.monitor_pods(pods.fetch)
+
+    def _flush_and_publish(self):
+        started = time.perf_counter()
+        try:
+            self.monitor.flush_alert_writes()
+            self.monitor.publish_snapshot()
+        except Exception as e:
+            logger.error(f"{self.monitor.log_prefix}Error writing alerts: {e}")
+        self.monitor.cycle_stats['flush_ms'] = round((time.perf_counter() - started) * 1000, 1)
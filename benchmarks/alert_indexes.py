@@ -0,0 +1,157 @@
+"""Query plans and timings of the hot alert queries before and after the alert indexes
+
+Fills an alerts table with synthetic rows (mostly resolved, like a
+long-running installation), runs the dashboard and monitor queries without
+the composite/partial indexes, creates them through migrations.py and runs
+the queries again.
+
+    python benchmarks/alert_indexes.py --rows 5000000
+    python benchmarks/alert_indexes.py --database-url postgresql://... --rows 5000000
+
+The target table is dropped and recreated, do not point this at a real database.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--database-url', default='sqlite:////tmp/kubealertmail-bench.db')
+parser.add_argument('--rows', type=int, default=5_000_000)
+parser.add_argument('--active-ratio', type=float, default=0.001, help='share of unresolved alerts')
+parser.add_argument('--repeat', type=int, default=5)
+parser.add_argument('--chunk', type=int, default=50_000)
+args = parser.parse_args()
+
+# models.py connects on import
+os.environ['DATABASE_URL'] = args.database_url
+
+from sqlalchemy import text, insert  # noqa: E402
+from models import db, Alert, app  # noqa: E402
+from migrations import ensure_indexes  # noqa: E402
+
+NAMESPACES = [f"team-{i}" for i in range(50)]
+REASONS = ['CrashLoopBackOff', 'ImagePullBackOff', 'OOMKilled', 'Failed', 'Pending']
+PODS_PER_NAMESPACE = 400
+NODES = [f"node-{i}" for i in range(200)]
+
+QUERIES = {
+    'active alerts, newest first': (
+        "SELECT * FROM alerts WHERE is_resolved = 0 ORDER BY created_at DESC LIMIT 20", {}),
+    'resolved alerts page': (
+        "SELECT * FROM alerts WHERE is_resolved = 1 ORDER BY created_at DESC LIMIT 100", {}),
+    'duplicate check by alert_key': (
+        "SELECT id FROM alerts WHERE alert_key = :key AND is_resolved = 0 LIMIT 1",
+        {'key': 'pod:team-7/app-7-42:app:CrashLoopBackOff'}),
+    'resolve a deleted pod': (
+        "SELECT * FROM alerts WHERE is_resolved = 0 AND resource_type = 'pod' "
+        "AND resource_name = :name AND resource_namespace = :namespace",
+        {'name': 'app-7-42', 'namespace': 'team-7'}),
+    'load active alert index': (
+        "SELECT id, alert_key, resource_type, resource_namespace, resource_name FROM alerts WHERE is_resolved = 0", {}),
+}
+
+
+def synthetic_rows(count, active_ratio, chunk):
+    rng = random.Random(42)
+    start = datetime.utcnow() - timedelta(days=180)
+    span = 180 * 24 * 3600
+    rows = []
+    for i in range(count):
+        created_at = start + timedelta(seconds=span * i / count)
+        active = rng.random() < active_ratio
+        if rng.random() < 0.1:
+            name = rng.choice(NODES)
+            row = {'alert_key': f"node:{name}:NotReady", 'resource_type': 'node', 'resource_name': name,
+                   'resource_namespace': None, 'status': 'NotReady'}
+        else:
+            namespace = rng.choice(NAMESPACES)
+            name = f"app-{namespace.split('-')[1]}-{rng.randrange(PODS_PER_NAMESPACE)}"
+            reason = rng.choice(REASONS)
+            row = {'alert_key': f"pod:{namespace}/{name}:app:{reason}", 'resource_type': 'pod',
+                   'resource_name': name, 'resource_namespace': namespace, 'status': reason}
+        row.update(message=f"Alert triggered with status {row['status']}", created_at=created_at,
+                   resolved_at=None if active else created_at + timedelta(minutes=5), is_resolved=0 if active else 1)
+        rows.append(row)
+        if len(rows) >= chunk:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+
+def explain(connection, sql, params):
+    if connection.dialect.name == 'postgresql':
+        plan = connection.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params).scalars().all()
+    elif connection.dialect.name == 'sqlite':
+        plan = [row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params)]
+    else:
+        plan = [str(row) for row in connection.execute(text(f"EXPLAIN {sql}"), params)]
+    return plan
+
+
+def run_queries(engine, label):
+    print(f"\n=== {label} ===")
+    results = {}
+    with engine.connect() as connection:
+        for name, (sql, params) in QUERIES.items():
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                connection.execute(text(sql), params).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+            print(f"\n{name}: median {results[name]:.2f} ms over {args.repeat} runs")
+            for line in explain(connection, sql, params):
+                print(f"    {line}")
+    return results
+
+
+def main():
+    with app.app_context():
+        engine = db.engine
+        table = Alert.__table__
+        table.drop(engine, checkfirst=True)
+        table.create(engine)
+
+        # Start from the original schema, which only indexed alert_key
+        new_indexes = [index for index in table.indexes if index.name != 'ix_alerts_alert_key']
+        with engine.begin() as connection:
+            for index in new_indexes:
+                index.drop(connection)
+
+        started = time.perf_counter()
+        loaded = 0
+        for rows in synthetic_rows(args.rows, args.active_ratio, args.chunk):
+            with engine.begin() as connection:
+                connection.execute(insert(table), rows)
+            loaded += len(rows)
+            print(f"\rLoaded {loaded}/{args.rows} rows", end='', flush=True)
+        print(f"\nLoaded {loaded} rows in {time.perf_counter() - started:.0f}s")
+        with engine.begin() as connection:
+            connection.execute(text("ANALYZE alerts" if engine.dialect.name != 'sqlite' else "ANALYZE"))
+
+        before = run_queries(engine, "Before: alert_key index only")
+
+        started = time.perf_counter()
+        created = ensure_indexes(engine, table)
+        print(f"\nCreated {', '.join(created)} in {time.perf_counter() - started:.0f}s")
+        with engine.begin() as connection:
+            connection.execute(text("ANALYZE alerts" if engine.dialect.name != 'sqlite' else "ANALYZE"))
+
+        after = run_queries(engine, "After: composite and partial indexes")
+
+        print("\n=== Summary (median ms) ===")
+        print(f"{'query':35} {'before':>10} {'after':>10} {'speedup':>9}")
+        for name in QUERIES:
+            speedup = before[name] / after[name] if after[name] else float('inf')
+            print(f"{name:35} {before[name]:10.2f} {after[name]:10.2f} {speedup:8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""Poll cycle time of the thread engine against the asyncio engine on a high-latency API server
+
+A local fake API server answers node and pod lists after a fixed delay per
+request, like a remote or busy API server, and writing the alerts of a
+cycle to the database is delayed as well. The thread engine lists nodes,
+then pods page by page, then writes the alerts; the asyncio engine fetches
+nodes and pods concurrently while evaluating them and writes the alerts in
+the background. Its cycle should take about as long as the slowest list.
+
+Before timing, the alerts and dashboard summaries of one cycle of each
+engine are compared.
+
+    python benchmarks/async_engine.py --pods 5000 --page-size 1000 --latency 0.5 --db-latency 0.3
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from http.server import ThreadingHTTPServer
+from urllib.parse import urlparse
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import logging
+logging.disable(logging.CRITICAL)
+
+import k8s_monitor
+import async_monitor
+from clusters import ClusterConfig
+from raw_json import CachedPodListHandler, fetcher_for
+
+
+def node_json(i):
+    ready = "False" if i % 20 == 3 else "True"
+    return {
+        "metadata": {"name": f"node-{i}", "resourceVersion": str(500 + i),
+                     "labels": {"kubernetes.io/hostname": f"node-{i}", "node-role.kubernetes.io/worker": ""}},
+        "status": {
+            "capacity": {"cpu": "8", "memory": "32Gi"},
+            "conditions": [{"type": "Ready", "status": ready, "reason": "KubeletReady" if ready == "True" else "KubeletNotReady",
+                            "message": "kubelet is posting ready status" if ready == "True" else "PLEG is not healthy",
+                            "lastTransitionTime": "2024-01-01T00:00:00Z"}],
+            "nodeInfo": {"architecture": "amd64", "bootID": f"boot-{i}", "containerRuntimeVersion": "containerd://1.7.0",
+                         "kernelVersion": "6.1.0", "kubeProxyVersion": "v1.29.0", "kubeletVersion": "v1.29.0",
+                         "machineID": f"machine-{i}", "operatingSystem": "linux", "osImage": "Ubuntu 22.04",
+                         "systemUUID": f"uuid-{i}"}
+        }
+    }
+
+
+class SlowApiHandler(CachedPodListHandler):
+    """CachedPodListHandler with a node list, every response delayed by latency seconds"""
+    latency = 0.0
+    nodes = 100
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        if urlparse(self.path).path != '/api/v1/nodes':
+            super().do_GET()
+            return
+        body = json.dumps({"kind": "NodeList", "apiVersion": "v1", "metadata": {"resourceVersion": "1000"},
+                           "items": [node_json(i) for i in range(self.nodes)]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def new_monitor(port, page_size, raw_pods, db_latency):
+    """A monitor of the fake server, alerts collected instead of sent, database writes only delayed"""
+    # Every monitor starts without alerts in their cool down
+    k8s_monitor.sent_alerts.clear()
+    monitor = k8s_monitor.KubernetesMonitor(ClusterConfig(), registry=k8s_monitor.MonitorRegistry(monitors=[]))
+    monitor.fetcher = fetcher_for(port, page_size, raw_pods)
+    monitor.core_v1 = monitor.fetcher.core_v1
+    monitor.alerts = []
+    monitor.send_email_alert = lambda subject, message, alert_key=None, node=None, owner=None: monitor.alerts.append(
+        (alert_key, subject))
+    flush = monitor.flush_alert_writes
+
+    def slow_flush():
+        time.sleep(db_latency)
+        flush()
+    monitor.flush_alert_writes = slow_flush
+    return monitor
+
+
+def thread_cycle(monitor):
+    """The cycle of KubernetesMonitor.start_monitors(), return (evaluated, flushed) seconds"""
+    started = time.perf_counter()
+    monitor.monitor_nodes()
+    monitor.monitor_pods()
+    evaluated = time.perf_counter() - started
+    monitor.flush_alert_writes()
+    monitor.publish_snapshot()
+    return evaluated, time.perf_counter() - started
+
+
+def asyncio_cycle(engine):
+    """One cycle of AsyncMonitorEngine, return (evaluated, flushed) seconds"""
+    async def cycle():
+        started = time.perf_counter()
+        await engine.cycle()
+        evaluated = time.perf_counter() - started
+        await engine.wait_flushed()
+        if engine.lister is not None:
+            await engine.lister.close()
+        return evaluated, time.perf_counter() - started
+    return asyncio.run(cycle())
+
+
+def slowest_list(port, page_size, raw_pods):
+    """Seconds of the slowest of the node and pod lists alone, page after page without evaluation"""
+    fetcher = fetcher_for(port, page_size, raw_pods)
+    times = []
+    for pages in (fetcher.node_pages, fetcher.pod_pages):
+        started = time.perf_counter()
+        for _ in pages():
+            pass
+        times.append(time.perf_counter() - started)
+    return max(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pods', type=int, default=5_000)
+    parser.add_argument('--nodes', type=int, default=100)
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.5, help="seconds per API request")
+    parser.add_argument('--db-latency', type=float, default=0.3, help="seconds per database flush")
+    parser.add_argument('--raw', action='store_true', help="read pods as raw JSON (RAW_POD_JSON)")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    k8s_monitor.DB_AVAILABLE = False
+    k8s_monitor.SKIP_UNCHANGED = False
+    SlowApiHandler.pods = args.pods
+    SlowApiHandler.nodes = args.nodes
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowApiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    engines = {'thread': thread_cycle,
+               'asyncio threads': lambda monitor: asyncio_cycle(async_monitor.AsyncMonitorEngine(monitor, 'threads'))}
+    if async_monitor.AIOHTTP_AVAILABLE:
+        engines['asyncio aiohttp'] = lambda monitor: asyncio_cycle(async_monitor.AsyncMonitorEngine(monitor, 'aiohttp'))
+
+    # Warm the server's page cache, then time the lists alone
+    SlowApiHandler.latency = 0.0
+    slowest_list(port, args.page_size, args.raw)
+    SlowApiHandler.latency = args.latency
+    slowest = slowest_list(port, args.page_size, args.raw)
+    print(f"{args.nodes} nodes, {args.pods} pods, {args.page_size} per page, {args.latency}s per request, "
+          f"{args.db_latency}s per flush; slowest list alone {slowest:.2f}s")
+
+    reference = None
+    print(f"{'engine':>16} {'evaluated s':>12} {'flushed s':>10} {'vs slowest':>11} {'parity':>7}")
+    for name, cycle in engines.items():
+        monitor = new_monitor(port, args.page_size, args.raw, args.db_latency)
+        results = [cycle(monitor)]
+        state = (sorted(monitor.alerts), monitor.node_summaries, monitor.pod_summaries)
+        if reference is None:
+            reference = state
+        parity = state == reference and len(monitor.pod_summaries) == args.pods
+        results.extend(cycle(monitor) for _ in range(args.repeat - 1))
+        evaluated, flushed = min(results)
+        print(f"{name:>16} {evaluated:12.2f} {flushed:10.2f} {evaluated / slowest:10.2f}x {str(parity):>7}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Peak RSS of a monitor pod cycle against cluster size, with and without list paging
+
+A small HTTP server plays the API server and answers /api/v1/pods with
+synthetic pods, honouring limit and continue. Every measurement runs in a
+fresh process that lists the pods through the real kubernetes client and
+ResourceFetcher and reduces them the way monitor_pods does (PodRecord and
+dashboard summary per pod), then reports its peak RSS above the RSS it had
+after the imports.
+
+    python benchmarks/list_memory.py --pods 5000 20000 50000 --page-sizes 0 500
+"""
+import os
+import sys
+import json
+import argparse
+import resource
+import threading
+import subprocess
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+
+def pod_json(i, namespaces=200):
+    namespace = f"namespace-{i % namespaces}"
+    return {
+        "metadata": {
+            "name": f"pod-{i}", "namespace": namespace, "uid": f"00000000-0000-0000-0000-{i:012d}",
+            "resourceVersion": str(1000 + i), "creationTimestamp": "2024-01-01T00:00:00Z",
+            "labels": {"app": f"app-{i % 500}", "pod-template-hash": f"{i % 9973:08x}"},
+            "ownerReferences": [{"apiVersion": "apps/v1", "kind": "ReplicaSet", "name": f"app-{i % 500}-{i % 9973:08x}",
+                                 "uid": f"00000000-0000-0000-0001-{i % 500:012d}", "controller": True}]
+        },
+        "spec": {
+            "nodeName": f"node-{i % 100}",
+            "containers": [{
+                "name": "app", "image": f"registry.example.com/app-{i % 500}:1.0.0",
+                "resources": {"requests": {"cpu": "100m", "memory": "128Mi"}, "limits": {"memory": "256Mi"}},
+                "env": [{"name": "ENVIRONMENT", "value": "production"}, {"name": "LOG_LEVEL", "value": "info"}]
+            }]
+        },
+        "status": {
+            "phase": "Running", "podIP": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+            "hostIP": f"192.168.{i % 100 // 256}.{i % 100}", "startTime": "2024-01-01T00:00:00Z",
+            "conditions": [{"type": condition, "status": "True", "lastTransitionTime": "2024-01-01T00:00:00Z"}
+                           for condition in ("Initialized", "Ready", "ContainersReady", "PodScheduled")],
+            "containerStatuses": [{
+                "name": "app", "ready": True, "restartCount": 0, "image": f"registry.example.com/app-{i % 500}:1.0.0",
+                "imageID": f"registry.example.com/app-{i % 500}@sha256:{i:064x}", "containerID": f"containerd://{i:064x}",
+                "state": {"running": {"startedAt": "2024-01-01T00:00:00Z"}}, "started": True
+            }]
+        }
+    }
+
+
+class FakePodListHandler(BaseHTTPRequestHandler):
+    pods = 0
+    pod_json = staticmethod(pod_json)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path != '/api/v1/pods':
+            self.send_error(404)
+            return
+        start = int(query.get('continue', ['0'])[0] or 0)
+        limit = int(query.get('limit', ['0'])[0] or 0)
+        end = min(self.pods, start + limit) if limit else self.pods
+        body = json.dumps({
+            "kind": "PodList", "apiVersion": "v1",
+            "metadata": {"resourceVersion": "1000", **({"continue": str(end)} if end < self.pods else {})},
+            "items": [self.pod_json(i) for i in range(start, end)]
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def peak_rss_kb():
+    """High water mark of this process' RSS
+
+    ru_maxrss of a child also counts the RSS of the parent it was forked
+    from, so VmHWM is used where /proc is available.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def child(port, page_size):
+    """One monitor style pass over the pods, print peak RSS growth in KB"""
+    import logging
+    logging.disable(logging.CRITICAL)
+    from kubernetes import client
+    from k8s_fetch import ResourceFetcher
+    from pod_evaluation import PodRecord
+
+    configuration = client.Configuration()
+    configuration.host = f"http://127.0.0.1:{port}"
+    core_v1 = client.CoreV1Api(client.ApiClient(configuration))
+    fetcher = ResourceFetcher(core_v1, namespaces=[], exclude_namespaces=[], pod_label_selector='',
+                              pod_field_selector='', node_label_selector='', page_size=page_size)
+    baseline = peak_rss_kb()
+
+    summaries = {}
+    for pod in fetcher.iter_pods():
+        record = PodRecord.from_pod(pod)
+        summaries[record.key] = record.summary()
+    peak = peak_rss_kb()
+    print(json.dumps({'pods': len(summaries), 'peak_kb': peak - baseline, 'list_seconds': fetcher.list_seconds['pods']}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pods', type=int, nargs='+', default=[5_000, 20_000, 50_000])
+    parser.add_argument('--page-sizes', type=int, nargs='+', default=[0, 500])
+    parser.add_argument('--child', nargs=2, type=int, metavar=('PORT', 'PAGE_SIZE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakePodListHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    print(f"{'pods':>7} {'page size':>10} {'peak RSS MB':>12} {'list s':>7}")
+    for pods in args.pods:
+        FakePodListHandler.pods = pods
+        for page_size in args.page_sizes:
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', str(port), str(page_size)],
+                                    capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{result['pods']:7} {page_size or 'all':>10} {result['peak_kb'] / 1024:12.1f} {result['list_seconds']:7.2f}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Scaling of the sharded pod evaluation with the number of workers
+
+Evaluates synthetic pod lists (mock_k8s_data.generate_mock_pods) with the
+serial path and with ShardedPodEvaluator in thread and process mode,
+alternating two seeds so every cycle has new alerts and recoveries, and
+checks that every configuration produces the same alerts as serial: the
+run exits with status 1 when one does not.
+
+    python benchmarks/pod_evaluation.py --pods 50000 --workers 1 2 4 8
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from mock_k8s_data import generate_mock_pods  # noqa: E402
+from pod_evaluation import PodRecord, PodShard, ShardedPodEvaluator  # noqa: E402
+
+
+def alert_keys(results):
+    return [candidate.alert_key for _, candidates in results for candidate in candidates]
+
+
+def run(evaluate, cycles):
+    timings = []
+    keys = []
+    previous = set()
+    for records in cycles:
+        current = {record.key for record in records}
+        deleted = sorted(previous - current)
+        previous = current
+        started = time.perf_counter()
+        results = evaluate(records, deleted)
+        timings.append(time.perf_counter() - started)
+        keys.append(alert_keys(results))
+    # The first cycle has no previous statuses, report the steady state
+    return statistics.median(timings[1:]), keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pods', type=int, default=50_000)
+    parser.add_argument('--namespaces', type=int, default=200)
+    parser.add_argument('--unhealthy-ratio', type=float, default=0.05)
+    parser.add_argument('--cycles', type=int, default=5)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--modes', nargs='+', default=['thread', 'process'])
+    args = parser.parse_args()
+
+    pod_lists = [generate_mock_pods(args.pods, namespaces=args.namespaces,
+                                    unhealthy_ratio=args.unhealthy_ratio, seed=cycle % 2)
+                 for cycle in range(args.cycles)]
+
+    started = time.perf_counter()
+    cycles = [[PodRecord.from_pod(pod) for pod in pods] for pods in pod_lists]
+    extract = (time.perf_counter() - started) / args.cycles
+    print(f"{args.pods} pods in {args.namespaces} namespaces, {os.cpu_count()} CPUs")
+    print(f"Record extraction (always in the monitor thread): {extract * 1000:.0f} ms per cycle\n")
+
+    shard = PodShard()
+    serial_time, serial_keys = run(lambda records, deleted: shard.evaluate(list(enumerate(records)), deleted), cycles)
+    print(f"{'mode':8} {'workers':>7} {'ms/cycle':>9} {'speedup':>8} {'parity':>7}")
+    print(f"{'serial':8} {1:7} {serial_time * 1000:9.0f} {1.0:7.2f}x {'ok':>7}")
+
+    mismatches = []
+    for mode in args.modes:
+        for workers in args.workers:
+            if workers < 2:
+                continue
+            evaluator = ShardedPodEvaluator(workers, mode)
+            try:
+                elapsed, keys = run(evaluator.evaluate, cycles)
+            finally:
+                evaluator.stop()
+            parity = 'ok' if keys == serial_keys else 'DIFF'
+            if keys != serial_keys:
+                mismatches.append(f"{mode} with {workers} workers")
+            print(f"{mode:8} {workers:7} {elapsed * 1000:9.0f} {serial_time / elapsed:7.2f}x {parity:>7}")
+
+    # Every configuration is timed first, then a parity failure fails the run
+    if mismatches:
+        sys.exit(f"Sharded evaluation differs from serial: {', '.join(mismatches)}")
+
+
+if __name__ == '__main__':
+    main()
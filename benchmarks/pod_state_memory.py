@@ -0,0 +1,89 @@
+"""Memory and GC cost of the pod state store, PodState against the old dict-of-dicts
+
+Builds the state kept between cycles for synthetic pods in both
+representations and reports the memory still allocated once the pod list
+is gone (tracemalloc), the objects the garbage collector has to track, the
+time of a full collection with the store alive and the time to refresh
+the store for a cycle where 1% of the pods changed.
+
+    python benchmarks/pod_state_memory.py --pods 50000
+"""
+import os
+import gc
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from mock_k8s_data import generate_mock_pods  # noqa: E402
+from pod_evaluation import PodRecord, next_pod_state  # noqa: E402
+
+
+def legacy_status(record):
+    """The status dict pod_statuses used to keep for every pod"""
+    return {
+        "phase": record.phase,
+        "containers": {
+            name: {"state": state, "reason": reason, "ready": ready}
+            for name, ready, _, state, reason, _, _ in record.containers
+        }
+    }
+
+
+def legacy_refresh(store, records):
+    for record in records:
+        store[record.key] = legacy_status(record)
+
+
+def pod_state_refresh(store, records):
+    for record in records:
+        store[record.key] = next_pod_state(record, store.get(record.key))
+
+
+def measure(refresh, args):
+    gc.collect()
+    tracked_before = len(gc.get_objects())
+    tracemalloc.start()
+    pods = generate_mock_pods(args.pods, namespaces=args.namespaces, seed=0)
+    records = [PodRecord.from_pod(pod) for pod in pods]
+    store = {}
+    refresh(store, records)
+    del pods, records
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracked = len(gc.get_objects()) - tracked_before
+
+    started = time.perf_counter()
+    gc.collect()
+    collect_time = time.perf_counter() - started
+
+    # A steady state cycle: the same pods, one in a hundred changed
+    changed = generate_mock_pods(args.pods, namespaces=args.namespaces, seed=1)
+    pods = generate_mock_pods(args.pods, namespaces=args.namespaces, seed=0)
+    pods = [changed[i] if i % 100 == 0 else pod for i, pod in enumerate(pods)]
+    records = [PodRecord.from_pod(pod) for pod in pods]
+    started = time.perf_counter()
+    refresh(store, records)
+    refresh_time = time.perf_counter() - started
+    return retained, tracked, collect_time, refresh_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pods', type=int, default=50_000)
+    parser.add_argument('--namespaces', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{args.pods} pods in {args.namespaces} namespaces\n")
+    print(f"{'store':10} {'MB':>7} {'bytes/pod':>10} {'gc objects':>11} {'full gc ms':>11} {'refresh ms':>11}")
+    for name, refresh in (('dicts', legacy_refresh), ('PodState', pod_state_refresh)):
+        retained, tracked, collect_time, refresh_time = measure(refresh, args)
+        print(f"{name:10} {retained / 2**20:7.1f} {retained / args.pods:10.0f} {tracked:11} "
+              f"{collect_time * 1000:11.1f} {refresh_time * 1000:11.0f}")
+
+
+if __name__ == '__main__':
+    main()
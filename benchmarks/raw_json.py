@@ -0,0 +1,172 @@
+"""Pod list throughput of the kubernetes client models against the raw-JSON path
+
+Lists synthetic pods from a local fake API server through ResourceFetcher
+and reduces every pod to a PodRecord and its dashboard summary, the way
+monitor_pods does, once through the client's model deserialization and
+once through k8s_raw with json and (if installed) orjson. Rendered pages
+are cached by the server, so the timings are dominated by the client.
+
+Before timing, the records of both paths are compared field by field,
+together with the alerts evaluate_pod_record raises for them, on pods in
+every container state the monitor tells apart, with every JSON parser.
+The run exits with status 1 when a parser's records or alerts differ.
+
+    python benchmarks/raw_json.py --pods 5000 20000 --page-size 500
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import logging
+logging.disable(logging.CRITICAL)
+
+from kubernetes import client
+import k8s_raw
+from k8s_fetch import ResourceFetcher
+from pod_evaluation import PodRecord, evaluate_pod_record
+from list_memory import FakePodListHandler, pod_json
+
+
+def varied_pod_json(i):
+    """pod_json with every tenth pod in one of the states the monitor alerts on or recovers from"""
+    pod = pod_json(i)
+    status = pod['status']
+    container = status['containerStatuses'][0]
+    variant = i % 10
+    if variant == 1:
+        container['state'] = {"waiting": {"reason": "CrashLoopBackOff", "message": "back-off 5m0s restarting"}}
+        container['ready'] = False
+        container['restartCount'] = 12
+    elif variant == 2:
+        container['state'] = {"waiting": {"reason": "ContainerCreating"}}
+    elif variant == 3:
+        container['state'] = {"terminated": {"reason": "OOMKilled", "exitCode": 137}}
+    elif variant == 4:
+        status.update(phase="Failed", reason="Evicted", message="The node was low on resource: memory.")
+    elif variant == 5:
+        status.update(phase="Pending")
+        del status['containerStatuses']
+    elif variant == 6:
+        container['state'] = {"running": {}}
+    elif variant == 7:
+        container['state'] = {}
+        del pod['metadata']['ownerReferences']
+    return pod
+
+
+class CachedPodListHandler(FakePodListHandler):
+    pod_json = staticmethod(varied_pod_json)
+    pages = {}
+
+    def do_GET(self):
+        """Answer with the cached response of this path, rendered by FakePodListHandler on first use"""
+        response = self.pages.get(self.path)
+        if response is None:
+            self.wfile, wfile = _Buffer(), self.wfile
+            try:
+                super().do_GET()
+                response = self.pages[self.path] = self.wfile.getvalue()
+            finally:
+                self.wfile = wfile
+        self.wfile.write(response)
+
+
+class _Buffer:
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(data)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return b''.join(self.parts)
+
+
+def fetcher_for(port, page_size, raw_pods):
+    configuration = client.Configuration()
+    configuration.host = f"http://127.0.0.1:{port}"
+    core_v1 = client.CoreV1Api(client.ApiClient(configuration))
+    return ResourceFetcher(core_v1, namespaces=[], exclude_namespaces=[], pod_label_selector='',
+                           pod_field_selector='', node_label_selector='', page_size=page_size, raw_pods=raw_pods)
+
+
+def record_fields(record):
+    return (record.key, record.name, record.namespace, record.phase, record.node, record.owner, record.ip,
+            record.containers, record.phase_details)
+
+
+def alerts_of(record):
+    candidates, _ = evaluate_pod_record(record, None)
+    return [(candidate.alert_key, candidate.subject, candidate.message, candidate.db_message, candidate.node,
+             candidate.owner) for candidate in candidates]
+
+
+def check_parity(port, page_size):
+    model = [PodRecord.from_object(pod) for pod in fetcher_for(port, page_size, False).iter_pods()]
+    raw = [PodRecord.from_object(pod) for pod in fetcher_for(port, page_size, True).iter_pods()]
+    mismatches = sum(1 for a, b in zip(model, raw)
+                     if record_fields(a) != record_fields(b) or a.summary() != b.summary() or alerts_of(a) != alerts_of(b))
+    return len(model) == len(raw) and mismatches == 0, len(model), mismatches
+
+
+def run(port, page_size, raw_pods):
+    fetcher = fetcher_for(port, page_size, raw_pods)
+    started = time.perf_counter()
+    summaries = {}
+    for pod in fetcher.iter_pods():
+        record = PodRecord.from_object(pod)
+        summaries[record.key] = record.summary()
+    return len(summaries), time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pods', type=int, nargs='+', default=[5_000, 20_000])
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CachedPodListHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    parsers = {'json': json.loads}
+    try:
+        import orjson
+        parsers['orjson'] = orjson.loads
+    except ImportError:
+        pass
+
+    print(f"{'pods':>7} {'path':>12} {'best s':>7} {'pods/s':>9} {'speedup':>8} {'parity':>7}")
+    mismatches = []
+    for pods in args.pods:
+        CachedPodListHandler.pods = pods
+        CachedPodListHandler.pages = {}
+
+        best = min(run(port, args.page_size, False)[1] for _ in range(args.repeat))
+        print(f"{pods:7} {'model':>12} {best:7.2f} {pods / best:9.0f} {1.0:8.1f} {'':>7}")
+        for name, loads in parsers.items():
+            k8s_raw.loads = loads
+            parity, _, differing = check_parity(port, args.page_size)
+            if not parity:
+                mismatches.append(f"{name} with {pods} pods ({differing} differing)")
+            raw_best = min(run(port, args.page_size, True)[1] for _ in range(args.repeat))
+            print(f"{pods:7} {'raw ' + name:>12} {raw_best:7.2f} {pods / raw_best:9.0f} {best / raw_best:8.1f} {str(parity):>7}")
+    server.shutdown()
+
+    if mismatches:
+        sys.exit(f"Raw JSON records or alerts differ from the model path: {', '.join(mismatches)}")
+
+
+if __name__ == '__main__':
+    main()
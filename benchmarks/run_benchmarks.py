@@ -0,0 +1,300 @@
+"""Benchmark suite: monitor cycles, get_all_resources and the Flask API on a synthetic large cluster
+
+Every scenario runs in a fresh process against a SyntheticCluster (see
+mock_k8s_data) served through the list calls of CoreV1Api, with a SQLite
+database and an SMTP server that only counts. Cycles run like
+KubernetesMonitor.start_monitors() does, with the scenario's changes
+applied between them, and alert groups are flushed after every cycle as
+if ALERT_GROUP_INTERVAL had passed. Then get_all_resources() and the API
+routes are called repeatedly.
+
+Reported per scenario: latency percentiles of cycles, get_all_resources()
+and API requests, pod throughput, peak RSS (including the synthetic
+cluster itself), database statements and commits, and SMTP connections
+and messages. Results are written to a JSON file; --compare prints the
+change against an earlier one.
+
+    python benchmarks/run_benchmarks.py --nodes 500 --pods 20000 --output results.json
+    python benchmarks/run_benchmarks.py --output new.json --compare results.json
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+SCENARIOS = {
+    'steady': "No changes, after the first cycle only ended alert cool downs cause evaluations",
+    'churn': "--churn of the pods change state or are replaced before every cycle",
+    'node_loss': "--lost-nodes nodes stop responding before cycle 2 and their pods fail, all is replaced before cycle 5",
+    'bad_rollout': "Every pod of --broken-apps applications crash loops from cycle 2, rolled back before cycle 5",
+}
+STORM_CYCLE = 2
+RECOVERY_CYCLE = 5
+
+
+def percentiles(samples):
+    """p50, p90, p99, max and mean of a list of seconds, in milliseconds"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))]
+    return {
+        'count': len(ordered),
+        'p50_ms': round(rank(50) * 1000, 3),
+        'p90_ms': round(rank(90) * 1000, 3),
+        'p99_ms': round(rank(99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+    }
+
+
+def timed_calls(func, count):
+    samples = []
+    started = time.perf_counter()
+    for _ in range(count):
+        call_started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    return dict(percentiles(samples), per_second=round(count / elapsed, 1) if elapsed else None)
+
+
+class CountingSMTP:
+    """smtplib.SMTP stand-in that only counts connections and messages"""
+    connections = 0
+    messages = 0
+
+    def __init__(self, host, port, timeout=None):
+        CountingSMTP.connections += 1
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        pass
+
+    def send_message(self, msg):
+        CountingSMTP.messages += 1
+
+    def quit(self):
+        pass
+
+
+def mutate(scenario, cluster, cycle, args):
+    """Apply the scenario's changes before a cycle"""
+    if scenario == 'churn' and cycle > 0:
+        cluster.step(args.churn)
+    elif scenario == 'node_loss' and cycle == STORM_CYCLE:
+        cluster.node_loss(args.lost_nodes)
+    elif scenario == 'bad_rollout' and cycle == STORM_CYCLE:
+        cluster.bad_rollout(args.broken_apps)
+    elif scenario in ('node_loss', 'bad_rollout') and cycle == RECOVERY_CYCLE:
+        cluster.recover()
+
+
+def child(scenario, args):
+    """Run one scenario in this process and print its results as JSON"""
+    database = os.path.join(tempfile.mkdtemp(prefix='kam-bench-'), 'bench.db')
+    os.environ['DATABASE_URL'] = f"sqlite:///{database}"
+    os.environ.setdefault('SMTP_SERVER', 'smtp.bench.invalid')
+    os.environ.setdefault('EMAIL_FROM', 'monitor@bench.invalid')
+    os.environ.setdefault('EMAIL_TO', 'oncall@bench.invalid')
+    os.environ.setdefault('SMTP_STARTTLS', 'false')
+    os.environ['ALERT_RETENTION_DAYS'] = '0'
+
+    import logging
+    logging.disable(logging.CRITICAL)
+    from sqlalchemy import event
+    import k8s_monitor
+    # The benchmark drives the cycles itself
+    k8s_monitor.start_monitoring_thread = lambda: None
+    import main
+    from models import db, Alert, app
+    from k8s_fetch import ResourceFetcher
+    from mock_k8s_data import SyntheticCluster
+    from list_memory import peak_rss_kb
+
+    db_counts = {'statements': 0, 'commits': 0}
+
+    def count_statement(*_):
+        db_counts['statements'] += 1
+
+    def count_commit(*_):
+        db_counts['commits'] += 1
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+        event.listen(db.engine, 'commit', count_commit)
+
+    k8s_monitor.email_queue.smtp_factory = CountingSMTP
+    k8s_monitor.email_queue.start()
+    k8s_monitor.alert_grouper.start()
+
+    cluster = SyntheticCluster(nodes=args.nodes, pods=args.pods, namespaces=args.namespaces, seed=args.seed)
+    monitor = k8s_monitor.k8s_monitor.monitors[0]
+    monitor.core_v1 = cluster.core_v1()
+    monitor.fetcher = ResourceFetcher(monitor.core_v1)
+    baseline_rss = peak_rss_kb()
+
+    cycle_samples = []
+    pods_listed = 0
+    stats = []
+    for cycle in range(args.cycles):
+        mutate(scenario, cluster, cycle, args)
+        cluster.lists()
+        started = time.time()
+        cycle_started = time.perf_counter()
+        monitor.monitor_nodes()
+        monitor.monitor_pods()
+        monitor.flush_alert_writes()
+        monitor.publish_snapshot()
+        cycle_samples.append(time.perf_counter() - cycle_started)
+        monitor.record_cycle(started)
+        pods_listed += monitor.cycle_stats.get('pods', 0)
+        stats.append(dict(monitor.cycle_stats))
+        k8s_monitor.alert_grouper.flush(force=True)
+    k8s_monitor.email_queue.wait_idle(timeout=60)
+    cycle_db = dict(db_counts)
+
+    client = main.app.test_client()
+    api = {route: timed_calls(lambda: client.get(route), args.requests)
+           for route in ('/api/resources', '/api/alerts', '/api/monitor/stats', '/metrics')}
+    get_all_resources = timed_calls(k8s_monitor.k8s_monitor.get_all_resources, args.requests)
+
+    with app.app_context():
+        alerts = Alert.query.count()
+        active = Alert.query.filter(Alert.is_resolved == 0).count()
+    phase_keys = ('node_list_ms', 'node_evaluation_ms', 'pod_list_ms', 'pod_evaluation_ms')
+    result = {
+        'scenario': scenario,
+        'description': SCENARIOS[scenario],
+        'cycles': dict(percentiles(cycle_samples), first_ms=round(cycle_samples[0] * 1000, 3)),
+        'phases_mean_ms': {key: round(sum(stat.get(key, 0) for stat in stats) / len(stats), 3) for key in phase_keys},
+        'pods_evaluated': sum(stat.get('pods_evaluated', 0) for stat in stats),
+        'pods_per_second': round(pods_listed / sum(cycle_samples), 1),
+        'get_all_resources': get_all_resources,
+        'api': api,
+        'peak_rss_mb': round(peak_rss_kb() / 1024, 1),
+        'rss_growth_mb': round((peak_rss_kb() - baseline_rss) / 1024, 1),
+        'db': {'cycle_statements': cycle_db['statements'], 'cycle_commits': cycle_db['commits'],
+               'statements': db_counts['statements'], 'commits': db_counts['commits']},
+        'smtp': {'connections': CountingSMTP.connections, 'messages': CountingSMTP.messages},
+        'alerts': {'stored': alerts, 'active': active},
+        'api_list_calls': monitor.core_v1.calls,
+    }
+    print(json.dumps(result))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# (label, path in a scenario result, higher is better)
+COMPARED = [
+    ('cycle p50 ms', ('cycles', 'p50_ms'), False),
+    ('cycle p99 ms', ('cycles', 'p99_ms'), False),
+    ('first cycle ms', ('cycles', 'first_ms'), False),
+    ('pods/s', ('pods_per_second',), True),
+    ('get_all_resources p99 ms', ('get_all_resources', 'p99_ms'), False),
+    ('/api/resources p99 ms', ('api', '/api/resources', 'p99_ms'), False),
+    ('/api/alerts p99 ms', ('api', '/api/alerts', 'p99_ms'), False),
+    ('peak RSS MB', ('peak_rss_mb',), False),
+    ('DB statements', ('db', 'cycle_statements'), False),
+    ('SMTP messages', ('smtp', 'messages'), False),
+]
+
+
+def lookup(result, path):
+    for key in path:
+        if not isinstance(result, dict) or key not in result:
+            return None
+        result = result[key]
+    return result
+
+
+def compare(results, baseline):
+    print(f"\nAgainst {baseline['meta'].get('git_commit') or 'baseline'} ({baseline['meta'].get('timestamp')}):")
+    print(f"{'scenario':>12} {'metric':>26} {'before':>10} {'after':>10} {'change':>8}")
+    for scenario, result in results['scenarios'].items():
+        before_result = baseline['scenarios'].get(scenario)
+        if before_result is None:
+            continue
+        for label, path, higher_is_better in COMPARED:
+            before, after = lookup(before_result, path), lookup(result, path)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before * 100 if before else 0.0
+            worse = change < -10 if higher_is_better else change > 10
+            print(f"{scenario:>12} {label:>26} {before:10.1f} {after:10.1f} {change:+7.1f}%{' !' if worse else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--nodes', type=int, default=200)
+    parser.add_argument('--pods', type=int, default=10_000)
+    parser.add_argument('--namespaces', type=int, default=50)
+    parser.add_argument('--cycles', type=int, default=8)
+    parser.add_argument('--churn', type=float, default=0.02, help="share of the pods changed before every cycle")
+    parser.add_argument('--lost-nodes', type=int, default=10)
+    parser.add_argument('--broken-apps', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=200, help="calls of get_all_resources and of every API route")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args)
+        return
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'args': {key: value for key, value in vars(args).items() if key not in ('child', 'output', 'compare')},
+        },
+        'scenarios': {}
+    }
+    child_args = [f"--{key.replace('_', '-')}={value}" for key, value in vars(args).items()
+                  if key not in ('scenarios', 'child', 'output', 'compare')]
+
+    print(f"{args.nodes} nodes, {args.pods} pods, {args.cycles} cycles per scenario")
+    print(f"{'scenario':>12} {'cycle p50':>10} {'p99 ms':>8} {'pods/s':>9} {'gar p99':>8} {'api p99':>8} "
+          f"{'RSS MB':>7} {'DB stmts':>9} {'emails':>7}")
+    for scenario in args.scenarios:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), f'--child={scenario}', *child_args],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results['scenarios'][scenario] = result
+        print(f"{scenario:>12} {result['cycles']['p50_ms']:10.1f} {result['cycles']['p99_ms']:8.1f} "
+              f"{result['pods_per_second']:9.0f} {result['get_all_resources']['p99_ms']:8.2f} "
+              f"{result['api']['/api/resources']['p99_ms']:8.2f} {result['peak_rss_mb']:7.1f} "
+              f"{result['db']['cycle_statements']:9} {result['smtp']['messages']:7}")
+
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            compare(results, json.load(baseline_file))
+
+
+if __name__ == '__main__':
+    main()
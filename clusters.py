@@ -0,0 +1,100 @@
+import os
+import re
+import logging
+from kubernetes import client, config
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+CLUSTERS = os.environ.get('CLUSTERS', '')  # e.g. 'prod-eu=gke_prod-eu,prod-us=gke_prod-us@/etc/kubeconfigs/us,local=in-cluster'
+
+IN_CLUSTER = 'in-cluster'
+CLUSTER_NAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+
+# Separates the cluster from the rest of an alert key: prod-eu|pod:default/web-1:web:CrashLoopBackOff
+ALERT_KEY_CLUSTER_SEPARATOR = '|'
+
+
+def scoped_alert_key(cluster, alert_key):
+    """Prefix an alert key with its cluster, keys of the unnamed default cluster stay as they are"""
+    return f"{cluster}{ALERT_KEY_CLUSTER_SEPARATOR}{alert_key}" if cluster else alert_key
+
+
+def split_alert_key(alert_key):
+    """Return (cluster or None, alert key without the cluster)"""
+    cluster, separator, key = alert_key.partition(ALERT_KEY_CLUSTER_SEPARATOR)
+    if separator:
+        return cluster, key
+    return None, alert_key
+
+
+class ClusterConfig:
+    """A monitored cluster: its name in alerts and the API, and where its credentials come from
+
+    name None is the only cluster of a deployment without CLUSTERS. It is
+    configured like before (in-cluster, then the default kubeconfig) and its
+    alerts carry no cluster, so alerts stored by earlier versions stay valid.
+    """
+
+    def __init__(self, name=None, context=None, kubeconfig=None):
+        self.name = name
+        self.context = context
+        self.kubeconfig = kubeconfig
+
+    def __repr__(self):
+        return f"<ClusterConfig {self.name or 'default'}>"
+
+    def api_client(self):
+        """Return an ApiClient for this cluster
+
+        Raises config.ConfigException when a named cluster cannot be
+        configured; the default cluster falls back to the client's default
+        configuration (and the monitor to mock data).
+        """
+        if self.name is None:
+            try:
+                # When running in cluster
+                config.load_incluster_config()
+                logger.info("Loaded in-cluster configuration")
+            except config.ConfigException:
+                # When running outside of the cluster (for development)
+                try:
+                    config.load_kube_config()
+                    logger.info("Loaded kubeconfig file")
+                except config.ConfigException:
+                    # For local development/demo, use mock data
+                    logger.warning("Could not configure kubernetes client, using mock data mode")
+            return client.ApiClient()
+
+        if self.context == IN_CLUSTER:
+            configuration = client.Configuration()
+            config.load_incluster_config(client_configuration=configuration)
+            logger.info(f"Loaded in-cluster configuration for cluster {self.name}")
+            return client.ApiClient(configuration)
+
+        api_client = config.new_client_from_config(config_file=self.kubeconfig, context=self.context)
+        logger.info(f"Loaded kubeconfig context {self.context} for cluster {self.name}")
+        return api_client
+
+
+def parse_clusters(value=CLUSTERS):
+    """Parse CLUSTERS into ClusterConfigs, a single default cluster when it is empty
+
+    Entries are comma separated [name=]context[@kubeconfig path]; the
+    context in-cluster uses the service account of the pod. Without a name
+    the context is the name.
+    """
+    clusters = []
+    names = set()
+    for entry in (part.strip() for part in value.split(',')):
+        if not entry:
+            continue
+        name, target = entry.split('=', 1) if '=' in entry else ('', entry)
+        context, _, kubeconfig = target.partition('@')
+        name = name.strip() or context.strip()
+        if not CLUSTER_NAME_PATTERN.match(name) or name in names:
+            logger.error(f"Ignoring cluster entry '{entry}': names must be unique and use letters, digits, '.', '_' or '-'")
+            continue
+        names.add(name)
+        clusters.append(ClusterConfig(name, context.strip() or None, kubeconfig.strip() or None))
+    return clusters or [ClusterConfig()]
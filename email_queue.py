@@ -0,0 +1,298 @@
+import os
+import time
+import heapq
+import queue
+import logging
+import smtplib
+import threading
+from collections import deque
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from metrics import SMTP_SEND_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+EMAIL_QUEUE_SIZE = int(os.environ.get('EMAIL_QUEUE_SIZE', '1000'))
+EMAIL_WORKERS = int(os.environ.get('EMAIL_WORKERS', '2'))
+EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', '5'))
+EMAIL_RETRY_DELAY = float(os.environ.get('EMAIL_RETRY_DELAY', '5'))  # seconds, doubled on every retry
+EMAIL_RETRY_MAX_DELAY = float(os.environ.get('EMAIL_RETRY_MAX_DELAY', '300'))  # seconds
+EMAIL_IDLE_TIMEOUT = float(os.environ.get('EMAIL_IDLE_TIMEOUT', '60'))  # seconds before an idle connection is closed
+EMAIL_DEAD_LETTER_SIZE = int(os.environ.get('EMAIL_DEAD_LETTER_SIZE', '100'))
+SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', 'true').lower() in ('1', 'true', 'yes')
+SMTP_TIMEOUT = float(os.environ.get('SMTP_TIMEOUT', '30'))  # seconds
+
+
+class OutgoingEmail:
+    """An email waiting for delivery"""
+    __slots__ = ('subject', 'body', 'enqueued_at', 'attempts', 'last_error')
+
+    def __init__(self, subject, body):
+        self.subject = subject
+        self.body = body
+        self.enqueued_at = time.time()
+        self.attempts = 0
+        self.last_error = None
+
+    def to_dict(self):
+        return {
+            'subject': self.subject,
+            'enqueued_at': self.enqueued_at,
+            'attempts': self.attempts,
+            'last_error': self.last_error
+        }
+
+
+def connection_lost(error):
+    """True for errors of a dropped connection, False for error replies of a working server"""
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        # 421: the server is closing this connection
+        return error.smtp_code == 421
+    # SMTPException is an OSError too
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPSession:
+    """A lazily opened, reusable authenticated SMTP connection owned by one worker"""
+
+    def __init__(self, delivery_queue):
+        self.delivery_queue = delivery_queue
+        self.connection = None
+        self.last_used = 0.0
+
+    def send(self, msg):
+        if self.connection is None:
+            self.connection = self.delivery_queue.connect()
+        try:
+            self.connection.send_message(msg)
+        except OSError as e:
+            if not connection_lost(e):
+                raise
+            # The server dropped our reused connection, retry once on a fresh one
+            self.close()
+            self.connection = self.delivery_queue.connect()
+            self.connection.send_message(msg)
+        self.last_used = time.monotonic()
+
+    def close_if_idle(self, idle_timeout):
+        if self.connection is not None and time.monotonic() - self.last_used > idle_timeout:
+            self.close()
+
+    def close(self):
+        if self.connection is None:
+            return
+        try:
+            self.connection.quit()
+        except Exception:
+            pass
+        self.connection = None
+
+
+class EmailDeliveryQueue:
+    """Bounded queue of alert emails delivered by a pool of SMTP workers
+
+    Callers only enqueue, so the monitor loop never waits for SMTP. Every
+    worker keeps its authenticated connection open between messages, failed
+    sends are retried with exponential backoff, and messages that still fail
+    after EMAIL_MAX_ATTEMPTS (or do not fit in the queue) go to a bounded
+    dead-letter list.
+    """
+
+    def __init__(self, server, port, username, password, sender, recipients,
+                 use_starttls=SMTP_STARTTLS, workers=EMAIL_WORKERS, queue_size=EMAIL_QUEUE_SIZE,
+                 max_attempts=EMAIL_MAX_ATTEMPTS, retry_delay=EMAIL_RETRY_DELAY,
+                 idle_timeout=EMAIL_IDLE_TIMEOUT, smtp_factory=smtplib.SMTP):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender
+        self.recipients = [address.strip() for address in recipients if address.strip()]
+        self.use_starttls = use_starttls
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.idle_timeout = idle_timeout
+        self.smtp_factory = smtp_factory
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._retry_heap = []  # (due time, sequence, email)
+        self._retry_sequence = 0
+        self._retry_condition = threading.Condition()
+        self._threads = []
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+
+        self.dead_letters = deque(maxlen=EMAIL_DEAD_LETTER_SIZE)
+        self.sent = 0
+        self.failed_attempts = 0
+        self.dropped = 0
+        self.connections_opened = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+    @property
+    def configured(self):
+        return bool(self.server and self.sender and self.recipients)
+
+    def start(self):
+        """Start the worker pool and the retry scheduler"""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"email-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._retry_loop, name="email-retry", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        logger.info(f"Started {self.workers} email delivery workers")
+
+    def enqueue(self, subject, body):
+        """Queue an email for delivery without blocking, return False if it was not accepted"""
+        if not self.configured:
+            logger.warning("SMTP configuration incomplete. Cannot send email.")
+            return False
+
+        email = OutgoingEmail(subject, body)
+        try:
+            self._queue.put_nowait(email)
+            return True
+        except queue.Full:
+            email.last_error = "Delivery queue full"
+            self._dead_letter(email)
+            with self._stats_lock:
+                self.dropped += 1
+            logger.error(f"Email queue full, dropped alert email: {subject}")
+            return False
+
+    def connect(self):
+        """Open and authenticate a new SMTP connection"""
+        connection = self.smtp_factory(self.server, self.port, timeout=SMTP_TIMEOUT)
+        if self.use_starttls:
+            connection.starttls()
+        if self.username:
+            connection.login(self.username, self.password)
+        with self._stats_lock:
+            self.connections_opened += 1
+        return connection
+
+    def build_message(self, email):
+        msg = MIMEMultipart()
+        msg['From'] = self.sender
+        msg['To'] = ', '.join(self.recipients)
+        msg['Subject'] = email.subject
+        msg.attach(MIMEText(email.body, 'plain'))
+        return msg
+
+    def _worker(self):
+        session = SMTPSession(self)
+        while True:
+            try:
+                email = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                session.close_if_idle(self.idle_timeout)
+                continue
+
+            with self._stats_lock:
+                self._in_flight += 1
+            try:
+                self._deliver(session, email)
+            finally:
+                with self._stats_lock:
+                    self._in_flight -= 1
+                self._queue.task_done()
+
+    def _deliver(self, session, email):
+        email.attempts += 1
+        started = time.perf_counter()
+        try:
+            session.send(self.build_message(email))
+        except Exception as e:
+            SMTP_SEND_SECONDS.observe(time.perf_counter() - started, 'failed')
+            session.close()
+            email.last_error = str(e)
+            with self._stats_lock:
+                self.failed_attempts += 1
+
+            if email.attempts >= self.max_attempts:
+                logger.error(f"Giving up on email after {email.attempts} attempts: {email.subject}: {e}")
+                self._dead_letter(email)
+            else:
+                delay = min(self.retry_delay * 2 ** (email.attempts - 1), EMAIL_RETRY_MAX_DELAY)
+                logger.warning(f"Failed to send email (attempt {email.attempts}), retrying in {delay:.0f}s: {e}")
+                self._schedule_retry(email, delay)
+            return
+
+        SMTP_SEND_SECONDS.observe(time.perf_counter() - started, 'sent')
+        latency = time.time() - email.enqueued_at
+        with self._stats_lock:
+            self.sent += 1
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+            self.total_latency += latency
+        logger.info(f"Email alert sent: {email.subject}")
+
+    def _schedule_retry(self, email, delay):
+        with self._retry_condition:
+            self._retry_sequence += 1
+            heapq.heappush(self._retry_heap, (time.monotonic() + delay, self._retry_sequence, email))
+            self._retry_condition.notify()
+
+    def _retry_loop(self):
+        while True:
+            with self._retry_condition:
+                while not self._retry_heap:
+                    self._retry_condition.wait()
+                due, _, email = self._retry_heap[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._retry_condition.wait(wait)
+                    continue
+                heapq.heappop(self._retry_heap)
+
+            try:
+                self._queue.put_nowait(email)
+            except queue.Full:
+                email.last_error = "Delivery queue full"
+                self._dead_letter(email)
+
+    def _dead_letter(self, email):
+        self.dead_letters.append(email)
+
+    def wait_idle(self, timeout=None):
+        """Block until the queue, the retries and the workers are idle, return False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._retry_condition:
+                retries = len(self._retry_heap)
+            with self._stats_lock:
+                in_flight = self._in_flight
+            if not retries and not in_flight and self._queue.empty():
+                return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+
+    def stats(self):
+        """Queue depth, delivery counters and enqueue-to-sent latency"""
+        with self._retry_condition:
+            retries = len(self._retry_heap)
+        with self._stats_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'retry_pending': retries,
+                'in_flight': self._in_flight,
+                'sent': self.sent,
+                'failed_attempts': self.failed_attempts,
+                'dropped': self.dropped,
+                'dead_letters': len(self.dead_letters),
+                'connections_opened': self.connections_opened,
+                'last_latency_seconds': round(self.last_latency, 3),
+                'max_latency_seconds': round(self.max_latency, 3),
+                'avg_latency_seconds': round(self.total_latency / self.sent, 3) if self.sent else 0.0
+            }
@@ -0,0 +1,114 @@
+import os
+import json
+import queue
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+STREAM_BACKLOG = int(os.environ.get('STREAM_BACKLOG', '256'))  # events kept for Last-Event-ID resume
+STREAM_CLIENT_QUEUE = int(os.environ.get('STREAM_CLIENT_QUEUE', '64'))  # pending events per client
+STREAM_HEARTBEAT = int(os.environ.get('STREAM_HEARTBEAT', '15'))  # seconds
+
+
+def format_event(event_id, event, data):
+    """Encode one Server-Sent Event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return ("\n".join(lines) + "\n\n").encode('utf-8')
+
+
+RESYNC_EVENT = format_event(None, 'resync', {})
+
+
+class Subscription:
+    """One connected stream client with its own bounded queue of encoded events"""
+
+    def __init__(self, queue_size):
+        self.queue = queue.Queue(maxsize=queue_size)
+        # Set by the broadcaster when the client fell behind and events were dropped
+        self.overflowed = False
+
+    def offer(self, encoded):
+        """Queue an event without blocking, coalescing into a resync when full"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(encoded)
+        except queue.Full:
+            self.overflowed = True
+
+    def iter_events(self, heartbeat_data, heartbeat=STREAM_HEARTBEAT):
+        """Yield encoded events forever, sending a heartbeat when idle"""
+        while True:
+            if self.overflowed:
+                # The client is too slow: drop what it missed and tell it to resync
+                while True:
+                    try:
+                        self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                self.overflowed = False
+                yield RESYNC_EVENT
+                continue
+
+            try:
+                yield self.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield format_event(None, 'heartbeat', heartbeat_data())
+
+
+class EventBroadcaster:
+    """Fan-out of monitor events to Server-Sent Events clients
+
+    publish() never blocks: every client has a bounded queue and a client that
+    cannot keep up is switched to a single resync event instead of slowing
+    down the monitor thread. A bounded backlog lets reconnecting clients
+    resume from their Last-Event-ID.
+    """
+
+    def __init__(self, backlog=STREAM_BACKLOG, queue_size=STREAM_CLIENT_QUEUE):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._backlog = deque(maxlen=backlog)  # (event id, encoded event)
+        self._subscribers = set()
+
+    def publish(self, event_id, event, data):
+        """Send an event to every connected client"""
+        encoded = format_event(event_id, event, data)
+        with self._lock:
+            self._backlog.append((event_id, encoded))
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.offer(encoded)
+
+    def subscribe(self, last_event_id=None):
+        """Register a client, replaying the events after last_event_id if still kept"""
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            if last_event_id is not None:
+                if self._backlog and self._backlog[0][0] - 1 <= last_event_id <= self._backlog[-1][0]:
+                    for event_id, encoded in self._backlog:
+                        if event_id > last_event_id:
+                            subscription.offer(encoded)
+                else:
+                    # Missed events are no longer kept (or the id is from before a restart)
+                    subscription.overflowed = True
+            self._subscribers.add(subscription)
+        logger.info(f"Stream client connected ({len(self._subscribers)} connected)")
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+        logger.info(f"Stream client disconnected ({len(self._subscribers)} connected)")
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
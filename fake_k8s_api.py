@@ -0,0 +1,462 @@
+"""Local fake Kubernetes API server backed by a SyntheticCluster
+
+Serves the node and pod endpoints the monitor uses, so the real client,
+HTTP, JSON and deserialization paths can be load tested without a cluster:
+
+    GET /api/v1/nodes
+    GET /api/v1/pods
+    GET /api/v1/namespaces/<namespace>/pods
+
+Lists support limit/continue paging over a consistent snapshot (an expired
+continue token answers 410), watches (watch=1) stream the changes after a
+resourceVersion and answer an ERROR event with code 410 when it is older
+than the kept history. Label and field selectors are ignored. Latency and
+server errors can be injected, and the cluster changes through churn in
+the background or the /fake/ control endpoints:
+
+    POST /fake/step?churn=0.01     one interval of churn
+    POST /fake/node-loss?count=10  nodes stop responding, their pods fail
+    POST /fake/bad-rollout?apps=5  every pod of some applications crash loops
+    POST /fake/recover             end the storms
+    POST /fake/expire              drop the watch history, open watches get 410
+    GET  /fake/stats               request counts
+
+    python fake_k8s_api.py --nodes 500 --pods 20000 --kubeconfig /tmp/fake.kubeconfig
+    KUBECONFIG=/tmp/fake.kubeconfig python main.py
+"""
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+import dataclasses
+from collections import deque, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+from mock_k8s_data import SyntheticCluster
+
+logger = logging.getLogger(__name__)
+
+# JSON names that are not the plain camelCase of the field name
+JSON_NAMES = {'pod_ip': 'podIP', 'image_id': 'imageID', 'container_id': 'containerID', 'boot_id': 'bootID',
+              '_continue': 'continue'}
+
+# Fields the kubernetes client requires but the mock classes do not model
+REQUIRED_FIELDS = {
+    'V1OwnerReference': lambda obj: {'apiVersion': 'apps/v1', 'uid': f"uid-{obj.name}", 'controller': True},
+    'V1NodeSystemInfo': lambda obj: {'kernelVersion': '6.1.0', 'kubeProxyVersion': obj.kubelet_version,
+                                     'machineID': f"machine-{obj.boot_id}", 'osImage': 'Ubuntu 22.04.4 LTS',
+                                     'systemUUID': f"uuid-{obj.boot_id}"},
+}
+
+# Number of list snapshots kept for continue tokens
+LIST_SNAPSHOTS = 8
+
+
+def _json_name(name):
+    if name in JSON_NAMES:
+        return JSON_NAMES[name]
+    head, *rest = name.split('_')
+    return head + ''.join(part.title() for part in rest)
+
+
+def to_json(obj):
+    """Turn a mock_k8s_data object into the JSON the API server would send"""
+    if dataclasses.is_dataclass(obj):
+        data = {}
+        for item in dataclasses.fields(obj):
+            value = getattr(obj, item.name)
+            if value is not None:
+                data[_json_name(item.name)] = to_json(value)
+        required = REQUIRED_FIELDS.get(type(obj).__name__)
+        if required is not None:
+            data.update(required(obj))
+        return data
+    if isinstance(obj, list):
+        return [to_json(item) for item in obj]
+    if isinstance(obj, dict):
+        return {key: to_json(value) for key, value in obj.items()}
+    return obj
+
+
+def status_json(code, reason, message):
+    return {"kind": "Status", "apiVersion": "v1", "metadata": {}, "status": "Failure",
+            "message": message, "reason": reason, "code": code}
+
+
+class FakeCluster:
+    """A SyntheticCluster with the resourceVersions, list snapshots and watch history of an API server
+
+    Every change of the cluster goes through change(), which compares the
+    resourceVersions of all objects before and after and appends ADDED,
+    MODIFIED and DELETED events to a bounded history. JSON of an object is
+    built once per resourceVersion.
+    """
+
+    def __init__(self, cluster, history=10_000):
+        self.cluster = cluster
+        self.lock = threading.Condition()
+        self.events = deque(maxlen=history)  # (resourceVersion int, kind, event type, object JSON)
+        self.resource_version = int(cluster._version)
+        self.history_start = self.resource_version  # watches from older resourceVersions get 410
+        self.generation = 0  # bumped by expire(), open watches of an older generation get 410
+        self._json = {}  # (kind, key) -> (resourceVersion, JSON)
+        self._snapshots = OrderedDict()  # (kind, resourceVersion) -> list of JSON
+        self._versions = self._current_versions()
+        self._build_nodes()
+
+    def _current_versions(self):
+        versions = {('nodes', name): version for name, (_, version) in self.cluster.node_states.items()}
+        versions.update((('pods', f"{pod.namespace}/{pod.name}"), pod.version) for pod in self.cluster.pods.values())
+        return versions
+
+    def _object_json(self, kind, key, version):
+        cached = self._json.get((kind, key))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        # Nodes are all built by _build_nodes()
+        data = dict(to_json(self.cluster.pod_object(self.cluster.pods[key.split('/', 1)[1]])), kind='Pod', apiVersion='v1')
+        self._json[(kind, key)] = (version, data)
+        return data
+
+    def _build_nodes(self):
+        # node_objects() builds every node anyway, they are few
+        for node in self.cluster.node_objects():
+            key = ('nodes', node.metadata.name)
+            if self._json.get(key, (None,))[0] != node.metadata.resource_version:
+                self._json[key] = (node.metadata.resource_version, dict(to_json(node), kind='Node', apiVersion='v1'))
+
+    def change(self, mutate, *args):
+        """Apply a SyntheticCluster method and record the resulting watch events, return its result"""
+        with self.lock:
+            result = mutate(*args)
+            versions = self._current_versions()
+            self._build_nodes()
+            changes = []
+            for key, version in versions.items():
+                previous = self._versions.get(key)
+                if previous != version:
+                    changes.append((int(version), key, 'ADDED' if previous is None else 'MODIFIED', version))
+            changes.sort()
+            for version, (kind, name), event_type, raw_version in changes:
+                self._append(version, kind, event_type, self._object_json(kind, name, raw_version))
+            self.resource_version = int(self.cluster._version)
+            for kind, name in self._versions.keys() - versions.keys():
+                self.resource_version += 1
+                cached = self._json.pop((kind, name), None)
+                namespace, _, short_name = name.rpartition('/')
+                data = cached[1] if cached else {"metadata": dict(name=short_name, **({"namespace": namespace} if namespace else {}))}
+                data = dict(data, metadata=dict(data['metadata'], resourceVersion=str(self.resource_version)))
+                self._append(self.resource_version, kind, 'DELETED', data)
+            # Deletions used versions the cluster does not know about
+            self.cluster._version = max(int(self.cluster._version), self.resource_version)
+            self._versions = versions
+            self.lock.notify_all()
+        return result
+
+    def _append(self, version, kind, event_type, data):
+        if len(self.events) == self.events.maxlen:
+            # The oldest event is dropped, watches from before it missed it
+            self.history_start = self.events[0][0]
+        self.events.append((version, kind, event_type, data))
+
+    def expire(self):
+        """Forget the watch history, like an API server restart or a compacted etcd"""
+        with self.lock:
+            self.events.clear()
+            self.history_start = self.resource_version
+            self.generation += 1
+            self.lock.notify_all()
+
+    def snapshot(self, kind):
+        """Start a list: (resourceVersion, items) of kind at this moment"""
+        with self.lock:
+            key = (kind, self.resource_version)
+            items = self._snapshots.get(key)
+            if items is None:
+                items = [self._object_json(kind_, name, version)
+                         for (kind_, name), version in self._versions.items() if kind_ == kind]
+                self._snapshots[key] = items
+                while len(self._snapshots) > LIST_SNAPSHOTS:
+                    self._snapshots.popitem(last=False)
+            return self.resource_version, items
+
+    def continued(self, kind, resource_version):
+        """The items of an earlier list, None when its snapshot is gone"""
+        with self.lock:
+            return self._snapshots.get((kind, resource_version))
+
+    def events_after(self, kind, resource_version, generation=None):
+        """Events of kind after resource_version, None when it is older than the history or expired"""
+        with self.lock:
+            if resource_version < self.history_start or generation not in (None, self.generation):
+                return None
+            return [(event_type, data) for version, event_kind, event_type, data in self.events
+                    if version > resource_version and event_kind == kind]
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    """Request handler of FakeApiServer, HTTP/1.1 with keep-alive like the API server"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _send_json(self, code, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        path = url.path.rstrip('/')
+        if path == '/fake/stats':
+            self._send_json(200, server.stats())
+            return
+        if path in ('/healthz', '/readyz', '/livez'):
+            self._send_json(200, {"status": "ok"})
+            return
+        if path == '/version':
+            self._send_json(200, {"major": "1", "minor": "29", "gitVersion": "v1.29.0-fake", "platform": "linux/amd64"})
+            return
+
+        namespace = None
+        if path == '/api/v1/nodes':
+            kind = 'nodes'
+        elif path == '/api/v1/pods':
+            kind = 'pods'
+        elif path.startswith('/api/v1/namespaces/') and path.endswith('/pods') and path.count('/') == 5:
+            kind, namespace = 'pods', unquote(path.split('/')[4])
+        else:
+            self._send_json(404, status_json(404, 'NotFound', f"the server could not find the requested resource {path}"))
+            return
+
+        watching = query.get('watch', '').lower() in ('1', 'true')
+        server.count('watches' if watching else 'lists', kind)
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_rate and random.random() < server.error_rate:
+            server.count('errors', kind)
+            self._send_json(500, status_json(500, 'InternalError', "injected server error"))
+            return
+        if watching:
+            self._watch(kind, namespace, query)
+        else:
+            self._list(kind, namespace, query)
+
+    def _list(self, kind, namespace, query):
+        fake = self.server.fake
+        token = query.get('continue')
+        if token:
+            version, _, offset = token.partition(':')
+            resource_version, offset = int(version), int(offset)
+            items = fake.continued(kind, resource_version)
+            if items is None:
+                self.server.count('expired', kind)
+                self._send_json(410, status_json(410, 'Expired', "The provided continue parameter is too old to display "
+                                                                  "a consistent list result."))
+                return
+        else:
+            (resource_version, items), offset = fake.snapshot(kind), 0
+        if namespace is not None:
+            items = [item for item in items if item['metadata']['namespace'] == namespace]
+        limit = int(query.get('limit') or 0)
+        end = min(len(items), offset + limit) if limit > 0 else len(items)
+        metadata = {"resourceVersion": str(resource_version)}
+        if end < len(items):
+            metadata['continue'] = f"{resource_version}:{end}"
+            metadata['remainingItemCount'] = len(items) - end
+        self._send_json(200, {"kind": "NodeList" if kind == 'nodes' else "PodList", "apiVersion": "v1",
+                              "metadata": metadata, "items": items[offset:end]})
+
+    def _watch(self, kind, namespace, query):
+        fake = self.server.fake
+        timeout = min(float(query.get('timeoutSeconds') or 1800), self.server.max_watch_seconds)
+        deadline = time.monotonic() + timeout
+        bookmarks = query.get('allowWatchBookmarks', '').lower() in ('1', 'true')
+        resource_version = int(query.get('resourceVersion') or 0) or fake.resource_version
+        generation = fake.generation
+        # One chunk per event, clients read the stream line by line as chunks arrive
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            while True:
+                with fake.lock:
+                    events = fake.events_after(kind, resource_version, generation)
+                    if events is not None and not events:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        fake.lock.wait(min(remaining, self.server.bookmark_interval))
+                        events = fake.events_after(kind, resource_version, generation)
+                    current = fake.resource_version
+                if events is None:
+                    self.server.count('gone', kind)
+                    self._event('ERROR', status_json(410, 'Expired', f"too old resource version: {resource_version} ({current})"))
+                    break
+                for event_type, data in events:
+                    if namespace is None or data['metadata'].get('namespace') == namespace:
+                        self._event(event_type, data)
+                if bookmarks and not events:
+                    self._event('BOOKMARK', {"kind": "Node" if kind == 'nodes' else "Pod", "apiVersion": "v1",
+                                             "metadata": {"resourceVersion": str(current)}})
+                resource_version = current
+                if time.monotonic() >= deadline:
+                    break
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _event(self, event_type, data):
+        line = json.dumps({"type": event_type, "object": data}).encode('utf-8') + b'\n'
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+
+    def do_POST(self):
+        server = self.server
+        fake = server.fake
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        cluster = fake.cluster
+        actions = {
+            '/fake/step': lambda: fake.change(cluster.step, float(query.get('churn', 0.01))),
+            '/fake/node-loss': lambda: fake.change(cluster.node_loss, int(query.get('count', 1))),
+            '/fake/bad-rollout': lambda: fake.change(cluster.bad_rollout, int(query.get('apps', 1))),
+            '/fake/recover': lambda: fake.change(cluster.recover),
+            '/fake/expire': fake.expire,
+        }
+        action = actions.get(url.path.rstrip('/'))
+        if action is None:
+            self._send_json(404, status_json(404, 'NotFound', f"unknown control endpoint {url.path}"))
+            return
+        try:
+            result = action()
+        except ValueError as e:
+            self._send_json(400, status_json(400, 'BadRequest', str(e)))
+            return
+        self._send_json(200, {"result": result, "resourceVersion": str(fake.resource_version)})
+
+
+class FakeApiServer(ThreadingHTTPServer):
+    """Threaded HTTP server of a FakeCluster
+
+    latency seconds are added to every API request, error_rate of them
+    answer 500. churn of the pods change every churn_interval seconds
+    while serve_forever() runs.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, fake, latency=0.0, error_rate=0.0, churn=0.0, churn_interval=10.0,
+                 max_watch_seconds=300.0, bookmark_interval=10.0):
+        super().__init__(address, FakeApiHandler)
+        self.fake = fake
+        self.latency = latency
+        self.error_rate = error_rate
+        self.churn = churn
+        self.churn_interval = churn_interval
+        self.max_watch_seconds = max_watch_seconds
+        self.bookmark_interval = bookmark_interval
+        self._counts = {}
+        self._counts_lock = threading.Lock()
+        self._churning = threading.Event()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name, kind):
+        with self._counts_lock:
+            self._counts[(name, kind)] = self._counts.get((name, kind), 0) + 1
+
+    def stats(self):
+        with self._counts_lock:
+            counts = dict(self._counts)
+        stats = {}
+        for (name, kind), value in counts.items():
+            stats.setdefault(name, {})[kind] = value
+        fake = self.fake
+        return dict(stats, resourceVersion=str(fake.resource_version), events=len(fake.events),
+                    nodes=len(fake.cluster.node_states), pods=len(fake.cluster.pods))
+
+    def serve_forever(self, poll_interval=0.5):
+        if self.churn > 0:
+            threading.Thread(target=self._churn, name='fake-api-churn', daemon=True).start()
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self._churning.set()
+
+    def _churn(self):
+        while not self._churning.wait(self.churn_interval):
+            changed, replaced = self.fake.change(self.fake.cluster.step, self.churn)
+            logger.debug(f"Churn: {changed} pods changed, {replaced} replaced")
+
+
+def start_server(cluster, host='127.0.0.1', port=0, history=10_000, **options):
+    """Serve a SyntheticCluster in a daemon thread, return the FakeApiServer (shutdown() stops it)"""
+    server = FakeApiServer((host, port), FakeCluster(cluster, history=history), **options)
+    threading.Thread(target=server.serve_forever, name='fake-api', daemon=True).start()
+    return server
+
+
+def write_kubeconfig(path, server_url, context='fake'):
+    """Write a kubeconfig whose current context points at the fake server"""
+    kubeconfig = {
+        "apiVersion": "v1",
+        "kind": "Config",
+        "clusters": [{"name": context, "cluster": {"server": server_url}}],
+        "users": [{"name": context, "user": {"token": "fake-token"}}],
+        "contexts": [{"name": context, "context": {"cluster": context, "user": context}}],
+        "current-context": context,
+    }
+    # JSON is valid YAML, so the kubernetes config loader reads it as is
+    with open(path, 'w') as kubeconfig_file:
+        json.dump(kubeconfig, kubeconfig_file, indent=2)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake Kubernetes API server backed by a SyntheticCluster")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--nodes', type=int, default=100)
+    parser.add_argument('--pods', type=int, default=5000)
+    parser.add_argument('--namespaces', type=int, default=50)
+    parser.add_argument('--apps', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every API request")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of API requests answered with 500")
+    parser.add_argument('--churn', type=float, default=0.0, help="share of the pods changed every --churn-interval")
+    parser.add_argument('--churn-interval', type=float, default=10.0)
+    parser.add_argument('--history', type=int, default=10_000, help="watch events kept, older resourceVersions get 410")
+    parser.add_argument('--max-watch-seconds', type=float, default=300.0)
+    parser.add_argument('--kubeconfig', help="write a kubeconfig pointing at the server to this path")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    cluster = SyntheticCluster(nodes=args.nodes, pods=args.pods, namespaces=args.namespaces, apps=args.apps, seed=args.seed)
+    server = FakeApiServer((args.host, args.port), FakeCluster(cluster, history=args.history),
+                           latency=args.latency, error_rate=args.error_rate, churn=args.churn,
+                           churn_interval=args.churn_interval, max_watch_seconds=args.max_watch_seconds)
+    if args.kubeconfig:
+        write_kubeconfig(args.kubeconfig, server.url)
+        logger.info(f"Wrote kubeconfig {args.kubeconfig}")
+    logger.info(f"Serving {args.nodes} nodes and {args.pods} pods on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
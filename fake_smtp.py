@@ -0,0 +1,185 @@
+"""Local fake SMTP server for testing email delivery without a mail relay
+
+Speaks enough ESMTP for smtplib (EHLO/HELO, AUTH PLAIN, MAIL, RCPT, DATA,
+RSET, NOOP, QUIT; no STARTTLS) and keeps every accepted message. Failures
+can be injected to exercise the delivery queue:
+
+    server.fail_data(2, 451)    the next 2 messages are answered 451 after DATA
+    server.drop_connections()   close every open connection from the server side
+
+    python fake_smtp.py --port 2525
+    SMTP_SERVER=127.0.0.1 SMTP_PORT=2525 SMTP_STARTTLS=false python main.py
+"""
+import time
+import logging
+import argparse
+import threading
+import socketserver
+from email import message_from_bytes
+
+logger = logging.getLogger(__name__)
+
+
+class ReceivedMessage:
+    """A message the server accepted"""
+    __slots__ = ('sender', 'recipients', 'data', 'received_at')
+
+    def __init__(self, sender, recipients, data):
+        self.sender = sender
+        self.recipients = recipients
+        self.data = data
+        self.received_at = time.monotonic()
+
+    @property
+    def subject(self):
+        return message_from_bytes(self.data)['Subject']
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    """One SMTP session"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+
+    def handle(self):
+        server = self.server
+        server.connection_opened(self.request)
+        try:
+            self.reply("220 fake-smtp ESMTP")
+            sender, recipients = None, []
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                command, _, argument = line.decode('utf-8', 'replace').rstrip('\r\n').partition(' ')
+                command = command.upper()
+                if command == 'EHLO':
+                    self.reply("250-fake-smtp")
+                    self.reply("250-AUTH PLAIN")
+                    self.reply("250 8BITMIME")
+                elif command == 'HELO':
+                    self.reply("250 fake-smtp")
+                elif command == 'AUTH':
+                    if ' ' not in argument:
+                        # Credentials follow on their own line
+                        self.reply("334 ")
+                        self.rfile.readline()
+                    self.reply("235 Authentication successful")
+                elif command == 'MAIL':
+                    sender, recipients = argument.partition(':')[2].strip(), []
+                    self.reply("250 OK")
+                elif command == 'RCPT':
+                    recipients.append(argument.partition(':')[2].strip())
+                    self.reply("250 OK")
+                elif command == 'DATA':
+                    self.reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = self._read_data()
+                    if data is None:
+                        return
+                    self.reply(server.accept(sender, recipients, data))
+                    sender, recipients = None, []
+                elif command in ('RSET', 'NOOP'):
+                    self.reply("250 OK")
+                elif command == 'QUIT':
+                    self.reply("221 Bye")
+                    return
+                else:
+                    self.reply("502 Command not implemented")
+        except OSError:
+            # Dropped by drop_connections() or the client
+            pass
+        finally:
+            server.connection_closed(self.request)
+
+    def _read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return None
+            if line in (b'.\r\n', b'.\n'):
+                return b''.join(lines)
+            # Undo the client's dot stuffing
+            lines.append(line[1:] if line.startswith(b'..') else line)
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    """Threaded SMTP server keeping the accepted messages in messages"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, FakeSMTPHandler)
+        self.messages = []
+        self.connections = 0  # sessions opened so far
+        self.data_attempts = []  # monotonic time of every DATA, accepted or failed
+        self._open = set()
+        self._failures = []  # reply codes for the next DATA commands
+        self._lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def connection_opened(self, sock):
+        with self._lock:
+            self.connections += 1
+            self._open.add(sock)
+
+    def connection_closed(self, sock):
+        with self._lock:
+            self._open.discard(sock)
+
+    def accept(self, sender, recipients, data):
+        """Keep a message, or answer with the next injected failure"""
+        with self._lock:
+            self.data_attempts.append(time.monotonic())
+            if self._failures:
+                code = self._failures.pop(0)
+                return f"{code} Injected failure"
+            self.messages.append(ReceivedMessage(sender, recipients, data))
+            return "250 OK: queued"
+
+    def fail_data(self, count, code=451):
+        """Answer the next count messages with code (4xx transient, 5xx permanent)"""
+        with self._lock:
+            self._failures.extend([code] * count)
+
+    def drop_connections(self):
+        """Close every open session from the server side, like a relay dropping idle clients"""
+        with self._lock:
+            sockets = list(self._open)
+        for sock in sockets:
+            try:
+                sock.shutdown(2)
+            except OSError:
+                pass
+
+
+def start_server(host='127.0.0.1', port=0):
+    """Serve in a daemon thread, return the FakeSMTPServer (shutdown() stops it)"""
+    server = FakeSMTPServer((host, port))
+    threading.Thread(target=server.serve_forever, name='fake-smtp', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake SMTP server for testing email delivery")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2525)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    server = FakeSMTPServer((args.host, args.port))
+    logger.info(f"Accepting mail on {args.host}:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"Received {len(server.messages)} messages")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+import os
+import logging
+import threading
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+from k8s_raw import list_raw, watch_raw
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+WATCH_TIMEOUT = int(os.environ.get('WATCH_TIMEOUT', '300'))  # seconds, server side watch timeout
+WATCH_RETRY_DELAY = int(os.environ.get('WATCH_RETRY_DELAY', '5'))  # seconds, wait after watch errors
+
+HTTP_STATUS_GONE = 410
+
+
+def object_key(obj):
+    """Return the cache key of a Kubernetes object (namespace/name or name), model or raw JSON dict"""
+    if obj.__class__ is dict:
+        metadata = obj['metadata']
+        namespace = metadata.get('namespace')
+        return f"{namespace}/{metadata['name']}" if namespace else metadata['name']
+    namespace = getattr(obj.metadata, 'namespace', None)
+    if namespace:
+        return f"{namespace}/{obj.metadata.name}"
+    return obj.metadata.name
+
+
+def resource_version_of(obj):
+    """Return the resourceVersion of an object, None for objects without one"""
+    if obj.__class__ is dict:
+        return obj['metadata'].get('resourceVersion')
+    return getattr(obj.metadata, 'resource_version', None)
+
+
+class ObjectStore:
+    """Thread-safe in-memory cache of Kubernetes objects keyed by namespace/name
+
+    Besides the objects themselves the store remembers which keys changed or
+    disappeared since the last call to drain_changes(), so consumers only need
+    to look at objects that actually changed.
+    """
+
+    def __init__(self, key_func=object_key):
+        self._key_func = key_func
+        self._lock = threading.Lock()
+        self._objects = {}
+        self._changed = set()
+        self._deleted = set()
+
+    def replace(self, objects, namespace=None):
+        """Replace the store content with the result of a (re)list
+
+        With a namespace only the objects of that namespace are replaced,
+        so informers of different namespaces can share one store.
+        """
+        new_objects = {self._key_func(obj): obj for obj in objects}
+        with self._lock:
+            if namespace is not None:
+                prefix = f"{namespace}/"
+                scoped = {key: obj for key, obj in self._objects.items() if key.startswith(prefix)}
+                others = {key: obj for key, obj in self._objects.items() if not key.startswith(prefix)}
+            else:
+                scoped, others = self._objects, {}
+            for key, obj in new_objects.items():
+                old = scoped.get(key)
+                if (old is None or resource_version_of(old) is None
+                        or resource_version_of(old) != resource_version_of(obj)):
+                    self._changed.add(key)
+                    self._deleted.discard(key)
+            for key in scoped.keys() - new_objects.keys():
+                self._changed.discard(key)
+                self._deleted.add(key)
+            others.update(new_objects)
+            self._objects = others
+
+    def upsert(self, obj):
+        """Add or update a single object"""
+        key = self._key_func(obj)
+        with self._lock:
+            self._objects[key] = obj
+            self._changed.add(key)
+            self._deleted.discard(key)
+
+    def delete(self, obj):
+        """Remove a single object"""
+        key = self._key_func(obj)
+        with self._lock:
+            if self._objects.pop(key, None) is not None:
+                self._deleted.add(key)
+            self._changed.discard(key)
+
+    def drain_changes(self):
+        """Return (changed objects, deleted keys) since the last call and reset them"""
+        with self._lock:
+            changed = [self._objects[key] for key in self._changed if key in self._objects]
+            deleted = list(self._deleted)
+            self._changed = set()
+            self._deleted = set()
+        return changed, deleted
+
+    def get(self, key):
+        """Return the cached object with this key, None if there is none"""
+        with self._lock:
+            return self._objects.get(key)
+
+    def list(self):
+        """Return a list of all cached objects"""
+        with self._lock:
+            return list(self._objects.values())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._objects)
+
+
+class Informer:
+    """List-then-watch loop that keeps an ObjectStore in sync with the API server
+
+    The informer lists the resource once, then follows a watch stream starting
+    at the list's resourceVersion. When the API server answers 410 Gone (our
+    resourceVersion is too old) the resource is listed again and the store is
+    resynced, which marks every changed or vanished object for the consumer.
+    """
+
+    def __init__(self, name, list_func, store=None, page_size=0, raw=False, **list_kwargs):
+        self.name = name
+        self.list_func = list_func
+        self.list_kwargs = list_kwargs
+        # Objects per list request of a (re)list, 0 lists everything at once
+        self.page_size = page_size
+        # Keep objects as parsed JSON dicts instead of client models
+        self.raw = raw
+        # Informers of single namespaces (namespace in list_kwargs) may share a store
+        self.store = store if store is not None else ObjectStore()
+        self.resource_version = None
+        self._watch = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """Do the initial list and start the watch thread, return False if listing failed"""
+        try:
+            self.relist()
+        except Exception as e:
+            logger.warning(f"Initial list for {self.name} informer failed: {e}")
+            return False
+
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-informer", daemon=True)
+        self._thread.start()
+        logger.info(f"Started {self.name} informer at resourceVersion {self.resource_version}")
+        return True
+
+    def stop(self):
+        """Stop the watch thread"""
+        self._stop_event.set()
+        if self._watch:
+            self._watch.stop()
+
+    def relist(self):
+        """List all objects, page by page, and resync the store"""
+        kwargs = dict(self.list_kwargs, limit=self.page_size) if self.page_size > 0 else self.list_kwargs
+        objects = []
+        response = self._list(**kwargs)
+        while True:
+            # Every page is served from the snapshot of the first one, watch from its resourceVersion
+            if self.raw:
+                objects.extend(response['items'])
+                resource_version = response['metadata'].get('resourceVersion')
+                token = response['metadata'].get('continue')
+            else:
+                objects.extend(response.items)
+                resource_version = response.metadata.resource_version
+                token = response.metadata._continue
+            response = None
+            if not token:
+                break
+            response = self._list(_continue=token, **kwargs)
+
+        self.store.replace(objects, namespace=self.list_kwargs.get('namespace'))
+        self.resource_version = resource_version
+        logger.info(f"Listed {len(objects)} objects for {self.name} informer")
+
+    def _list(self, **kwargs):
+        if self.raw:
+            return list_raw(self.list_func, **kwargs)
+        return self.list_func(**kwargs)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                if self.resource_version is None:
+                    self.relist()
+                self._watch_once()
+            except ApiException as e:
+                if e.status == HTTP_STATUS_GONE:
+                    logger.info(f"{self.name} watch expired (410 Gone), relisting")
+                    self.resource_version = None
+                else:
+                    logger.error(f"{self.name} watch failed: {e}")
+                    self._stop_event.wait(WATCH_RETRY_DELAY)
+            except Exception as e:
+                logger.error(f"{self.name} watch failed: {e}")
+                self._stop_event.wait(WATCH_RETRY_DELAY)
+
+    def _watch_once(self):
+        """Follow one watch request until the server closes it"""
+        if self.raw:
+            events = watch_raw(self.list_func, stop=self._stop_event,
+                               resource_version=self.resource_version,
+                               timeout_seconds=WATCH_TIMEOUT,
+                               allow_watch_bookmarks=True,
+                               **self.list_kwargs)
+            for event_type, obj in events:
+                self._apply(event_type, obj)
+            return
+
+        self._watch = watch.Watch()
+        for event in self._watch.stream(self.list_func,
+                                        resource_version=self.resource_version,
+                                        timeout_seconds=WATCH_TIMEOUT,
+                                        allow_watch_bookmarks=True,
+                                        **self.list_kwargs):
+            self._apply(event['type'], event['object'])
+            if self._stop_event.is_set():
+                self._watch.stop()
+
+    def _apply(self, event_type, obj):
+        version = resource_version_of(obj)
+        if version:
+            self.resource_version = version
+
+        if event_type in ('ADDED', 'MODIFIED'):
+            self.store.upsert(obj)
+        elif event_type == 'DELETED':
+            self.store.delete(obj)
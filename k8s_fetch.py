@@ -0,0 +1,231 @@
+import os
+import time
+import logging
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from informer import Informer
+from k8s_raw import list_raw, JSON_PARSER
+from profiling import TRACER
+
+logger = logging.getLogger(__name__)
+
+
+def _names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+# Configuration
+MONITOR_NAMESPACES = _names(os.environ.get('MONITOR_NAMESPACES', ''))  # only these namespaces, empty monitors all
+EXCLUDE_NAMESPACES = _names(os.environ.get('EXCLUDE_NAMESPACES', ''))  # namespaces never listed
+POD_LABEL_SELECTOR = os.environ.get('POD_LABEL_SELECTOR', '')  # e.g. 'app.kubernetes.io/component!=batch'
+POD_FIELD_SELECTOR = os.environ.get('POD_FIELD_SELECTOR', '')  # e.g. 'status.phase!=Succeeded'
+NODE_LABEL_SELECTOR = os.environ.get('NODE_LABEL_SELECTOR', '')
+NAMESPACE_FETCH_WORKERS = int(os.environ.get('NAMESPACE_FETCH_WORKERS', '4'))  # concurrent per-namespace pod lists
+LIST_PAGE_SIZE = int(os.environ.get('LIST_PAGE_SIZE', '500'))  # objects per list request, 0 lists everything at once
+RAW_POD_JSON = os.environ.get('RAW_POD_JSON', 'false').lower() == 'true'  # parse pod lists as plain JSON, no client models
+
+
+def continue_token(response):
+    if response.__class__ is dict:
+        return response.get('metadata', {}).get('continue')
+    metadata = getattr(response, 'metadata', None)
+    return getattr(metadata, '_continue', None)
+
+
+class Listing:
+    """Iterates a list handed out page by page, stopping instead of raising when a later page fails
+
+    Any error of the list (an expired continue token, a dropped connection,
+    a page that is not valid JSON) ends the iteration and is kept in error,
+    so the objects of the earlier pages are still evaluated and the caller
+    knows the list is incomplete.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.error = None
+
+    @property
+    def complete(self):
+        return self.error is None
+
+    def __iter__(self):
+        iterator = iter(self.items)
+        while True:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            except Exception as e:
+                self.error = e
+                return
+            yield item
+
+
+class ResourceFetcher:
+    """Lists the nodes and pods to monitor, filtered by the API server
+
+    Label and field selectors are sent with every list and watch request,
+    so filtered objects are never transferred or deserialized. Excluded
+    namespaces become metadata.namespace!= field selectors of the cluster
+    wide pod list. With an include list every namespace is listed on its
+    own, NAMESPACE_FETCH_WORKERS at a time.
+
+    Lists are paged with limit/continue and handed out as iterators, so
+    only the page being evaluated (plus the first pages of the namespaces
+    fetched ahead) is in memory, whatever the size of the cluster.
+
+    With raw_pods the pod lists skip the kubernetes client models and
+    hand out the parsed JSON dicts (see k8s_raw), which PodRecord.from_object
+    reads directly.
+    """
+
+    def __init__(self, core_v1, namespaces=MONITOR_NAMESPACES, exclude_namespaces=EXCLUDE_NAMESPACES,
+                 pod_label_selector=POD_LABEL_SELECTOR, pod_field_selector=POD_FIELD_SELECTOR,
+                 node_label_selector=NODE_LABEL_SELECTOR, workers=NAMESPACE_FETCH_WORKERS,
+                 page_size=LIST_PAGE_SIZE, raw_pods=RAW_POD_JSON):
+        self.core_v1 = core_v1
+        self.exclude_namespaces = list(exclude_namespaces)
+        self.namespaces = [namespace for namespace in namespaces if namespace not in self.exclude_namespaces]
+        self.pod_label_selector = pod_label_selector
+        self.pod_field_selector = pod_field_selector
+        self.node_label_selector = node_label_selector
+        self.workers = max(1, workers)
+        self.page_size = page_size
+        self.raw_pods = raw_pods
+        self._executor = None
+        # Seconds the last iteration of each resource spent waiting for the API server
+        self.list_seconds = {'nodes': 0.0, 'pods': 0.0}
+        # Seconds the evaluation waited for pages fetched ahead by the asyncio engine, None when it lists itself
+        self.wait_seconds = {'nodes': None, 'pods': None}
+        if self.namespaces or self.exclude_namespaces or pod_label_selector or pod_field_selector or node_label_selector:
+            logger.info(f"Monitoring {', '.join(self.namespaces) or 'all namespaces'}"
+                        f"{' except ' + ', '.join(self.exclude_namespaces) if self.exclude_namespaces and not self.namespaces else ''}"
+                        f" (pod labels: {pod_label_selector or '-'}, pod fields: {pod_field_selector or '-'}, "
+                        f"node labels: {node_label_selector or '-'})")
+        if raw_pods:
+            logger.info(f"Reading pods as raw JSON ({JSON_PARSER})")
+
+    def node_list_kwargs(self):
+        return {'label_selector': self.node_label_selector} if self.node_label_selector else {}
+
+    def pod_list_kwargs(self, all_namespaces=True):
+        """Selectors of a pod list or watch request"""
+        field_selectors = [self.pod_field_selector] if self.pod_field_selector else []
+        if all_namespaces:
+            field_selectors.extend(f"metadata.namespace!={namespace}" for namespace in self.exclude_namespaces)
+
+        kwargs = {}
+        if self.pod_label_selector:
+            kwargs['label_selector'] = self.pod_label_selector
+        if field_selectors:
+            kwargs['field_selector'] = ','.join(field_selectors)
+        return kwargs
+
+    def iter_nodes(self):
+        """Iterate over the monitored nodes, page by page"""
+        return self._started(self.node_pages())
+
+    def iter_pods(self):
+        """Iterate over the monitored pods, page by page and per namespace when namespaces are configured"""
+        return self._started(self.pod_pages())
+
+    def node_pages(self):
+        """Generator of the pages (lists of nodes) of the monitored nodes, each fetched when it is reached"""
+        self.list_seconds['nodes'] = 0.0
+        return self._pages('nodes', self.core_v1.list_node, self.node_list_kwargs())
+
+    def pod_pages(self):
+        """Generator of the pages of the monitored pods"""
+        self.list_seconds['pods'] = 0.0
+        if not self.namespaces:
+            return self._pages('pods', self.core_v1.list_pod_for_all_namespaces, self.pod_list_kwargs())
+        return self._namespace_pages(self.pod_list_kwargs(all_namespaces=False))
+
+    def list_nodes(self):
+        return list(self.iter_nodes())
+
+    def list_pods(self):
+        return list(self.iter_pods())
+
+    def _started(self, pages):
+        """Fetch the first page right away, so an unreachable API server fails this call and not the loop"""
+        first = next(pages, None)
+        return itertools.chain.from_iterable(itertools.chain([first] if first is not None else [], pages))
+
+    def _call(self, resource, list_func, **kwargs):
+        if resource == 'pods' and self.raw_pods:
+            return list_raw(list_func, **kwargs)
+        return list_func(**kwargs)
+
+    def _list(self, resource, list_func, **kwargs):
+        started = time.perf_counter()
+        try:
+            with TRACER.span('list', resource=resource, namespace=kwargs.get('namespace')):
+                return self._call(resource, list_func, **kwargs)
+        finally:
+            self.list_seconds[resource] += time.perf_counter() - started
+
+    def _pages(self, resource, list_func, kwargs, response=None):
+        """Yield the items of a list request page by page, following the continue token
+
+        An expired continue token (410 Gone) fails the iteration; the
+        monitor cycle is abandoned and the next one lists from the start.
+        """
+        if self.page_size > 0:
+            kwargs = dict(kwargs, limit=self.page_size)
+        if response is None:
+            response = self._list(resource, list_func, **kwargs)
+        while True:
+            token = continue_token(response)
+            items = response['items'] if response.__class__ is dict else response.items
+            # Only the page being consumed stays referenced
+            response = None
+            yield items
+            items = None
+            if not token:
+                return
+            response = self._list(resource, list_func, _continue=token, **kwargs)
+
+    def _namespace_pages(self, kwargs):
+        """Pages of the configured namespaces in order, the first pages of the next namespaces fetched ahead"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=min(self.workers, len(self.namespaces)),
+                                                thread_name_prefix="pod-list")
+        first_page_kwargs = dict(kwargs, limit=self.page_size) if self.page_size > 0 else kwargs
+        namespaces = iter(self.namespaces)
+        pending = deque()
+
+        def fetch_ahead():
+            namespace = next(namespaces, None)
+            if namespace is not None:
+                pending.append((namespace, self._executor.submit(
+                    self._call, 'pods', self.core_v1.list_namespaced_pod, namespace=namespace, **first_page_kwargs)))
+
+        for _ in range(self.workers):
+            fetch_ahead()
+        while pending:
+            namespace, future = pending.popleft()
+            started = time.perf_counter()
+            # A failed namespace fails the whole iteration
+            pages = self._pages('pods', self.core_v1.list_namespaced_pod, dict(kwargs, namespace=namespace),
+                                future.result())
+            self.list_seconds['pods'] += time.perf_counter() - started
+            future = None
+            fetch_ahead()
+            yield from pages
+
+    def node_informer(self):
+        return Informer("node", self.core_v1.list_node, page_size=self.page_size, **self.node_list_kwargs())
+
+    def pod_informers(self, store):
+        """Informers filling one shared store with the monitored pods, one per namespace when namespaces are configured"""
+        if not self.namespaces:
+            return [Informer("pod", self.core_v1.list_pod_for_all_namespaces, store=store, page_size=self.page_size,
+                             raw=self.raw_pods, **self.pod_list_kwargs())]
+
+        kwargs = self.pod_list_kwargs(all_namespaces=False)
+        return [Informer(f"pod/{namespace}", self.core_v1.list_namespaced_pod, store=store, page_size=self.page_size,
+                         raw=self.raw_pods, namespace=namespace, **kwargs)
+                for namespace in self.namespaces]
@@ -1,16 +1,28 @@
 import os
 import time
 import logging
-import smtplib
 import threading
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from kubernetes import client, config, watch
+import itertools
+from kubernetes import client
 from kubernetes.client.rest import ApiException
+from informer import ObjectStore, object_key, resource_version_of
+from clusters import parse_clusters, scoped_alert_key, split_alert_key, ClusterConfig
+from k8s_fetch import ResourceFetcher, Listing
+from async_monitor import AsyncMonitorEngine
+from snapshot import SnapshotStore
+from event_stream import EventBroadcaster
+from email_queue import EmailDeliveryQueue
+from alert_grouping import AlertGrouper, AlertNotification
+from pod_evaluation import PodRecord, ShardedPodEvaluator, evaluate_pod_record, record_fingerprint, EVAL_WORKERS
+from timer_wheel import TimerWheel
+from profiling import TRACER
+from leader_election import create_coordinator
+from metrics import REGISTRY, CYCLE_SECONDS, CYCLE_PHASE_SECONDS, ALERT_CHECK_SECONDS, ALERTS, OBJECTS_EVALUATED
 
 # Import database models
 try:
-    from models import db, Alert, app
+    from models import Alert, app
+    from alert_store import AlertUnitOfWork, ActiveAlertIndex, alert_revisions
     DB_AVAILABLE = True
     logger = logging.getLogger(__name__)
     logger.info("Database available for alert persistence")
@@ -38,6 +50,10 @@ except ImportError:
 # Configuration
 POLL_INTERVAL = int(os.environ.get('POLL_INTERVAL', '60'))  # seconds
 ALERT_COOL_DOWN = int(os.environ.get('ALERT_COOL_DOWN', '300'))  # seconds, avoid alert spam
+MONITOR_MODE = os.environ.get('MONITOR_MODE', 'poll')  # 'poll' or 'informer' (list once, then watch)
+MONITOR_ENGINE = os.environ.get('MONITOR_ENGINE', 'thread')  # 'thread' or 'asyncio' (poll mode, overlaps API requests)
+INFORMER_SYNC_INTERVAL = int(os.environ.get('INFORMER_SYNC_INTERVAL', '5'))  # seconds between change evaluations
+SKIP_UNCHANGED = os.environ.get('SKIP_UNCHANGED', 'true').lower() in ('1', 'true', 'yes')  # skip objects that did not change since the last cycle
 
 # SMTP Configuration
 SMTP_SERVER = os.environ.get('SMTP_SERVER')
@@ -48,64 +64,120 @@ EMAIL_FROM = os.environ.get('EMAIL_FROM')
 EMAIL_TO = os.environ.get('EMAIL_TO', '').split(',')
 EMAIL_SUBJECT_PREFIX = os.environ.get('EMAIL_SUBJECT_PREFIX', '[K8s Alert]')
 
+# Alert emails are delivered asynchronously by a pool of SMTP workers
+email_queue = EmailDeliveryQueue(SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, EMAIL_FROM, EMAIL_TO)
+
+
+def deliver_email(subject, message):
+    """Queue an email with the configured subject prefix"""
+    return email_queue.enqueue(f"{EMAIL_SUBJECT_PREFIX} {subject}", message)
+
+
+def node_fingerprint(node):
+    """Hash of the node fields the evaluation and the dashboard use, for nodes without a resourceVersion"""
+    status = node.status
+    capacity = status.capacity or {}
+    return hash((
+        tuple((condition.type, condition.status, condition.reason, condition.message, str(condition.last_transition_time))
+              for condition in status.conditions or ()),
+        tuple(sorted(node.metadata.labels or ())),
+        status.node_info.kubelet_version,
+        capacity.get("cpu"),
+        capacity.get("memory")
+    ))
+
+
+# Alerts are grouped by namespace/node/owner/reason before delivery to avoid email storms
+alert_grouper = AlertGrouper(deliver_email)
+
 # Alert state tracking
 # Do not use sent_alerts for UI updates to avoid data format inconsistencies
-# sent_alerts is only for tracking cool down periods
+# sent_alerts is only for tracking cool down periods, keyed by cluster scoped alert keys
 sent_alerts = {}  
-node_statuses = {}
-pod_statuses = {}
 
 class KubernetesMonitor:
-    def __init__(self):
-        self.setup_kubernetes_client()
+    """Monitors the nodes and pods of one cluster in its own thread
+
+    Alerts, the database, email delivery and the dashboard snapshot are
+    shared with the monitors of the other clusters through the registry.
+    """
+
+    def __init__(self, cluster=None, registry=None):
+        self.cluster = cluster or ClusterConfig()
+        self.cluster_name = self.cluster.name
+        self.log_prefix = f"[{self.cluster_name}] " if self.cluster_name else ""
+        # cluster label of this monitor's metrics, empty for the default cluster
+        self.metrics_label = self.cluster_name or ""
+        self.registry = registry if registry is not None else MonitorRegistry(monitors=[self])
+        # Dashboard representations of the last seen nodes and pods
+        self.node_summaries = {}
+        self.pod_summaries = {}
+        # (nodes, pods) summaries of the last cycle, composed into the shared snapshot
+        self.published = ((), ())
+        # Alert writes of the running cycle, flushed in one transaction at its end
+        self.alert_writes = AlertUnitOfWork(self.registry.active_alerts) if DB_AVAILABLE else None
+        self.last_cycle_db_seconds = 0.0
+        self.node_statuses = {}
+        self.pod_statuses = {}  # pod key -> PodState
+        # Poll cycles evaluate pods in namespace shards (EVAL_WORKERS), workers own their pod statuses
+        self.pod_evaluator = ShardedPodEvaluator() if EVAL_WORKERS > 1 else None
+        # resourceVersion (or fingerprint) of every node and pod when it was last evaluated
+        self.node_versions = {}
+        self.pod_versions = {}
+        # Unchanged objects are skipped; these wake them up when an alert's cool down ends
+        self.node_timers = TimerWheel()
+        self.pod_timers = TimerWheel()
+        self.cycle_stats = {}
+        # The namespace shard ring the pod state was last filtered with
+        self.shard_ring = None
+        # Health of this cluster's monitor for /api/clusters
+        self.last_cycle_at = None
+        self.last_cycle_seconds = None
+        self.last_error = None
+        self.configured = self.setup_kubernetes_client()
         
     def setup_kubernetes_client(self):
-        """Set up the Kubernetes client based on the environment"""
-        try:
-            # When running in cluster
-            config.load_incluster_config()
-            logger.info("Loaded in-cluster configuration")
-        except config.ConfigException:
-            # When running outside of the cluster (for development)
-            try:
-                config.load_kube_config()
-                logger.info("Loaded kubeconfig file")
-            except config.ConfigException:
-                # For local development/demo, use mock data
-                logger.warning("Could not configure kubernetes client, using mock data mode")
-                # We'll continue without raising an exception
-
-        # Initialize API clients
-        self.core_v1 = client.CoreV1Api()
-        self.apps_v1 = client.AppsV1Api()
-    
-    def send_email_alert(self, subject, message):
-        """Send an email alert"""
-        if not all([SMTP_SERVER, SMTP_USERNAME, SMTP_PASSWORD, EMAIL_FROM, EMAIL_TO]):
-            logger.warning("SMTP configuration incomplete. Cannot send email.")
-            return False
-        
+        """Set up the Kubernetes client of this cluster, return False if its configuration failed"""
         try:
-            msg = MIMEMultipart()
-            msg['From'] = EMAIL_FROM
-            msg['To'] = ', '.join(EMAIL_TO)
-            msg['Subject'] = f"{EMAIL_SUBJECT_PREFIX} {subject}"
-            
-            msg.attach(MIMEText(message, 'plain'))
-            
-            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-                server.starttls()
-                server.login(SMTP_USERNAME, SMTP_PASSWORD)
-                server.send_message(msg)
-                
-            logger.info(f"Email alert sent: {subject}")
-            return True
+            api_client = self.cluster.api_client()
         except Exception as e:
-            logger.error(f"Failed to send email: {str(e)}")
+            logger.error(f"Could not configure kubernetes client for cluster {self.cluster_name}: {e}")
+            self.last_error = str(e)
             return False
-    
+
+        # Initialize API clients, each cluster has its own connection pool
+        self.core_v1 = client.CoreV1Api(api_client)
+        self.apps_v1 = client.AppsV1Api(api_client)
+        # Namespace scoping and selectors of the node and pod lists
+        self.fetcher = ResourceFetcher(self.core_v1)
+        self.last_error = None
+        return True
+
+    def describe(self):
+        return f"cluster {self.cluster_name}" if self.cluster_name else "Kubernetes"
+
+    def alert_key(self, alert_key):
+        """Scope an alert key to this cluster"""
+        return scoped_alert_key(self.cluster_name, alert_key)
+
+    def send_email_alert(self, subject, message, alert_key=None, node=None, owner=None):
+        """Hand an email alert to the grouping stage, the monitor loop never waits for SMTP"""
+        if self.cluster_name:
+            subject = f"[{self.cluster_name}] {subject}"
+        if alert_key is None:
+            return deliver_email(subject, message)
+        parts = split_alert_key(alert_key)[1].split(':')
+        ALERTS.inc(self.metrics_label, parts[0], parts[-1])
+        return alert_grouper.submit(AlertNotification.from_alert_key(alert_key, subject, message, node=node, owner=owner))
+
+    @ALERT_CHECK_SECONDS.time()
+    @TRACER.traced('check_can_send_alert')
     def check_can_send_alert(self, alert_key):
         """Check if we should send an alert or if we're in cool down period"""
+        # Another replica alerts on this resource
+        if not self.registry.alerts_on(split_alert_key(alert_key)[1].split(':', 1)[0]):
+            return False
+
         current_time = time.time()
         
         # Sık uyarıları engellemek için soğuma süresi kontrolü
@@ -116,11 +188,12 @@ class KubernetesMonitor:
         # Uyarı gönderim zamanını kaydet
         sent_alerts[alert_key] = current_time
         
-        # Veritabanı mevcutsa, uyarıyı veritabanına kaydet
+        # Veritabanı mevcutsa, uyarıyı bu döngünün yazma listesine ekle
         if DB_AVAILABLE:
             try:
                 # Parse alert key to get details
-                parts = alert_key.split(':')
+                cluster, unscoped_key = split_alert_key(alert_key)
+                parts = unscoped_key.split(':')
                 resource_type = parts[0]
                 resource_name = parts[1]
                 
@@ -135,565 +208,837 @@ class KubernetesMonitor:
                 
                 if 'Recovery' in status or 'ContainerRecovery' in status:
                     # İyileşme ise, ilgili uyarıları çözüldü olarak işaretle
-                    with app.app_context():
-                        # Query oluştur - Sadece belirli bir resource için
-                        query = Alert.query.filter(
-                            Alert.resource_type == resource_type,
-                            Alert.resource_name == pod_name,
-                            Alert.is_resolved == 0
-                        )
-                        
-                        # Namespace varsa filtreye ekle
-                        if namespace:
-                            query = query.filter(Alert.resource_namespace == namespace)
-                        
-                        # Alarmları getir
-                        existing_alerts = query.all()
-                        
-                        # Alarmları çözüldü olarak işaretle
-                        for alert in existing_alerts:
-                            alert.resolve()
-                        
-                        # Kaydetmeyi tamamla
-                        if existing_alerts:
-                            db.session.commit()
-                            logger.info(f"Marked {len(existing_alerts)} alerts as resolved for {resource_name}")
-                            
-                        # İyileşme bildirimi için yeni bir alarm oluştur
-                        recovery_alert = Alert(
-                            alert_key=alert_key,
-                            resource_type=resource_type,
-                            resource_name=pod_name,
-                            resource_namespace=namespace,
-                            status=status,
-                            message=f"{resource_type} '{pod_name}' has recovered from {status.replace('Recovery', '').replace('ContainerRecovery', '')} state at {time.strftime('%Y-%m-%d %H:%M:%S')}"
-                        )
-                        db.session.add(recovery_alert)
-                        db.session.commit()
-                        logger.info(f"Created recovery alert in database: {alert_key}")
+                    self.alert_writes.resolve_resource(resource_type, pod_name, namespace, cluster)
+                    
+                    # İyileşme bildirimi için yeni bir alarm oluştur
+                    self.alert_writes.add_alert(
+                        alert_key, resource_type, pod_name, namespace, status,
+                        f"{resource_type} '{pod_name}' has recovered from {status.replace('Recovery', '').replace('ContainerRecovery', '')} state at {time.strftime('%Y-%m-%d %H:%M:%S')}",
+                        cluster
+                    )
                 else:
-                    # Zaten çözülmüş bir alarm için yeni alarm göndermeyi engelle
-                    with app.app_context():
-                        # Son 1 saat içinde çözülmüş benzer bir alarm var mı kontrol et
-                        one_hour_ago = time.time() - 3600
-                        # SQLite için UNIX timestamp'ten datetime oluşturmak
-                        from sqlalchemy.sql import func
-                        one_hour_ago_dt = func.datetime(one_hour_ago, 'unixepoch')
-                        recent_resolved = Alert.query.filter(
-                            Alert.resource_type == resource_type,
-                            Alert.resource_name == pod_name,
-                            Alert.is_resolved == 1,
-                            Alert.resolved_at > one_hour_ago_dt
-                        )
-                        
-                        if namespace:
-                            recent_resolved = recent_resolved.filter(Alert.resource_namespace == namespace)
-                        
-                        # Eğer son bir saat içinde çözülmüş bir alarm varsa ve şimdi aynı sorun tekrar ortaya çıktıysa
-                        # bu yinelenen bir sorun olabilir, bu durumda uyarı göndermeye devam et
-                        
-                        # Aynı key ile aktif bir alarm zaten var mı kontrol et
-                        # Varsa yeni bir alarm oluşturmayız
-                        active_alert = Alert.query.filter(
-                            Alert.alert_key == alert_key,
-                            Alert.is_resolved == 0
-                        ).first()
-                        
-                        if not active_alert:
-                            # Yeni alarm
-                            alert = Alert(
-                                alert_key=alert_key,
-                                resource_type=resource_type,
-                                resource_name=pod_name,
-                                resource_namespace=namespace,
-                                status=status,
-                                message=f"Alert triggered for {resource_type} '{pod_name}' with status: {status} at {time.strftime('%Y-%m-%d %H:%M:%S')}"
-                            )
-                            db.session.add(alert)
-                            db.session.commit()
-                            logger.info(f"Saved alert to database: {alert_key}")
-                        else:
-                            logger.info(f"Alert already exists and is active: {alert_key}")
-                            # Aktif uyarı durumunda soğuma süresini sıfırla ama yeni uyarı oluşturma
-                            return False
+                    # Aynı key ile aktif bir alarm zaten var mı kontrol et
+                    # Varsa yeni bir alarm oluşturmayız
+                    if self.alert_writes.has_pending_alert(alert_key) or self.has_active_alert(alert_key):
+                        logger.info(f"Alert already exists and is active: {alert_key}")
+                        # Aktif uyarı durumunda soğuma süresini sıfırla ama yeni uyarı oluşturma
+                        return False
+                    
+                    # Yeni alarm
+                    self.alert_writes.add_alert(
+                        alert_key, resource_type, pod_name, namespace, status,
+                        f"Alert triggered for {resource_type} '{pod_name}' with status: {status} at {time.strftime('%Y-%m-%d %H:%M:%S')}",
+                        cluster
+                    )
             except Exception as e:
                 logger.error(f"Failed to save alert to database: {str(e)}")
         
         return True
     
-    def monitor_nodes(self):
-        """Monitor Kubernetes nodes for issues"""
+    def has_active_alert(self, alert_key):
+        """Check the active alert index for an alert with this key"""
+        active_alerts = self.registry.active_alerts
+        if not active_alerts.loaded:
+            # Loaded once, later cycles keep it in sync with their own writes
+            self.alert_writes.timed_query(active_alerts.load)
+        return active_alerts.has_key(alert_key)
+
+    @TRACER.traced('flush_alert_writes')
+    def flush_alert_writes(self):
+        """Write the alerts collected during this cycle in one transaction"""
+        writes = self.alert_writes
+        self.alert_writes = AlertUnitOfWork(self.registry.active_alerts) if DB_AVAILABLE else None
+        if not DB_AVAILABLE:
+            return
+        
+        try:
+            if writes.flush():
+                self.registry.mark_alerts_changed()
+        except Exception as e:
+            logger.error(f"Failed to save alerts to database: {e}")
+        self.last_cycle_db_seconds = writes.db_seconds
+        CYCLE_PHASE_SECONDS.observe(writes.db_seconds, self.metrics_label, 'database')
+    
+    @TRACER.traced('monitor_nodes')
+    def monitor_nodes(self, fetch=None):
+        """Monitor Kubernetes nodes for issues
+
+        fetch returns an iterable of the nodes, by default the fetcher's
+        iter_nodes(); the asyncio engine passes pages it fetches itself.
+        """
         try:
             # Aktif node'ları sakla
             active_nodes = set()
-            
+
+            started = time.perf_counter()
             try:
-                nodes = self.core_v1.list_node().items
+                # Listed page by page while the nodes are evaluated
+                nodes = (fetch or self.fetcher.iter_nodes)()
             except Exception as e:
-                logger.warning(f"Failed to get nodes from Kubernetes API: {e}")
+                logger.warning(f"Failed to get nodes from {self.describe()} API: {e}")
+                if self.cluster_name is not None:
+                    # A named cluster keeps its nodes and alerts until its API server answers again
+                    self.last_error = str(e)
+                    return
                 if MOCK_DATA_AVAILABLE:
                     nodes = get_mock_nodes()
                     logger.info("Using mock node data for monitoring")
                 else:
                     nodes = []
                     logger.error("No mock data available and Kubernetes API unreachable")
-            
+
+            nodes = Listing(nodes)
+            due = self.node_timers.advance(time.time())
+            previous_summaries = self.node_summaries
+            node_summaries = {}
+            evaluated = skipped = rechecked = 0
             for node in nodes:
                 node_name = node.metadata.name
-                node_status = "Ready"
-                
                 # Aktif node listesine ekle
                 active_nodes.add(node_name)
-                
-                # Check node conditions
-                for condition in node.status.conditions:
-                    if condition.type == "Ready" and condition.status != "True":
-                        node_status = "NotReady"
-                        
-                        # Check if we should send an alert
-                        alert_key = f"node:{node_name}:NotReady"
-                        # Ayrıntılı hata mesajı
-                        detailed_message = f"""
-                        Kubernetes Node Alert: {node_name} is NotReady
-                        
-                        Node: {node_name}
-                        Status: NotReady
-                        Reason: {condition.reason}
-                        Message: {condition.message}
-                        Last Transition: {condition.last_transition_time}
-                        """
-                        
-                        if self.check_can_send_alert(alert_key):
-                            # E-posta bildirimi gönder
-                            self.send_email_alert(f"Node {node_name} is NotReady", detailed_message)
-                            
-                            # Hata mesajını veritabanındaki uyarıda güncelle
-                            if DB_AVAILABLE:
-                                with app.app_context():
-                                    alert = Alert.query.filter_by(alert_key=alert_key, is_resolved=0).first()
-                                    if alert:
-                                        alert.message = f"Node NotReady: {condition.reason} - {condition.message}"
-                                        db.session.commit()
-                
-                # Update our node status record
-                previous_status = node_statuses.get(node_name)
-                node_statuses[node_name] = node_status
-                
-                # If node recovered, send recovery alert and resolve alerts
-                if previous_status == "NotReady" and node_status == "Ready":
-                    alert_key = f"node:{node_name}:Recovery"
-                    if self.check_can_send_alert(alert_key):
-                        message = f"""
-                        Kubernetes Node Recovery: {node_name} is Ready
-                        
-                        Node: {node_name}
-                        Status: Ready
-                        """
-                        self.send_email_alert(f"Node {node_name} recovered", message)
-                        
-                        # Alarmı çözme işlemi check_can_send_alert içinde yapılıyor
-            
-            # Silinmiş node'ları kontrol et ve alarmlarını çöz
-            if DB_AVAILABLE:
-                for old_node in list(node_statuses.keys()):
+                version = resource_version_of(node)
+                if version is None:
+                    version = node_fingerprint(node)
+                if SKIP_UNCHANGED and self.node_versions.get(node_name) == version and node_name in previous_summaries:
+                    if node_name not in due:
+                        node_summaries[node_name] = previous_summaries[node_name]
+                        skipped += 1
+                        continue
+                    rechecked += 1
+
+                self.evaluate_node(node)
+                self.node_versions[node_name] = version
+                node_summaries[node_name] = self.summarize_node(node)
+                evaluated += 1
+            if nodes.complete:
+                self.node_summaries = node_summaries
+
+                # Silinmiş node'ları kontrol et ve alarmlarını çöz
+                for old_node in list(self.node_statuses.keys()):
                     if old_node not in active_nodes:
-                        # Node artık mevcut değil, tüm alarmları çöz
-                        with app.app_context():
-                            # Mevcut alarmları bul
-                            existing_alerts = Alert.query.filter(
-                                Alert.resource_type == "node",
-                                Alert.resource_name == old_node,
-                                Alert.is_resolved == 0
-                            ).all()
-                            
-                            # Alarmları çözüldü olarak işaretle
-                            for alert in existing_alerts:
-                                alert.resolve()
-                            
-                            # Kaydetmeyi tamamla
-                            if existing_alerts:
-                                db.session.commit()
-                                logger.info(f"Marked {len(existing_alerts)} alerts as resolved for deleted node {old_node}")
-                        
-                        # Node durumunu takip listesinden kaldır
-                        node_statuses.pop(old_node, None)
-                        logger.info(f"Removed tracking for deleted node: {old_node}")
-            
-            logger.info(f"Monitored {len(nodes)} nodes")
+                        self.handle_deleted_node(old_node)
+            else:
+                # The nodes after the failed page were not seen, they keep their summaries and alerts
+                self.node_summaries = {**previous_summaries, **node_summaries}
+                self.list_failed('nodes', nodes.error)
+
+            listed = self.fetcher.list_seconds['nodes']
+            # With the asyncio engine the pages were listed ahead, only the wait for them held up the evaluation
+            waited = self.fetcher.wait_seconds['nodes']
+            elapsed = time.perf_counter() - started - (listed if waited is None else waited)
+            if waited is not None:
+                self.cycle_stats['node_wait_ms'] = round(waited * 1000, 1)
+            self.cycle_stats.update(nodes=evaluated + skipped, nodes_evaluated=evaluated, nodes_skipped=skipped,
+                                    nodes_rechecked=rechecked, node_list_ms=round(listed * 1000, 1),
+                                    node_evaluation_ms=round(elapsed * 1000, 1))
+            CYCLE_PHASE_SECONDS.observe(listed, self.metrics_label, 'node_list')
+            CYCLE_PHASE_SECONDS.observe(elapsed, self.metrics_label, 'node_evaluation')
+            OBJECTS_EVALUATED.inc(self.metrics_label, 'node', 'evaluated', amount=evaluated)
+            OBJECTS_EVALUATED.inc(self.metrics_label, 'node', 'skipped', amount=skipped)
+            logger.info(f"{self.log_prefix}Monitored {evaluated + skipped} nodes: {evaluated} evaluated ({rechecked} after a cool down), "
+                        f"{skipped} unchanged skipped in {elapsed * 1000:.0f} ms (listing {listed * 1000:.0f} ms)")
         except ApiException as e:
             logger.error(f"Error monitoring nodes: {e}")
-    
-    def monitor_pods(self):
-        """Monitor Kubernetes pods for issues"""
+
+    def list_failed(self, resource, error):
+        """A page after the first failed, the cycle evaluated only the objects listed before it"""
+        logger.warning(f"{self.log_prefix}Listing {resource} from {self.describe()} API failed part way, "
+                       f"skipping the deleted {resource} check this cycle: {error}")
+        if self.cluster_name is not None:
+            self.last_error = str(error)
+
+    def evaluate_node(self, node):
+        """Check a single node for issues and send alerts"""
+        node_name = node.metadata.name
+        node_status = "Ready"
+
+        # Check node conditions
+        for condition in node.status.conditions:
+            if condition.type == "Ready" and condition.status != "True":
+                node_status = "NotReady"
+
+                # Check if we should send an alert
+                alert_key = self.alert_key(f"node:{node_name}:NotReady")
+                # Ayrıntılı hata mesajı
+                detailed_message = f"""
+                Kubernetes Node Alert: {node_name} is NotReady
+
+                Node: {node_name}
+                Status: NotReady
+                Reason: {condition.reason}
+                Message: {condition.message}
+                Last Transition: {condition.last_transition_time}
+                """
+
+                if self.check_can_send_alert(alert_key):
+                    # E-posta bildirimi gönder
+                    self.send_email_alert(f"Node {node_name} is NotReady", detailed_message, alert_key)
+
+                    # Hata mesajını veritabanındaki uyarıda güncelle
+                    if DB_AVAILABLE:
+                        self.alert_writes.update_message(alert_key, f"Node NotReady: {condition.reason} - {condition.message}")
+
+        # Update our node status record
+        previous_status = self.node_statuses.get(node_name)
+        self.node_statuses[node_name] = node_status
+
+        # If node recovered, send recovery alert and resolve alerts
+        if previous_status == "NotReady" and node_status == "Ready":
+            alert_key = self.alert_key(f"node:{node_name}:Recovery")
+            if self.check_can_send_alert(alert_key):
+                message = f"""
+                Kubernetes Node Recovery: {node_name} is Ready
+
+                Node: {node_name}
+                Status: Ready
+                """
+                self.send_email_alert(f"Node {node_name} recovered", message, alert_key)
+
+                # Alarmı çözme işlemi check_can_send_alert içinde yapılıyor
+
+        self.schedule_recheck(self.node_timers, node_name,
+                              [self.alert_key(f"node:{node_name}:NotReady")] if node_status == "NotReady" else [])
+
+    def schedule_recheck(self, timers, resource_key, alert_keys):
+        """Evaluate an unchanged resource again once the cool down of one of its alerts ends
+
+        Until then every check_can_send_alert() call for these keys returns
+        False without side effects, so skipping the resource changes nothing.
+        Recoveries only follow a change and need no timer.
+        """
+        due = [sent_alerts.get(alert_key, 0) + ALERT_COOL_DOWN
+               for alert_key in alert_keys if not alert_key.endswith("Recovery")]
+        if due:
+            timers.schedule(resource_key, min(due))
+        else:
+            timers.cancel(resource_key)
+
+    def handle_deleted_node(self, node_name):
+        """Resolve the alerts of a node that no longer exists and stop tracking it"""
+        if DB_AVAILABLE and self.registry.alerts_on("node"):
+            # Node artık mevcut değil, tüm alarmları çöz
+            self.alert_writes.resolve_resource("node", node_name, cluster=self.cluster_name)
+
+        # Node durumunu takip listesinden kaldır
+        self.node_statuses.pop(node_name, None)
+        self.node_versions.pop(node_name, None)
+        self.node_timers.cancel(node_name)
+        logger.info(f"{self.log_prefix}Removed tracking for deleted node: {node_name}")
+
+    @TRACER.traced('monitor_pods')
+    def monitor_pods(self, fetch=None):
+        """Monitor Kubernetes pods for issues
+
+        Pods with the same resourceVersion (or record fingerprint, for pods
+        without one) as when they were last evaluated are skipped, unless
+        the cool down of one of their alerts has ended. fetch works like
+        monitor_nodes' fetch.
+        """
         try:
             # Aktif pod'ları takip etmek için
             active_pods = set()
-            
+
+            started = time.perf_counter()
             try:
-                pods = self.core_v1.list_pod_for_all_namespaces().items
+                # Listed page by page while the pods are evaluated, only one page is in memory
+                pods = (fetch or self.fetcher.iter_pods)()
             except Exception as e:
-                logger.warning(f"Failed to get pods from Kubernetes API: {e}")
+                logger.warning(f"Failed to get pods from {self.describe()} API: {e}")
+                if self.cluster_name is not None:
+                    self.last_error = str(e)
+                    return
                 if MOCK_DATA_AVAILABLE:
                     pods = get_mock_pods()
                     logger.info("Using mock pod data for monitoring")
                 else:
                     logger.error("No mock data available and Kubernetes API unreachable")
                     return
-            
+
+            pods = Listing(pods)
+            owns, _ = self.shard_filter()
+            due = self.pod_timers.advance(time.time())
+            previous_summaries = self.pod_summaries
+            pod_versions = self.pod_versions
+            pod_summaries = {}
+            changed = []  # (record, version) of the pods the shards evaluate
+            evaluated = skipped = rechecked = other_shards = 0
             for pod in pods:
-                pod_name = pod.metadata.name
-                namespace = pod.metadata.namespace
-                pod_key = f"{namespace}/{pod_name}"
-                
+                key = object_key(pod)
+                if owns is not None and not owns(key):
+                    other_shards += 1
+                    continue
                 # Aktif pod listesine ekle
-                active_pods.add(pod_key)
-                
-                # Skip monitoring specific system pods if needed
-                # if namespace == "kube-system" and any(pod_name.startswith(prefix) for prefix in ["calico-", "kube-proxy-"]):
-                #     continue
-                
-                phase = pod.status.phase
-                container_statuses = pod.status.container_statuses or []
-                
-                # Check for problematic pod phases
-                if phase in ["Failed", "Pending"]:
-                    alert_key = f"pod:{pod_key}:{phase}"
-                    
-                    # Ayrıntılı hata mesajı
-                    detailed_message = f"""
-                    Kubernetes Pod Alert: {pod_key} is in {phase} state
-                    
-                    Pod: {pod_name}
-                    Namespace: {namespace}
-                    Phase: {phase}
-                    Reason: {getattr(pod.status, 'reason', 'Not available')}
-                    Message: {getattr(pod.status, 'message', 'Not available')}
-                    """
-                    
-                    if self.check_can_send_alert(alert_key):
-                        # E-posta bildirimi gönder
-                        self.send_email_alert(f"Pod {pod_name} is {phase}", detailed_message)
-                        
-                        # Hata mesajını veritabanındaki uyarıda güncelle
-                        if DB_AVAILABLE:
-                            with app.app_context():
-                                alert = Alert.query.filter_by(alert_key=alert_key, is_resolved=0).first()
-                                if alert:
-                                    alert.message = f"Pod {phase}: {getattr(pod.status, 'reason', 'Unknown reason')} - {getattr(pod.status, 'message', 'No details')}"
-                                    db.session.commit()
-                
-                # Check for container restart issues
-                for container in container_statuses:
-                    container_name = container.name
-                    restart_count = container.restart_count
-                    
-                    if restart_count > 5:
-                        alert_key = f"pod:{pod_key}:{container_name}:restarts"
-                        if self.check_can_send_alert(alert_key):
-                            message = f"""
-                            Kubernetes Container Alert: {container_name} in pod {pod_key} has restarted {restart_count} times
-                            
-                            Pod: {pod_name}
-                            Namespace: {namespace}
-                            Container: {container_name}
-                            Restart Count: {restart_count}
-                            """
-                            self.send_email_alert(f"Container {container_name} has excessive restarts", message)
-                    
-                    # Konteyner durum kontrolü (Waiting durumundaysa)
-                    if (container.state.waiting and 
-                        hasattr(container.state.waiting, 'reason')):
-                        
-                        wait_reason = container.state.waiting.reason
-                        wait_message = getattr(container.state.waiting, 'message', 'No message')
-                        
-                        # Çeşitli bekleme durumlarını kontrol et
-                        if wait_reason in ["CrashLoopBackOff", "ImagePullBackOff", "ErrImagePull", 
-                                          "CreateContainerConfigError", "CreateContainerError"]:
-                            
-                            alert_key = f"pod:{pod_key}:{container_name}:{wait_reason}"
-                            
-                            # Ayrıntılı hata mesajı
-                            detailed_message = f"""
-                            Kubernetes Container Alert: {container_name} in pod {pod_key} is in {wait_reason}
-                            
-                            Pod: {pod_name}
-                            Namespace: {namespace}
-                            Container: {container_name}
-                            Status: {wait_reason}
-                            Message: {wait_message}
-                            """
-                            
-                            if self.check_can_send_alert(alert_key):
-                                # E-posta bildirimi gönder
-                                self.send_email_alert(f"Container {container_name} is in {wait_reason}", detailed_message)
-                                
-                                # Hata mesajını veritabanındaki uyarıda güncelle
-                                if DB_AVAILABLE:
-                                    with app.app_context():
-                                        alert = Alert.query.filter_by(alert_key=alert_key, is_resolved=0).first()
-                                        if alert:
-                                            alert.message = f"Container {wait_reason}: {wait_message}"
-                                            db.session.commit()
-                
-                # Önceki pod durumunu kontrol et
-                previous_pod_status = pod_statuses.get(pod_key, {})
-                
-                # Geçerli tüm konteyner durumlarını topla
-                container_details = {}
-                for container in container_statuses:
-                    container_name = container.name
-                    
-                    # Konteyner durumunu belirle
-                    if container.state.running:
-                        container_state = "Running"
-                        reason = ""
-                    elif container.state.waiting and hasattr(container.state.waiting, 'reason'):
-                        container_state = "Waiting"
-                        reason = container.state.waiting.reason
-                    elif container.state.terminated:
-                        container_state = "Terminated"
-                        reason = getattr(container.state.terminated, 'reason', "")
-                    else:
-                        container_state = "Unknown"
-                        reason = ""
-                    
-                    container_details[container_name] = {
-                        "state": container_state,
-                        "reason": reason,
-                        "ready": container.ready
-                    }
-                
-                # Güncel durumu kaydet
-                current_pod_status = {
-                    "phase": phase,
-                    "containers": container_details
-                }
-                
-                # Pod durumunu güncelle
-                pod_statuses[pod_key] = current_pod_status
-                
-                # İyileşme durumunu kontrol et (Pod Running durumuna geçtiyse)
-                if (phase == "Running" and 
-                    previous_pod_status.get("phase") in ["Failed", "Pending"]):
-                    
-                    alert_key = f"pod:{pod_key}:Recovery"
-                    if self.check_can_send_alert(alert_key):
-                        message = f"""
-                        Kubernetes Pod Recovery: {pod_key} is now Running
-                        
-                        Pod: {pod_name}
-                        Namespace: {namespace}
-                        Previous Status: {previous_pod_status.get("phase", "Unknown")}
-                        Current Status: Running
-                        """
-                        self.send_email_alert(f"Pod {pod_name} recovered", message)
-                
-                # Konteyner iyileşmelerini kontrol et
-                for container_name, container_info in container_details.items():
-                    # Önceki konteyner durumunu al
-                    prev_containers = previous_pod_status.get("containers", {})
-                    prev_container_info = prev_containers.get(container_name, {})
-                    
-                    # Eğer konteyner bir hata durumundan Running durumuna geçtiyse
-                    if (container_info["state"] == "Running" and 
-                        prev_container_info.get("state") == "Waiting" and
-                        prev_container_info.get("reason") in ["ImagePullBackOff", "CrashLoopBackOff", 
-                                                           "ErrImagePull", "CreateContainerError"]):
-                        
-                        alert_key = f"pod:{pod_key}:{container_name}:ContainerRecovery"
-                        if self.check_can_send_alert(alert_key):
-                            message = f"""
-                            Kubernetes Container Recovery: {container_name} in pod {pod_key} is now Running
-                            
-                            Pod: {pod_name}
-                            Namespace: {namespace}
-                            Container: {container_name}
-                            Previous Status: {prev_container_info.get("reason", "Unknown")}
-                            Current Status: Running
-                            """
-                            self.send_email_alert(f"Container {container_name} recovered", message)
-            
-            # Silinmiş pod'ları kontrol et ve alarmlarını çöz
-            if DB_AVAILABLE:
-                for old_pod_key in list(pod_statuses.keys()):
-                    if old_pod_key not in active_pods:
-                        # Pod artık mevcut değil, tüm alarmları çözelim
-                        try:
-                            # Pod key'i namespace ve adına ayır
-                            if '/' in old_pod_key:
-                                namespace, pod_name = old_pod_key.split('/', 1)
-                            else:
-                                namespace = None
-                                pod_name = old_pod_key
-                                
-                            with app.app_context():
-                                # Mevcut alarmları bul
-                                existing_alerts = Alert.query.filter(
-                                    Alert.resource_type == "pod",
-                                    Alert.resource_name == pod_name,
-                                    Alert.is_resolved == 0
-                                )
-                                
-                                if namespace:
-                                    existing_alerts = existing_alerts.filter(Alert.resource_namespace == namespace)
-                                
-                                existing_alerts = existing_alerts.all()
-                                
-                                # Alarmları çözüldü olarak işaretle
-                                for alert in existing_alerts:
-                                    alert.resolve()
-                                
-                                # Kaydetmeyi tamamla
-                                if existing_alerts:
-                                    db.session.commit()
-                                    logger.info(f"Marked {len(existing_alerts)} alerts as resolved for deleted pod {old_pod_key}")
-                            
-                            # Pod durumunu takip listesinden kaldır
-                            pod_statuses.pop(old_pod_key, None)
-                            logger.info(f"Removed tracking for deleted pod: {old_pod_key}")
-                        except Exception as e:
-                            logger.error(f"Error resolving alerts for deleted pod {old_pod_key}: {e}")
-            
-            logger.info(f"Monitored {len(pods)} pods")
+                active_pods.add(key)
+                record = None
+                version = resource_version_of(pod)
+                if version is None:
+                    record = PodRecord.from_object(pod)
+                    version = record_fingerprint(record)
+                if SKIP_UNCHANGED and pod_versions.get(key) == version and key in previous_summaries:
+                    if key not in due:
+                        pod_summaries[key] = previous_summaries[key]
+                        skipped += 1
+                        continue
+                    rechecked += 1
+
+                if record is None:
+                    record = PodRecord.from_object(pod)
+                pod_summaries[key] = self.summarize_record(record)
+                evaluated += 1
+                if self.pod_evaluator:
+                    changed.append((record, version))
+                else:
+                    # Records are dropped right after use, a cycle does not keep a second copy of every pod
+                    self.evaluate_record(record)
+                    pod_versions[key] = version
+
+            if not pods.complete:
+                # The pods after the failed page were not seen, none of them is taken for deleted
+                deleted_pods = []
+                pod_summaries = {**previous_summaries, **pod_summaries}
+                self.list_failed('pods', pods.error)
+            elif self.pod_evaluator:
+                deleted_pods = [key for key in pod_versions if key not in active_pods]
+            else:
+                # Silinmiş pod'ları bul
+                deleted_pods = [key for key in self.pod_statuses if key not in active_pods]
+            if self.pod_evaluator:
+                self.evaluate_in_shards(changed, deleted_pods)
+            self.pod_summaries = pod_summaries
+
+            # Silinmiş pod'ların alarmlarını çöz
+            for old_pod_key in deleted_pods:
+                self.handle_deleted_pod(old_pod_key)
+
+            listed = self.fetcher.list_seconds['pods']
+            waited = self.fetcher.wait_seconds['pods']
+            elapsed = time.perf_counter() - started - (listed if waited is None else waited)
+            if waited is not None:
+                self.cycle_stats['pod_wait_ms'] = round(waited * 1000, 1)
+            self.cycle_stats.update(pods=evaluated + skipped, pods_evaluated=evaluated, pods_skipped=skipped,
+                                    pods_rechecked=rechecked, pods_other_shards=other_shards, pod_list_ms=round(listed * 1000, 1),
+                                    pod_evaluation_ms=round(elapsed * 1000, 1))
+            CYCLE_PHASE_SECONDS.observe(listed, self.metrics_label, 'pod_list')
+            CYCLE_PHASE_SECONDS.observe(elapsed, self.metrics_label, 'pod_evaluation')
+            OBJECTS_EVALUATED.inc(self.metrics_label, 'pod', 'evaluated', amount=evaluated)
+            OBJECTS_EVALUATED.inc(self.metrics_label, 'pod', 'skipped', amount=skipped)
+            logger.info(f"{self.log_prefix}Monitored {evaluated + skipped} pods: {evaluated} evaluated ({rechecked} after a cool down), "
+                        f"{skipped} unchanged skipped in {elapsed * 1000:.0f} ms (listing {listed * 1000:.0f} ms)")
         except Exception as e:
             logger.error(f"Error monitoring pods: {e}")
-    
+
+    def evaluate_in_shards(self, changed, deleted_pods):
+        """Evaluate (record, version) pairs with the sharded evaluator and apply their alerts in order"""
+        try:
+            results = self.pod_evaluator.evaluate([record for record, _ in changed], deleted_pods)
+        except Exception:
+            # A restarted worker lost its pod statuses, evaluate every pod again next cycle
+            for key in self.pod_versions:
+                self.pod_versions[key] = None
+            raise
+
+        for index, candidates in results:
+            record, version = changed[index]
+            if candidates:
+                self.apply_alert_candidates(candidates)
+            self.schedule_recheck(self.pod_timers, record.key, [self.alert_key(candidate.alert_key) for candidate in candidates])
+            self.pod_versions[record.key] = version
+
+    def evaluate_pod(self, pod):
+        """Check a single pod and its containers for issues and send alerts"""
+        self.evaluate_record(PodRecord.from_object(pod))
+
+    def evaluate_record(self, record):
+        """Evaluate a pod against its previous status in pod_statuses and apply its alerts"""
+        candidates, self.pod_statuses[record.key] = evaluate_pod_record(record, self.pod_statuses.get(record.key))
+        if candidates:
+            self.apply_alert_candidates(candidates)
+        self.schedule_recheck(self.pod_timers, record.key, [self.alert_key(candidate.alert_key) for candidate in candidates])
+
+    def apply_alert_candidates(self, candidates):
+        """Send the alerts of evaluated pods that are not in their cool down period"""
+        for candidate in candidates:
+            alert_key = self.alert_key(candidate.alert_key)
+            if self.check_can_send_alert(alert_key):
+                # E-posta bildirimi gönder
+                self.send_email_alert(candidate.subject, candidate.message, alert_key,
+                                      node=candidate.node, owner=candidate.owner)
+
+                # Hata mesajını veritabanındaki uyarıda güncelle
+                if candidate.db_message is not None and DB_AVAILABLE:
+                    self.alert_writes.update_message(alert_key, candidate.db_message)
+
+    def handle_deleted_pod(self, pod_key):
+        """Resolve the alerts of a pod that no longer exists and stop tracking it"""
+        self.pod_versions.pop(pod_key, None)
+        self.pod_timers.cancel(pod_key)
+        if not DB_AVAILABLE or not self.registry.alerts_on("pod"):
+            self.pod_statuses.pop(pod_key, None)
+            return
+
+        # Pod artık mevcut değil, tüm alarmları çözelim
+        try:
+            # Pod key'i namespace ve adına ayır
+            if '/' in pod_key:
+                namespace, pod_name = pod_key.split('/', 1)
+            else:
+                namespace = None
+                pod_name = pod_key
+
+            self.alert_writes.resolve_resource("pod", pod_name, namespace, self.cluster_name)
+
+            # Pod durumunu takip listesinden kaldır
+            self.pod_statuses.pop(pod_key, None)
+            logger.info(f"{self.log_prefix}Removed tracking for deleted pod: {pod_key}")
+        except Exception as e:
+            logger.error(f"Error resolving alerts for deleted pod {pod_key}: {e}")
+
+    def shard_filter(self):
+        """Return (function telling whether this replica evaluates a pod key, rebalanced)
+
+        The function is None when namespaces are not sharded across
+        replicas. When the shards changed since the last call, the pods of
+        namespaces this replica no longer owns are forgotten without
+        resolving their alerts, their new owner takes them over.
+        """
+        ring, owns = self.registry.shard_filter()
+        if ring is self.shard_ring:
+            return owns, False
+        self.shard_ring = ring
+        if owns is not None:
+            self.forget_pods([key for key in self.pod_versions.keys() | self.pod_statuses.keys() if not owns(key)])
+        return owns, True
+
+    def forget_pods(self, pod_keys):
+        """Stop tracking pods, leaving their alerts as they are"""
+        for pod_key in pod_keys:
+            self.pod_versions.pop(pod_key, None)
+            self.pod_statuses.pop(pod_key, None)
+            self.pod_summaries.pop(pod_key, None)
+            self.pod_timers.cancel(pod_key)
+        if self.pod_evaluator and pod_keys:
+            self.pod_evaluator.evaluate([], pod_keys)
+        if pod_keys:
+            logger.info(f"{self.log_prefix}Handed {len(pod_keys)} pods over to other replicas")
+
+    def start_informers(self):
+        """Start node and pod informers, return False if the API server is unreachable"""
+        self.node_informer = self.fetcher.node_informer()
+        # One informer per monitored namespace, or one for the whole cluster, all filling pod_store
+        self.pod_store = ObjectStore()
+        self.pod_informers = self.fetcher.pod_informers(self.pod_store)
+
+        if not self.node_informer.start():
+            return False
+        for started, informer in enumerate(self.pod_informers):
+            if not informer.start():
+                self.node_informer.stop()
+                for running in self.pod_informers[:started]:
+                    running.stop()
+                return False
+        return True
+
+    @TRACER.traced('sync_informers')
+    def sync_informers(self):
+        """Evaluate only the nodes and pods that changed since the last sync"""
+        changed_nodes, deleted_nodes, changed_pods, deleted_pods = [], [], [], []
+
+        try:
+            started = time.perf_counter()
+            changed_nodes, deleted_nodes = self.node_informer.store.drain_changes()
+            watched = len(changed_nodes)
+            changed_nodes = self.add_due_objects(changed_nodes, self.node_timers, self.node_informer.store)
+            for node in changed_nodes:
+                self.evaluate_node(node)
+                self.node_summaries[node.metadata.name] = self.summarize_node(node)
+            for node_name in deleted_nodes:
+                self.handle_deleted_node(node_name)
+                self.node_summaries.pop(node_name, None)
+            self.record_sync_stats('node', len(changed_nodes), len(changed_nodes) - watched, len(self.node_summaries),
+                                   time.perf_counter() - started)
+        except Exception as e:
+            logger.error(f"Error monitoring nodes: {e}")
+
+        try:
+            started = time.perf_counter()
+            changed_pods, deleted_pods = self.pod_store.drain_changes()
+            owns, rebalanced = self.shard_filter()
+            if rebalanced:
+                # Namespaces moved to this replica, their cached pods were never evaluated here
+                changed_pods = self.pod_store.list()
+            watched = len(changed_pods)
+            changed_pods = self.add_due_objects(changed_pods, self.pod_timers, self.pod_store)
+            rechecked = len(changed_pods) - watched
+            if owns is not None:
+                changed_pods = [pod for pod in changed_pods if owns(object_key(pod))]
+                deleted_pods = [pod_key for pod_key in deleted_pods if owns(pod_key)]
+            for pod in changed_pods:
+                record = PodRecord.from_object(pod)
+                self.evaluate_record(record)
+                self.pod_summaries[record.key] = self.summarize_record(record)
+            for pod_key in deleted_pods:
+                self.handle_deleted_pod(pod_key)
+                self.pod_summaries.pop(pod_key, None)
+            self.record_sync_stats('pod', len(changed_pods), rechecked, len(self.pod_summaries), time.perf_counter() - started)
+            self.cycle_stats['pods_other_shards'] = max(len(self.pod_store) - len(self.pod_summaries), 0)
+        except Exception as e:
+            logger.error(f"Error monitoring pods: {e}")
+
+        if changed_nodes or deleted_nodes or changed_pods or deleted_pods:
+            logger.info(f"{self.log_prefix}Evaluated {len(changed_nodes)} changed nodes ({len(self.node_informer.store)} cached) "
+                        f"and {len(changed_pods)} changed pods ({len(self.pod_store)} cached)")
+
+    def record_sync_stats(self, resource, evaluated, rechecked, tracked, elapsed):
+        """Record an informer sync in the same cycle_stats keys as a polled cycle, without list times"""
+        skipped = max(tracked - evaluated, 0)
+        self.cycle_stats.update({
+            f"{resource}s": tracked,
+            f"{resource}s_evaluated": evaluated,
+            f"{resource}s_skipped": skipped,
+            f"{resource}s_rechecked": rechecked,
+            f"{resource}_evaluation_ms": round(elapsed * 1000, 1),
+        })
+        CYCLE_PHASE_SECONDS.observe(elapsed, self.metrics_label, f"{resource}_evaluation")
+        OBJECTS_EVALUATED.inc(self.metrics_label, resource, 'evaluated', amount=evaluated)
+        OBJECTS_EVALUATED.inc(self.metrics_label, resource, 'skipped', amount=skipped)
+
+    def add_due_objects(self, changed, timers, store):
+        """Add the cached objects whose alert cool down ended to the changed objects"""
+        due = timers.advance(time.time())
+        if due:
+            due.difference_update(object_key(obj) for obj in changed)
+            changed.extend(obj for obj in map(store.get, due) if obj is not None)
+        return changed
+
     def start_monitors(self):
-        """Start monitoring threads"""
-        logger.info("Starting Kubernetes monitor threads...")
-        
+        """Run the monitor loop of this cluster, in its own thread"""
+        logger.info(f"Starting Kubernetes monitor for {self.describe()}...")
+
+        # A named cluster without a usable configuration is retried, the other clusters go on
+        while not self.configured:
+            time.sleep(POLL_INTERVAL)
+            self.configured = self.setup_kubernetes_client()
+
+        if MONITOR_MODE == 'informer':
+            if self.start_informers():
+                self.run_informer_loop()
+                return
+            logger.warning(f"Could not start informers for {self.describe()}, falling back to polling mode")
+
+        if MONITOR_ENGINE == 'asyncio':
+            AsyncMonitorEngine(self).run(POLL_INTERVAL)
+            return
+
         while True:
             try:
-                self.monitor_nodes()
-                self.monitor_pods()
-                
+                started = time.time()
+                self.last_error = None
+                with TRACER.trace('cycle', cluster=self.cluster_name):
+                    self.monitor_nodes()
+                    self.monitor_pods()
+                    self.flush_alert_writes()
+                    self.publish_snapshot()
+                self.record_cycle(started)
+
                 time.sleep(POLL_INTERVAL)
             except Exception as e:
-                logger.error(f"Error in monitor loop: {e}")
+                logger.error(f"{self.log_prefix}Error in monitor loop: {e}")
+                self.last_error = str(e)
                 time.sleep(60)  # Wait before retrying
 
-    def get_all_resources(self):
-        """Get current state of all resources for the dashboard"""
-        data = {
-            "nodes": [],
-            "pods": [],
-            "alerts": []
+    def run_informer_loop(self):
+        """Evaluate informer changes every INFORMER_SYNC_INTERVAL seconds"""
+        while True:
+            try:
+                started = time.time()
+                with TRACER.trace('cycle', cluster=self.cluster_name, mode='informer'):
+                    self.sync_informers()
+                    self.flush_alert_writes()
+                    self.publish_snapshot()
+                self.record_cycle(started)
+
+                time.sleep(INFORMER_SYNC_INTERVAL)
+            except Exception as e:
+                logger.error(f"{self.log_prefix}Error in monitor loop: {e}")
+                self.last_error = str(e)
+                time.sleep(60)  # Wait before retrying
+
+    def record_cycle(self, started):
+        self.last_cycle_at = time.time()
+        self.last_cycle_seconds = self.last_cycle_at - started
+        CYCLE_SECONDS.observe(self.last_cycle_seconds, self.metrics_label)
+
+    def status(self):
+        """Return the health of this cluster's monitor for /api/clusters"""
+        return {
+            "name": self.cluster_name,
+            "context": self.cluster.context,
+            "configured": self.configured,
+            "mode": 'informer' if getattr(self, 'node_informer', None) else 'poll',
+            "engine": MONITOR_ENGINE,
+            "nodes": len(self.node_summaries),
+            "pods": len(self.pod_summaries),
+            "last_cycle_at": self.last_cycle_at,
+            "last_cycle_seconds": round(self.last_cycle_seconds, 3) if self.last_cycle_seconds is not None else None,
+            "last_error": self.last_error
         }
-        
-        # Get nodes
-        try:
+
+    def summarize_node(self, node):
+        """Return the dashboard representation of a node"""
+        node_status = "Ready"
+
+        # Check node conditions
+        for condition in node.status.conditions:
+            if condition.type == "Ready" and condition.status != "True":
+                node_status = "NotReady"
+
+        summary = {
+            "name": node.metadata.name,
+            "status": node_status,
+            "roles": [key.replace("node-role.kubernetes.io/", "") for key in node.metadata.labels.keys() if key.startswith("node-role.kubernetes.io/")],
+            "version": node.status.node_info.kubelet_version,
+            "cpu": node.status.capacity.get("cpu"),
+            "memory": node.status.capacity.get("memory")
+        }
+        if self.cluster_name:
+            summary["cluster"] = self.cluster_name
+        return summary
+
+    def summarize_record(self, record):
+        """Return the dashboard representation of a pod record"""
+        summary = record.summary()
+        if self.cluster_name:
+            summary["cluster"] = self.cluster_name
+        return summary
+
+    def summarize_pod(self, pod):
+        """Return the dashboard representation of a pod"""
+        return self.summarize_record(PodRecord.from_object(pod))
+
+    @TRACER.traced('publish_snapshot')
+    def publish_snapshot(self):
+        """Hand the nodes and pods seen in this cycle to the registry, which publishes those of every cluster"""
+        started = time.perf_counter()
+        self.published = (tuple(self.node_summaries.values()), tuple(self.pod_summaries.values()))
+        self.registry.publish_snapshot()
+        CYCLE_PHASE_SECONDS.observe(time.perf_counter() - started, self.metrics_label, 'publish')
+
+
+class MonitorRegistry:
+    """The monitors of all configured clusters and what they share
+
+    Every cluster is monitored in its own thread with its own API client and
+    connection pool, so a slow or unreachable API server only delays its own
+    cluster. The active alert index, the database, alert grouping and email
+    delivery, and the dashboard snapshot (the nodes and pods of all
+    clusters) are shared.
+    """
+
+    def __init__(self, clusters=(), monitors=None):
+        self.snapshots = SnapshotStore()
+        # Server-Sent Events clients are fed from every new snapshot version
+        self.events = EventBroadcaster()
+        self.snapshots.add_listener(self.broadcast_changes)
+        # Active alerts kept in memory so duplicate and recovery checks need no queries
+        self.active_alerts = ActiveAlertIndex() if DB_AVAILABLE else None
+        # Bumped whenever this process, or with several replicas any replica, changes alerts in the database
+        self._alert_versions = itertools.count(1)
+        self.alerts_version = 0
+        # Snapshots are composed from every monitor's summaries one at a time
+        self._publish_lock = threading.Lock()
+        # Leader election and namespace sharding between replicas (LEADER_ELECTION), None for a single replica
+        self.coordinator = None
+        self.monitors = monitors if monitors is not None else [KubernetesMonitor(cluster, self) for cluster in clusters]
+
+    def monitor(self, cluster_name):
+        """Return the monitor of a cluster, None if there is no such cluster"""
+        return next((monitor for monitor in self.monitors if monitor.cluster_name == cluster_name), None)
+
+    @property
+    def cycle_stats(self):
+        """Stats of the last cycles, per cluster name when clusters are configured"""
+        if len(self.monitors) == 1 and self.monitors[0].cluster_name is None:
+            return self.monitors[0].cycle_stats
+        return {monitor.cluster_name: monitor.cycle_stats for monitor in self.monitors}
+
+    def cluster_status(self):
+        return [monitor.status() for monitor in self.monitors]
+
+    @property
+    def is_leader(self):
+        """Whether this replica does the work done once per deployment, always without leader election"""
+        return self.coordinator is None or self.coordinator.is_leader
+
+    def alerts_on(self, resource_type):
+        """Whether this replica alerts on (and resolves the alerts of) a resource type
+
+        Nodes are the leader's. Pods are too, unless namespaces are sharded:
+        then every replica only evaluates the pods of its own namespaces.
+        Other replicas still evaluate everything for their dashboard.
+        """
+        if self.coordinator is None:
+            return True
+        if resource_type == "pod" and self.coordinator.sharded:
+            return True
+        return self.coordinator.is_leader
+
+    def shard_filter(self):
+        """Return (shard ring, function telling whether this replica owns a pod key), (None, None) without sharding"""
+        coordinator = self.coordinator
+        if coordinator is None or not coordinator.sharded:
+            return None, None
+        ring, identity = coordinator.ring, coordinator.identity
+        if ring is None:
+            # Membership is not known yet, owning nothing is safer than alerting twice
+            return None, lambda pod_key: False
+        return ring, lambda pod_key: ring.owner(pod_key.split('/', 1)[0]) == identity
+
+    def replica_status(self):
+        """Leader election and sharding state of this replica for /api/replica"""
+        if self.coordinator is None:
+            return {"leader_election": False, "leader": True, "sharded": False}
+        return dict(self.coordinator.status(), leader_election=True)
+
+    def replicas_changed(self):
+        """Leadership or the shards changed, other replicas wrote the alerts this one takes over"""
+        if DB_AVAILABLE:
+            # Reloaded from the database by the next duplicate check
+            self.active_alerts.loaded = False
+
+    def start(self):
+        """Start one monitor thread per cluster"""
+        logger.info(f"Starting Kubernetes monitor threads for {len(self.monitors)} cluster(s)...")
+
+        # Leases live in the cluster the replicas run in
+        self.coordinator = create_coordinator(lambda: ClusterConfig().api_client(), on_change=self.replicas_changed)
+        if self.coordinator is not None:
+            self.coordinator.start()
+
+        if DB_AVAILABLE:
             try:
-                nodes = self.core_v1.list_node().items
+                self.active_alerts.load()
             except Exception as e:
-                logger.warning(f"Failed to get nodes from Kubernetes API: {e}")
-                if MOCK_DATA_AVAILABLE:
-                    nodes = get_mock_nodes()
-                    logger.info("Using mock node data for dashboard")
-                else:
-                    nodes = []
-                    logger.error("No mock data available and Kubernetes API unreachable")
-            
-            for node in nodes:
-                node_name = node.metadata.name
-                node_status = "Ready"
-                
-                # Check node conditions
-                for condition in node.status.conditions:
-                    if condition.type == "Ready" and condition.status != "True":
-                        node_status = "NotReady"
-                
-                data["nodes"].append({
-                    "name": node_name,
-                    "status": node_status,
-                    "roles": [key.replace("node-role.kubernetes.io/", "") for key in node.metadata.labels.keys() if key.startswith("node-role.kubernetes.io/")],
-                    "version": node.status.node_info.kubelet_version,
-                    "cpu": node.status.capacity.get("cpu"),
-                    "memory": node.status.capacity.get("memory")
-                })
+                # Retried on the first duplicate check
+                logger.error(f"Failed to load active alerts: {e}")
+
+        for monitor in self.monitors:
+            thread = threading.Thread(target=monitor.start_monitors, daemon=True,
+                                      name=f"monitor-{monitor.cluster_name or 'default'}")
+            thread.start()
+
+    def mark_alerts_changed(self):
+        """Record that alerts in the database changed, invalidating cached alert responses"""
+        self.alerts_version = next(self._alert_versions)
+
+    def forget_alert(self, alert_id):
+        """Drop an alert resolved or deleted through the API from the active alert index"""
+        if DB_AVAILABLE:
+            self.active_alerts.discard(alert_id)
+
+    def load_recent_alerts(self):
+        """Return the 20 most recent active alerts from the database"""
+        if not DB_AVAILABLE:
+            return []
+
+        with app.app_context():
+            # is_resolved in database is an integer (0 for False, 1 for True)
+            alerts = Alert.query.filter_by(is_resolved=0).order_by(Alert.created_at.desc()).limit(20).all()
+            return [alert.to_dict() for alert in alerts]
+
+    def sync_database_alerts(self):
+        """Pick up alerts other replicas changed, e.g. resolved or deleted through their API
+
+        The active alert index is reloaded and cached alert responses are
+        invalidated when a transaction of another process changed alerts
+        since the last cycle. A single replica changes them only itself.
+        """
+        if self.coordinator is None or not DB_AVAILABLE:
+            return
+        try:
+            if not alert_revisions.changed_elsewhere():
+                return
         except Exception as e:
-            logger.error(f"Error getting nodes: {e}")
-        
-        # Get pods
+            logger.error(f"Error checking the alert revision: {e}")
+            return
+
+        # Reloaded from the database by the next duplicate check
+        self.active_alerts.loaded = False
+        self.mark_alerts_changed()
+
+    def publish_snapshot(self):
+        """Publish the nodes and pods last seen in every cluster plus recent alerts for the dashboard"""
+        self.sync_database_alerts()
         try:
-            try:
-                pods = self.core_v1.list_pod_for_all_namespaces().items
-            except Exception as e:
-                logger.warning(f"Failed to get pods from Kubernetes API: {e}")
-                if MOCK_DATA_AVAILABLE:
-                    pods = get_mock_pods()
-                    logger.info("Using mock pod data for dashboard")
-                else:
-                    pods = []
-                    logger.error("No mock data available and Kubernetes API unreachable")
-            
-            for pod in pods:
-                pod_name = pod.metadata.name
-                namespace = pod.metadata.namespace
-                
-                container_statuses = []
-                if pod.status.container_statuses:
-                    for container in pod.status.container_statuses:
-                        state = "Unknown"
-                        reason = ""
-                        
-                        if container.state.running:
-                            state = "Running"
-                        elif container.state.waiting:
-                            state = "Waiting"
-                            reason = container.state.waiting.reason
-                        elif container.state.terminated:
-                            state = "Terminated"
-                            reason = container.state.terminated.reason
-                        
-                        container_statuses.append({
-                            "name": container.name,
-                            "ready": container.ready,
-                            "restarts": container.restart_count,
-                            "state": state,
-                            "reason": reason
-                        })
-                
-                data["pods"].append({
-                    "name": pod_name,
-                    "namespace": namespace,
-                    "phase": pod.status.phase,
-                    "containers": container_statuses,
-                    "node": pod.spec.node_name,
-                    "ip": pod.status.pod_ip
-                })
+            alerts = self.load_recent_alerts()
         except Exception as e:
-            logger.error(f"Error getting pods: {e}")
-            
-        # Add recent alerts from database instead of local variable
-        # This ensures consistent data format with the main API
+            logger.error(f"Error getting database alerts: {e}")
+            alerts = None
+
+        with self._publish_lock:
+            self.snapshots.publish(
+                nodes=itertools.chain.from_iterable(monitor.published[0] for monitor in self.monitors),
+                pods=itertools.chain.from_iterable(monitor.published[1] for monitor in self.monitors),
+                alerts=alerts
+            )
+
+    def broadcast_changes(self, snapshot, delta):
+        """Push the changes of a new snapshot version to stream clients"""
+        self.events.publish(snapshot.version, 'resources', {"version": snapshot.version, **delta})
+        if delta["alerts"]["new"] or delta["alerts"]["resolved"]:
+            self.events.publish(snapshot.version, 'alerts', {"version": snapshot.version, **delta["alerts"]})
+
+    def refresh_snapshot_alerts(self):
+        """Reload the snapshot's alerts after they were changed through the API"""
+        self.mark_alerts_changed()
         try:
-            with app.app_context():
-                # is_resolved in database is an integer (0 for False, 1 for True)
-                alerts = Alert.query.filter_by(is_resolved=0).order_by(Alert.created_at.desc()).limit(20).all()
-                data["alerts"] = [
-                    {
-                        "id": alert.id,
-                        "alert_key": alert.alert_key,
-                        "resource_type": alert.resource_type,
-                        "resource_name": alert.resource_name, 
-                        "resource_namespace": alert.resource_namespace,
-                        "status": alert.status,
-                        "is_resolved": bool(alert.is_resolved),
-                        "created_at": alert.created_at.isoformat() if alert.created_at else None,
-                        "resolved_at": alert.resolved_at.isoformat() if alert.resolved_at else None,
-                        "message": alert.message
-                    } for alert in alerts
-                ]
+            self.snapshots.publish(alerts=self.load_recent_alerts(), refreshed=False)
         except Exception as e:
             logger.error(f"Error getting database alerts: {e}")
-            
-        return data
 
-# Create singleton instance
-k8s_monitor = KubernetesMonitor()
+    def get_all_resources(self):
+        """Get current state of all resources for the dashboard
+
+        Served from the snapshot published by the monitor threads, so no
+        Kubernetes API calls are made per request.
+        """
+        return self.snapshots.current.to_dict()
+
+# One monitor per cluster of CLUSTERS, or a single monitor of the current cluster
+k8s_monitor = MonitorRegistry(parse_clusters())
+
+
+def _email_stats(labels):
+    """Collect email queue stats as {(label,): value}, labels maps label values to stats() keys"""
+    stats = email_queue.stats()
+    return {(label,): stats[key] for label, key in labels.items()}
+
+
+def _per_cluster(value):
+    """Collect a value of every cluster's monitor when /metrics is scraped"""
+    return lambda: {(monitor.metrics_label,): value(monitor) for monitor in k8s_monitor.monitors}
+
+
+# Read when scraped, so they cost the monitor loop nothing
+REGISTRY.gauge_func('kubealertmail_tracked_nodes', "Nodes seen in the last cycle",
+                    _per_cluster(lambda monitor: len(monitor.node_summaries)), ('cluster',))
+REGISTRY.gauge_func('kubealertmail_tracked_pods', "Pods seen in the last cycle",
+                    _per_cluster(lambda monitor: len(monitor.pod_summaries)), ('cluster',))
+REGISTRY.gauge_func('kubealertmail_last_cycle_timestamp_seconds', "Unix time the last monitor cycle ended, alert on its age to catch a stuck monitor",
+                    _per_cluster(lambda monitor: monitor.last_cycle_at), ('cluster',))
+REGISTRY.gauge_func('kubealertmail_cluster_up', "1 if the last monitor cycle of the cluster reached its API server",
+                    _per_cluster(lambda monitor: int(monitor.configured and monitor.last_error is None)), ('cluster',))
+REGISTRY.gauge_func('kubealertmail_leader', "1 if this replica holds the leader lease, only exported with LEADER_ELECTION",
+                    lambda: int(k8s_monitor.is_leader) if k8s_monitor.coordinator is not None else None)
+REGISTRY.gauge_func('kubealertmail_active_alerts', "Unresolved alerts in the active alert index",
+                    lambda: len(k8s_monitor.active_alerts) if k8s_monitor.active_alerts is not None and k8s_monitor.active_alerts.loaded else None)
+REGISTRY.gauge_func('kubealertmail_email_queue_depth', "Alert emails waiting for delivery",
+                    lambda: _email_stats({'queued': 'queue_depth', 'retry': 'retry_pending', 'in_flight': 'in_flight'}), ('state',))
+REGISTRY.counter_func('kubealertmail_emails', "Alert email delivery attempts by result",
+                      lambda: _email_stats({'sent': 'sent', 'failed': 'failed_attempts', 'dropped': 'dropped'}), ('result',))
+
 
 def start_monitoring_thread():
-    """Start a background thread for monitoring"""
-    monitor_thread = threading.Thread(target=k8s_monitor.start_monitors, daemon=True)
-    monitor_thread.start()
+    """Start the background threads for monitoring"""
+    email_queue.start()
+    alert_grouper.start()
+    k8s_monitor.start()
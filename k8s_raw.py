@@ -0,0 +1,72 @@
+import json
+import logging
+from kubernetes.client.rest import ApiException
+from kubernetes.watch.watch import iter_resp_lines
+
+logger = logging.getLogger(__name__)
+
+# orjson parses Kubernetes lists several times faster, the standard library is the fallback
+try:
+    import orjson
+    loads = orjson.loads
+    JSON_PARSER = 'orjson'
+except ImportError:
+    loads = json.loads
+    JSON_PARSER = 'json'
+
+
+def _check_status(response):
+    """Raise ApiException for an error response, which some client versions return unchecked"""
+    status = getattr(response, 'status', 200)
+    if not 200 <= status <= 299:
+        body = response.data
+        raise ApiException(status=status, reason=getattr(response, 'reason', None) or body[:200])
+
+
+def to_model(api_client, data, model):
+    """Turn parsed JSON into a kubernetes client model, e.g. 'V1NodeList'
+
+    ApiClient.deserialize() takes a response object in some client
+    versions and the response text in others; the parsed data goes
+    through the deserializer both share.
+    """
+    return api_client._ApiClient__deserialize(data, model)
+
+
+def list_raw(list_func, **kwargs):
+    """Call a list endpoint of the kubernetes client and parse the JSON body into plain dicts
+
+    _preload_content=False skips the client's model deserialization,
+    which costs far more than parsing the JSON itself.
+    """
+    response = list_func(_preload_content=False, **kwargs)
+    try:
+        _check_status(response)
+        return loads(response.data)
+    finally:
+        response.release_conn()
+
+
+def watch_raw(list_func, stop=None, **kwargs):
+    """Yield (event type, object dict) of a watch request parsed as plain JSON
+
+    An ERROR event raises ApiException with the status code the server
+    sent, e.g. 410 when the resourceVersion is too old.
+    """
+    response = list_func(watch=True, _preload_content=False, **kwargs)
+    try:
+        _check_status(response)
+        for line in iter_resp_lines(response):
+            if not line:
+                continue
+            event = loads(line)
+            event_type = event['type']
+            obj = event['object']
+            if event_type == 'ERROR':
+                raise ApiException(status=obj.get('code'), reason=f"{obj.get('reason')}: {obj.get('message')}")
+            yield event_type, obj
+            if stop is not None and stop.is_set():
+                break
+    finally:
+        response.close()
+        response.release_conn()
@@ -0,0 +1,484 @@
+import os
+import re
+import time
+import bisect
+import atexit
+import socket
+import sqlite3
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+LEADER_ELECTION = os.environ.get('LEADER_ELECTION', 'none')  # 'none', 'lease' (Kubernetes Lease) or 'sqlite' (local lease file)
+LEASE_NAME = os.environ.get('LEASE_NAME', 'kubealertmail')  # leader lease, member leases are named <LEASE_NAME>-member-<identity>
+LEASE_NAMESPACE = os.environ.get('LEASE_NAMESPACE', '')  # empty: the namespace of the pod's service account
+LEASE_DURATION = float(os.environ.get('LEASE_DURATION', '15'))  # seconds a lease is valid without renewal
+LEASE_RENEW_DEADLINE = float(os.environ.get('LEASE_RENEW_DEADLINE', '10'))  # seconds the leader retries renewing before stepping down
+LEASE_RETRY_PERIOD = float(os.environ.get('LEASE_RETRY_PERIOD', '2'))  # seconds between acquire/renew attempts
+LEASE_DATABASE = os.environ.get('LEASE_DATABASE', 'kubealertmail-leases.db')  # SQLite file of LEADER_ELECTION=sqlite
+REPLICA_IDENTITY = os.environ.get('POD_NAME') or f"{socket.gethostname()}-{os.getpid()}"  # unique per replica
+SHARD_NAMESPACES = os.environ.get('SHARD_NAMESPACES', 'false').lower() in ('1', 'true', 'yes')  # split pod namespaces across replicas
+SHARD_VIRTUAL_NODES = int(os.environ.get('SHARD_VIRTUAL_NODES', '64'))  # points per replica on the hash ring
+
+SERVICE_ACCOUNT_NAMESPACE = '/var/run/secrets/kubernetes.io/serviceaccount/namespace'
+# Label of the member leases of a group, so a replica lists only its peers
+GROUP_LABEL = 'kubealertmail.io/lease-group'
+HTTP_STATUS_NOT_FOUND = 404
+HTTP_STATUS_CONFLICT = 409
+
+
+@dataclass
+class LeaseRecord:
+    """The holder of a lease and when it was last renewed, version guards concurrent updates"""
+    holder: str
+    acquire_time: float
+    renew_time: float
+    duration: float
+    transitions: int = 0
+    version: object = None
+
+
+def member_lease_name(group, identity):
+    """Lease name of a replica, a valid Kubernetes object name"""
+    name = re.sub(r'[^a-z0-9.-]+', '-', f"{group}-member-{identity}".lower()).strip('-.')
+    return name[:253]
+
+
+def _utc(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+def _timestamp(value):
+    return value.timestamp() if value is not None else 0.0
+
+
+class KubernetesLeaseLock:
+    """Leases stored as coordination.k8s.io/v1 Lease objects of one namespace
+
+    Updates send the resourceVersion that was read, so of two replicas
+    updating the same lease only one succeeds (the other gets 409).
+    """
+
+    def __init__(self, coordination_v1, namespace):
+        self.api = coordination_v1
+        self.namespace = namespace
+
+    def describe(self):
+        return f"Lease objects in namespace {self.namespace}"
+
+    @staticmethod
+    def _record(lease):
+        spec = lease.spec
+        return LeaseRecord(holder=spec.holder_identity or '', acquire_time=_timestamp(spec.acquire_time),
+                           renew_time=_timestamp(spec.renew_time), duration=spec.lease_duration_seconds or 0,
+                           transitions=spec.lease_transitions or 0, version=lease.metadata.resource_version)
+
+    def _lease(self, name, record, group=None):
+        return client.V1Lease(
+            metadata=client.V1ObjectMeta(name=name, namespace=self.namespace, resource_version=record.version,
+                                         labels={GROUP_LABEL: group} if group else None),
+            spec=client.V1LeaseSpec(holder_identity=record.holder, lease_duration_seconds=max(1, round(record.duration)),
+                                    acquire_time=_utc(record.acquire_time), renew_time=_utc(record.renew_time),
+                                    lease_transitions=record.transitions))
+
+    def get(self, name):
+        """Return the LeaseRecord of a lease, None if it does not exist"""
+        try:
+            return self._record(self.api.read_namespaced_lease(name, self.namespace))
+        except ApiException as e:
+            if e.status == HTTP_STATUS_NOT_FOUND:
+                return None
+            raise
+
+    def create(self, name, record, group=None):
+        """Create a lease, return False if it already exists"""
+        try:
+            self.api.create_namespaced_lease(self.namespace, self._lease(name, record, group))
+            return True
+        except ApiException as e:
+            if e.status == HTTP_STATUS_CONFLICT:
+                return False
+            raise
+
+    def update(self, name, record, group=None):
+        """Replace a lease read as record.version, return False if it changed in between"""
+        try:
+            self.api.replace_namespaced_lease(name, self.namespace, self._lease(name, record, group))
+            return True
+        except ApiException as e:
+            if e.status == HTTP_STATUS_CONFLICT:
+                return False
+            raise
+
+    def delete(self, name):
+        try:
+            self.api.delete_namespaced_lease(name, self.namespace)
+        except ApiException as e:
+            if e.status != HTTP_STATUS_NOT_FOUND:
+                raise
+
+    def members(self, group):
+        """Return {lease name: LeaseRecord} of the member leases of a group"""
+        leases = self.api.list_namespaced_lease(self.namespace, label_selector=f"{GROUP_LABEL}={group}")
+        return {lease.metadata.name: self._record(lease) for lease in leases.items if lease.spec is not None}
+
+
+class SQLiteLeaseLock:
+    """Leases in a local SQLite file, for tests and replicas on one host
+
+    Works like KubernetesLeaseLock: a version column is bumped by every
+    update and updates only apply to the version that was read.
+    """
+
+    def __init__(self, path=LEASE_DATABASE):
+        self.path = path
+        self._execute("CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, grp TEXT, holder TEXT, "
+                      "acquire_time REAL, renew_time REAL, duration REAL, transitions INTEGER, version INTEGER)")
+
+    def describe(self):
+        return f"SQLite leases in {self.path}"
+
+    def _execute(self, sql, parameters=()):
+        """Run one statement in its own transaction, return (rowcount, rows)"""
+        # A connection per call, the lock is used from several threads and processes
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            with connection:
+                cursor = connection.execute(sql, parameters)
+                return cursor.rowcount, cursor.fetchall()
+        finally:
+            connection.close()
+
+    def get(self, name):
+        _, rows = self._execute("SELECT holder, acquire_time, renew_time, duration, transitions, version "
+                                "FROM leases WHERE name = ?", (name,))
+        return LeaseRecord(*rows[0]) if rows else None
+
+    def create(self, name, record, group=None):
+        count, _ = self._execute("INSERT OR IGNORE INTO leases VALUES (?, ?, ?, ?, ?, ?, ?, 1)",
+                                 (name, group, record.holder, record.acquire_time, record.renew_time,
+                                  record.duration, record.transitions))
+        return count == 1
+
+    def update(self, name, record, group=None):
+        count, _ = self._execute("UPDATE leases SET holder = ?, acquire_time = ?, renew_time = ?, duration = ?, "
+                                 "transitions = ?, version = version + 1 WHERE name = ? AND version = ?",
+                                 (record.holder, record.acquire_time, record.renew_time, record.duration,
+                                  record.transitions, name, record.version))
+        return count == 1
+
+    def delete(self, name):
+        self._execute("DELETE FROM leases WHERE name = ?", (name,))
+
+    def members(self, group):
+        _, rows = self._execute("SELECT name, holder, acquire_time, renew_time, duration, transitions, version "
+                                "FROM leases WHERE grp = ?", (group,))
+        return {row[0]: LeaseRecord(*row[1:]) for row in rows}
+
+
+class LeaseObserver:
+    """Tells expired leases apart by the local clock, like client-go
+
+    A lease counts as expired when its version has not changed for its
+    duration since this replica first saw that version, so clock skew
+    between replicas does not matter.
+    """
+
+    def __init__(self):
+        self._seen = {}  # lease name -> (version, monotonic time first seen)
+
+    def expired(self, name, record):
+        now = time.monotonic()
+        version, seen = self._seen.get(name, (None, None))
+        if version != record.version:
+            self._seen[name] = (record.version, now)
+            return not record.holder
+        return not record.holder or now - seen >= record.duration
+
+    def retain(self, names):
+        """Forget the leases that are gone"""
+        self._seen = {name: seen for name, seen in self._seen.items() if name in names}
+
+
+class LeaderElector:
+    """Lease based leader election, one replica holds the lease and renews it every retry period
+
+    A follower takes the lease over once it has expired. The leader steps
+    down when it could not renew for renew_deadline seconds, which is
+    shorter than the lease duration, so it stops before anyone else starts.
+    """
+
+    def __init__(self, lock, name=LEASE_NAME, identity=REPLICA_IDENTITY, lease_duration=LEASE_DURATION,
+                 renew_deadline=LEASE_RENEW_DEADLINE, on_change=None):
+        self.lock = lock
+        self.name = name
+        self.identity = identity
+        self.lease_duration = lease_duration
+        self.renew_deadline = min(renew_deadline, lease_duration)
+        # Called with True when this replica became the leader, False when it stepped down
+        self.on_change = on_change
+        self.observer = LeaseObserver()
+        self.is_leader = False
+        self.holder = None
+        self.transitions = 0
+        self._renewed = None
+
+    def try_acquire_or_renew(self):
+        """Acquire the lease if it is free or expired, renew it if it is ours; return True if we hold it"""
+        now = time.time()
+        record = self.lock.get(self.name)
+        if record is None:
+            created = self.lock.create(self.name, LeaseRecord(self.identity, now, now, self.lease_duration))
+            self.holder = self.identity if created else None
+            return created
+
+        self.holder = record.holder or None
+        self.transitions = record.transitions
+        ours = record.holder == self.identity
+        if not ours and not self.observer.expired(self.name, record):
+            return False
+        updated = replace(record, holder=self.identity, acquire_time=record.acquire_time if ours else now,
+                          renew_time=now, duration=self.lease_duration,
+                          transitions=record.transitions if ours else record.transitions + 1)
+        if not self.lock.update(self.name, updated):
+            return False
+        self.holder = self.identity
+        self.transitions = updated.transitions
+        return True
+
+    def step(self):
+        """One acquire or renew attempt, updating is_leader"""
+        try:
+            held = self.try_acquire_or_renew()
+        except Exception as e:
+            logger.warning(f"Could not acquire or renew lease {self.name}: {e}")
+            held = False
+        if held:
+            self._renewed = time.monotonic()
+            if not self.is_leader:
+                logger.info(f"{self.identity} became the leader (lease {self.name})")
+                self._set_leader(True)
+        elif self.is_leader and (self.holder not in (None, self.identity)
+                                 or time.monotonic() - self._renewed >= self.renew_deadline):
+            logger.warning(f"{self.identity} lost the lease {self.name} to {self.holder or 'nobody'}, stepping down")
+            self._set_leader(False)
+
+    def _set_leader(self, leader):
+        self.is_leader = leader
+        if self.on_change is not None:
+            try:
+                self.on_change(leader)
+            except Exception as e:
+                logger.error(f"Error handling the leadership change: {e}")
+
+    def release(self):
+        """Give the lease up so a follower takes over right away"""
+        if not self.is_leader:
+            return
+        self._set_leader(False)
+        try:
+            record = self.lock.get(self.name)
+            if record is not None and record.holder == self.identity:
+                self.lock.update(self.name, replace(record, holder='', renew_time=time.time()))
+        except Exception as e:
+            logger.warning(f"Could not release lease {self.name}: {e}")
+
+
+class HashRing:
+    """Consistent hash ring of replica identities
+
+    Every replica has virtual_nodes points on the ring and a namespace
+    belongs to the replica of the first point after its hash, so when a
+    replica joins or leaves only about 1/N of the namespaces move.
+    """
+
+    def __init__(self, members, virtual_nodes=SHARD_VIRTUAL_NODES):
+        self.members = tuple(sorted(members))
+        points = sorted((self._hash(f"{member}#{i}"), member) for member in self.members for i in range(virtual_nodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [member for _, member in points]
+        self._cache = {}
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def owner(self, key):
+        owner = self._cache.get(key)
+        if owner is None and self._owners:
+            index = bisect.bisect(self._hashes, self._hash(key)) % len(self._hashes)
+            owner = self._cache[key] = self._owners[index]
+        return owner
+
+
+class ShardMembership:
+    """This replica's member lease and the hash ring of all replicas with a live one
+
+    Every replica renews its own member lease each retry period and lists
+    those of its peers; replicas whose lease expired drop out of the ring
+    and their namespaces move to the others.
+    """
+
+    def __init__(self, lock, group=LEASE_NAME, identity=REPLICA_IDENTITY, lease_duration=LEASE_DURATION,
+                 virtual_nodes=SHARD_VIRTUAL_NODES, on_change=None):
+        self.lock = lock
+        self.group = group
+        self.identity = identity
+        self.lease_name = member_lease_name(group, identity)
+        self.lease_duration = lease_duration
+        self.virtual_nodes = virtual_nodes
+        # Called with the new HashRing whenever the live replicas change
+        self.on_change = on_change
+        self.observer = LeaseObserver()
+        # None until the first successful refresh, this replica then owns no namespace
+        self.ring = None
+        self.joined = False
+
+    def heartbeat(self):
+        """Create or renew this replica's member lease"""
+        now = time.time()
+        record = self.lock.get(self.lease_name)
+        if record is None:
+            self.lock.create(self.lease_name, LeaseRecord(self.identity, now, now, self.lease_duration), self.group)
+        else:
+            self.lock.update(self.lease_name, replace(record, holder=self.identity, renew_time=now,
+                                                      duration=self.lease_duration), self.group)
+
+    def refresh(self):
+        """Rebuild the ring from the live member leases"""
+        leases = self.lock.members(self.group)
+        self.observer.retain(leases)
+        live = {record.holder for name, record in leases.items()
+                if name == self.lease_name or not self.observer.expired(name, record)}
+        live.add(self.identity)
+        if self.ring is None or set(self.ring.members) != live:
+            self.ring = HashRing(live, self.virtual_nodes)
+            logger.info(f"Namespace shards rebalanced across {len(live)} replica(s): {', '.join(self.ring.members)}")
+            if self.on_change is not None:
+                self.on_change(self.ring)
+
+    def step(self):
+        try:
+            self.heartbeat()
+            if not self.joined:
+                # Replicas started together see each other's member leases from the next step on,
+                # building the ring now would have each of them own every namespace for a period
+                self.joined = True
+                return
+            self.refresh()
+        except Exception as e:
+            logger.warning(f"Could not update shard membership: {e}")
+
+    def owns(self, namespace):
+        ring = self.ring
+        return ring is not None and ring.owner(namespace) == self.identity
+
+    def release(self):
+        try:
+            self.lock.delete(self.lease_name)
+        except Exception as e:
+            logger.warning(f"Could not remove member lease {self.lease_name}: {e}")
+
+
+class ReplicaCoordinator:
+    """Leader election, and optionally namespace sharding, of the monitor replicas in one thread"""
+
+    def __init__(self, lock, identity=REPLICA_IDENTITY, sharded=SHARD_NAMESPACES, retry_period=LEASE_RETRY_PERIOD,
+                 on_change=None):
+        self.lock = lock
+        self.identity = identity
+        self.sharded = sharded
+        self.retry_period = retry_period
+        # Called without arguments after leadership or the shard ring changed
+        self.on_change = on_change
+        self.elector = LeaderElector(lock, identity=identity, on_change=self._changed)
+        self.membership = ShardMembership(lock, identity=identity, on_change=self._changed) if sharded else None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def is_leader(self):
+        return self.elector.is_leader
+
+    @property
+    def ring(self):
+        return self.membership.ring if self.membership is not None else None
+
+    def owns_namespace(self, namespace):
+        return self.membership is None or self.membership.owns(namespace)
+
+    def _changed(self, _):
+        if self.on_change is not None:
+            self.on_change()
+
+    def step(self):
+        self.elector.step()
+        if self.membership is not None:
+            self.membership.step()
+
+    def start(self):
+        logger.info(f"Replica {self.identity} electing a leader through {self.lock.describe()}"
+                    f"{', namespaces sharded across replicas' if self.sharded else ''}")
+        # Without a first attempt every replica would start as a follower for a retry period
+        self.step()
+        self._thread = threading.Thread(target=self._run, name="leader-election", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stop_event.wait(self.retry_period):
+            self.step()
+
+    def stop(self):
+        """Stop and give up the leases, so the other replicas take over without waiting for them to expire"""
+        if self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        self.elector.release()
+        if self.membership is not None:
+            self.membership.release()
+
+    def status(self):
+        ring = self.ring
+        return {
+            "identity": self.identity,
+            "leader": self.is_leader,
+            "holder": self.elector.holder,
+            "transitions": self.elector.transitions,
+            "sharded": self.sharded,
+            "replicas": list(ring.members) if ring is not None else None,
+        }
+
+
+def lease_namespace():
+    if LEASE_NAMESPACE:
+        return LEASE_NAMESPACE
+    try:
+        with open(SERVICE_ACCOUNT_NAMESPACE) as namespace_file:
+            return namespace_file.read().strip()
+    except OSError:
+        return 'default'
+
+
+def create_coordinator(api_client_factory, on_change=None, election=LEADER_ELECTION):
+    """ReplicaCoordinator for LEADER_ELECTION, None when it is 'none'
+
+    api_client_factory returns the ApiClient of the cluster the replicas
+    run in, which holds the Lease objects.
+    """
+    if election == 'none':
+        return None
+    if election == 'lease':
+        lock = KubernetesLeaseLock(client.CoordinationV1Api(api_client_factory()), lease_namespace())
+    elif election == 'sqlite':
+        lock = SQLiteLeaseLock()
+    else:
+        raise ValueError(f"Unknown LEADER_ELECTION {election!r}, use 'none', 'lease' or 'sqlite'")
+    return ReplicaCoordinator(lock, on_change=on_change)
@@ -1,8 +1,16 @@
 import os
 import logging
-from flask import Flask, render_template, jsonify, request
-from k8s_monitor import k8s_monitor, start_monitoring_thread
-from models import db, Alert
+from functools import wraps
+from datetime import datetime, timedelta, timezone
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
+from k8s_monitor import k8s_monitor, start_monitoring_thread, email_queue, alert_grouper
+from models import db, Alert, AlertDailySummary
+from alert_store import alert_revisions
+from response_cache import ResponseCache, cached_json_response
+from alert_query import AlertFilters, AlertQueryError, iter_alerts_page
+from retention import RetentionJob
+from metrics import REGISTRY, CONTENT_TYPE
+from profiling import TRACER, SAMPLER, ProfilerBusy, PROFILE_MAX_SECONDS, PROFILE_SAMPLE_INTERVAL
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -12,8 +20,31 @@ logger = logging.getLogger(__name__)
 # Note: The Flask app in models.py is now the main app
 from models import app
 
+# Pod shard worker processes (EVAL_MODE=process) import this module again as __mp_main__,
+# only the application process starts the monitoring threads
+SHARD_WORKER = __name__ == '__mp_main__'
+
 # Start the Kubernetes monitoring in a background thread
-start_monitoring_thread()
+if not SHARD_WORKER:
+    start_monitoring_thread()
+
+# Pre-encoded responses keyed by data version and query parameters
+response_cache = ResponseCache()
+REGISTRY.counter_func('kubealertmail_response_cache_requests', "API responses served from the response cache (hit) or built (miss)",
+                      lambda: {('hit',): response_cache.hits, ('miss',): response_cache.misses}, ('result',))
+
+# Old resolved alerts are archived, summarized and removed in the background
+retention_job = RetentionJob(on_change=k8s_monitor.mark_alerts_changed, should_run=lambda: k8s_monitor.is_leader)
+if not SHARD_WORKER:
+    retention_job.start()
+
+def dashboard_request(view):
+    """Record every call of a dashboard API route as a dashboard_request trace (PROFILING)"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with TRACER.trace('dashboard_request', route=request.path):
+            return view(*args, **kwargs)
+    return wrapper
 
 @app.route('/')
 def index():
@@ -26,57 +57,100 @@ def dashboard():
     return render_template('dashboard.html')
 
 @app.route('/api/resources')
+@dashboard_request
 def api_resources():
-    """API endpoint to get current resources status"""
+    """API endpoint to get current resources status from the monitor's latest snapshot"""
     try:
-        data = k8s_monitor.get_all_resources()
-        return jsonify(data)
+        snapshot = k8s_monitor.snapshots.current
+        cached = response_cache.get_or_build(
+            ('resources', snapshot.version),
+            lambda: snapshot.to_dict(include_freshness=False)
+        )
+        response = cached_json_response(cached, request)
+        
+        # The age changes every second, so it is sent as a header instead of in the cached body
+        age = snapshot.age()
+        if age is not None:
+            response.headers['X-Snapshot-Age'] = f"{age:.1f}"
+        return response
     except Exception as e:
         logger.error(f"Error getting resources: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/alerts')
-def api_alerts():
-    """API endpoint to get alerts from the database"""
+@app.route('/api/resources/changes')
+@dashboard_request
+def api_resource_changes():
+    """API endpoint to get node, pod and alert changes since a snapshot version"""
     try:
-        # Get status filter parameter - Default is 'active'
-        status_filter = request.args.get('status', 'active')
-        
-        # Create query
-        query = Alert.query
-        
-        # Apply status filter
-        if status_filter == 'active':
-            query = query.filter(Alert.is_resolved == 0)
-        elif status_filter == 'resolved':
-            query = query.filter(Alert.is_resolved == 1)
-        
-        # Sort with most recent first
-        query = query.order_by(Alert.created_at.desc())
-        
-        # Execute query and get results
-        alerts = query.all()
+        since = request.args.get('since', type=int)
+        if since is None:
+            return jsonify({"error": "The 'since' parameter must be a snapshot version"}), 400
         
-        # Format alerts for JSON response
-        alerts_data = []
-        for alert in alerts:
-            # If 'status' value is 'None' or similar, replace with 'Unknown'
-            status_value = alert.status if alert.status else 'Unknown'
-            
-            alerts_data.append({
-                'id': alert.id,
-                'alert_key': alert.alert_key,
-                'resource_type': alert.resource_type,
-                'resource_name': alert.resource_name,
-                'resource_namespace': alert.resource_namespace,
-                'status': status_value,
-                'message': alert.message,
-                'created_at': alert.created_at.isoformat() if alert.created_at else None,
-                'resolved_at': alert.resolved_at.isoformat() if alert.resolved_at else None,
-                'is_resolved': bool(alert.is_resolved)
-            })
+        snapshot = k8s_monitor.snapshots.current
+        cached = response_cache.get_or_build(
+            ('changes', snapshot.version, since),
+            lambda: k8s_monitor.snapshots.changes_since(since)
+        )
+        response = cached_json_response(cached, request)
         
-        return jsonify({'alerts': alerts_data})
+        age = snapshot.age()
+        if age is not None:
+            response.headers['X-Snapshot-Age'] = f"{age:.1f}"
+        return response
+    except Exception as e:
+        logger.error(f"Error getting resource changes: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-Sent Events stream of resource changes and alerts"""
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    subscription = k8s_monitor.events.subscribe(last_event_id)
+    
+    def heartbeat_data():
+        snapshot = k8s_monitor.snapshots.current
+        age = snapshot.age()
+        return {"version": snapshot.version, "snapshot_age": round(age, 1) if age is not None else None}
+    
+    def generate():
+        try:
+            yield from subscription.iter_events(heartbeat_data)
+        finally:
+            k8s_monitor.events.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Keep reverse proxies from buffering the stream
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/alerts')
+@dashboard_request
+def api_alerts():
+    """API endpoint to get one page of alerts from the database, newest first
+
+    Filters: status (active, resolved, all), cluster, namespace, resource_type,
+    created_after/created_before (ISO 8601) and q (text search on resource
+    name and message). Pages are limited to limit alerts; pass the returned
+    next_cursor as cursor to get the next page.
+    """
+    try:
+        filters = AlertFilters.from_args(request.args)
+    except AlertQueryError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        if filters.cursor:
+            # Later pages are streamed as they are read from the database
+            return Response(stream_with_context(iter_alerts_page(filters)), mimetype='application/json')
+
+        # The first page is what the dashboard polls, keep it encoded until alerts change
+        cached = response_cache.get_or_build(
+            ('alerts', k8s_monitor.alerts_version, filters.cache_key()),
+            lambda: b''.join(iter_alerts_page(filters)),
+            encoded=True
+        )
+        return cached_json_response(cached, request)
     except Exception as e:
         logger.error(f"Error getting alerts: {e}")
         return jsonify({"error": str(e)}), 500
@@ -93,7 +167,11 @@ def delete_alert(alert_id):
         
         # Delete the alert
         db.session.delete(alert)
+        revision = alert_revisions.bump()
         db.session.commit()
+        alert_revisions.committed(revision)
+        k8s_monitor.forget_alert(alert_id)
+        k8s_monitor.refresh_snapshot_alerts()
         
         logger.info(f"Deleted alert with ID {alert_id}")
         return jsonify({"success": True, "message": f"Alert {alert_id} successfully deleted"})
@@ -113,7 +191,11 @@ def resolve_alert(alert_id):
         
         # Mark as resolved
         alert.resolve()
+        revision = alert_revisions.bump()
         db.session.commit()
+        alert_revisions.committed(revision)
+        k8s_monitor.forget_alert(alert_id)
+        k8s_monitor.refresh_snapshot_alerts()
         
         logger.info(f"Resolved alert with ID {alert_id}")
         return jsonify({"success": True, "message": f"Alert {alert_id} marked as resolved"})
@@ -121,6 +203,94 @@ def resolve_alert(alert_id):
         logger.error(f"Error resolving alert: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/email/stats')
+def api_email_stats():
+    """API endpoint to get email delivery queue metrics and dead letters"""
+    return jsonify({
+        **email_queue.stats(),
+        'alerts_grouped': alert_grouper.alerts_grouped,
+        'digests_sent': alert_grouper.digests_sent,
+        'dead_letter_emails': [email.to_dict() for email in email_queue.dead_letters]
+    })
+
+@app.route('/api/alerts/summary')
+def api_alert_summary():
+    """API endpoint to get daily alert counts kept for alerts removed by retention, optionally of one cluster"""
+    try:
+        days = int(request.args.get('days', '90'))
+    except ValueError:
+        return jsonify({"error": "days must be an integer"}), 400
+    cluster = request.args.get('cluster')
+
+    try:
+        since = datetime.now(timezone.utc).date() - timedelta(days=days)
+        query = AlertDailySummary.query.filter(AlertDailySummary.day >= since)
+        if cluster:
+            query = query.filter(AlertDailySummary.cluster == cluster)
+        summaries = query.order_by(AlertDailySummary.day.desc(), AlertDailySummary.count.desc()).all()
+        return jsonify({'summaries': [summary.to_dict() for summary in summaries]})
+    except Exception as e:
+        logger.error(f"Error getting alert summaries: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/retention/stats')
+def api_retention_stats():
+    """API endpoint to get alert retention run metrics"""
+    return jsonify(retention_job.stats())
+
+@app.route('/api/monitor/stats')
+def api_monitor_stats():
+    """API endpoint to get how many objects the last monitor cycles evaluated and skipped, per cluster with CLUSTERS"""
+    return jsonify(k8s_monitor.cycle_stats)
+
+@app.route('/api/clusters')
+def api_clusters():
+    """API endpoint to get the monitored clusters and how their last monitor cycle went"""
+    return jsonify({'clusters': k8s_monitor.cluster_status()})
+
+@app.route('/api/replica')
+def api_replica():
+    """API endpoint to get whether this replica leads and which replicas share the namespaces"""
+    return jsonify(k8s_monitor.replica_status())
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics of the monitor cycles, alerts, email delivery and caches"""
+    return Response(REGISTRY.render(), mimetype=None, content_type=CONTENT_TYPE)
+
+@app.route('/admin/profile/traces')
+def admin_profile_traces():
+    """Chrome trace-event JSON of the slowest recorded cycles (name=cycle) or dashboard API requests (name=dashboard_request)"""
+    if not TRACER.enabled:
+        return jsonify({"error": "Profiling is disabled, set PROFILING=true"}), 404
+    return jsonify(TRACER.chrome_trace(request.args.get('name')))
+
+@app.route('/admin/profile/sample')
+def admin_profile_sample():
+    """Sample the monitor threads for seconds and return collapsed stacks for flamegraphs
+
+    threads takes comma separated thread name prefixes (PROFILE_THREADS by
+    default), interval the seconds between samples.
+    """
+    if not TRACER.enabled:
+        return jsonify({"error": "Profiling is disabled, set PROFILING=true"}), 404
+    try:
+        seconds = float(request.args.get('seconds', '10'))
+        interval = float(request.args.get('interval', PROFILE_SAMPLE_INTERVAL))
+    except ValueError:
+        return jsonify({"error": "seconds and interval must be numbers"}), 400
+    if not 0 < seconds <= PROFILE_MAX_SECONDS or not 0.001 <= interval <= seconds:
+        return jsonify({"error": f"seconds must be between 0 and {PROFILE_MAX_SECONDS:g}, interval between 0.001 and seconds"}), 400
+    threads = request.args.get('threads')
+    thread_prefixes = [prefix for prefix in threads.split(',') if prefix] if threads else None
+
+    try:
+        stacks, samples = SAMPLER.profile(seconds, interval, thread_prefixes)
+    except ProfilerBusy as e:
+        return jsonify({"error": str(e)}), 409
+    logger.info(f"Sampled {samples} times over {seconds:g}s, {len(stacks)} distinct stacks")
+    return Response(SAMPLER.collapsed(stacks), mimetype='text/plain', headers={'X-Profile-Samples': str(samples)})
+
 @app.route('/healthz')
 def health_check():
     """Kubernetes health check endpoint"""
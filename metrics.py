@@ -0,0 +1,195 @@
+import time
+import bisect
+import logging
+import threading
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# Prometheus text exposition format version served by /metrics
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds, from a cache hit to a slow list of a large cluster
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter, one value per combination of label values"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labelvalues, value in values:
+            yield f"{self.name}_total{_labels(self.labelnames, labelvalues)} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative histogram of observed values, one per combination of label values
+
+    observe() only finds the bucket with bisect and bumps two numbers under
+    a lock, the cumulative bucket counts are computed when scraped.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label values -> [bucket counts (the last one is +Inf), sum]
+        self._values = {}
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labelvalues)
+            if series is None:
+                series = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, *labelvalues):
+        """Decorator observing the duration of every call of a function"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, *labelvalues)
+            return wrapper
+        return decorator
+
+    def samples(self):
+        with self._lock:
+            values = [(labelvalues, list(counts), total) for labelvalues, (counts, total) in self._values.items()]
+        for labelvalues, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _labels(self.labelnames, labelvalues, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Collected:
+    """Gauge or counter read from the application when scraped, so it costs nothing in between
+
+    collect() returns {label values tuple: value}, or a single number for
+    a metric without labels.
+    """
+
+    def __init__(self, kind, name, documentation, collect, labelnames=()):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        values = self.collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        suffix = '_total' if self.kind == 'counter' else ''
+        for labelvalues, value in values.items():
+            if value is not None:
+                yield f"{self.name}{suffix}{_labels(self.labelnames, labelvalues)} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """The metrics of this process, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_func(self, name, documentation, collect, labelnames=()):
+        return self.register(Collected('gauge', name, documentation, collect, labelnames))
+
+    def counter_func(self, name, documentation, collect, labelnames=()):
+        return self.register(Collected('counter', name, documentation, collect, labelnames))
+
+    def render(self):
+        """Return the text exposition of every metric, a failing collector only loses its own metric"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                logger.error(f"Failed to collect metric {metric.name}: {e}")
+                continue
+            # Counter samples and so their family carry the _total suffix
+            name = f"{metric.name}_total" if metric.kind == 'counter' else metric.name
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+# Hot path metrics of the monitor, observed once per cycle phase, alert check or email
+CYCLE_SECONDS = REGISTRY.histogram(
+    'kubealertmail_cycle_seconds', "Duration of a monitor cycle", ('cluster',))
+CYCLE_PHASE_SECONDS = REGISTRY.histogram(
+    'kubealertmail_cycle_phase_seconds',
+    "Duration of a phase of a monitor cycle: node_list, node_evaluation, pod_list, pod_evaluation, database, publish",
+    ('cluster', 'phase'))
+ALERT_CHECK_SECONDS = REGISTRY.histogram(
+    'kubealertmail_alert_check_seconds', "Duration of the cool down and database check of an alert",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0))
+SMTP_SEND_SECONDS = REGISTRY.histogram(
+    'kubealertmail_smtp_send_seconds', "Duration of an SMTP send, including connecting when needed", ('result',))
+ALERTS = REGISTRY.counter(
+    'kubealertmail_alerts', "Alerts (and recoveries) handed to email grouping", ('cluster', 'type', 'reason'))
+OBJECTS_EVALUATED = REGISTRY.counter(
+    'kubealertmail_objects_evaluated', "Nodes and pods looked at by monitor cycles, evaluated or skipped as unchanged",
+    ('cluster', 'kind', 'result'))
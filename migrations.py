@@ -0,0 +1,150 @@
+import time
+import logging
+from sqlalchemy import MetaData, inspect, select, text
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_columns(engine, table):
+    """Add the nullable columns declared on a table that do not exist yet, return their names
+
+    create_all() does not change existing tables. Only nullable columns
+    without a server default are added, which needs no table rewrite.
+    """
+    existing = {column['name'] for column in inspect(engine).get_columns(table.name)}
+    added = []
+    for column in table.columns:
+        if column.name in existing or not column.nullable:
+            continue
+        column_type = column.type.compile(dialect=engine.dialect)
+        with engine.begin() as connection:
+            connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+        added.append(column.name)
+        logger.info(f"Added column {column.name} to {table.name}")
+    return added
+
+
+def invalid_indexes(connection, table_name):
+    """Names of the PostgreSQL indexes of a table left INVALID by a failed or interrupted CREATE INDEX CONCURRENTLY"""
+    return set(connection.execute(text(
+        "SELECT index_class.relname FROM pg_index"
+        " JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid"
+        " JOIN pg_class table_class ON table_class.oid = pg_index.indrelid"
+        " WHERE table_class.relname = :table AND NOT pg_index.indisvalid"
+    ), {'table': table_name}).scalars())
+
+
+def ensure_indexes(engine, table):
+    """Create the indexes declared on a table that are missing or stale, return their names
+
+    Safe to run on every start. An existing index is dropped and built
+    again when its columns differ from the declared ones or, on
+    PostgreSQL, when it is INVALID. On PostgreSQL indexes are built with
+    CREATE INDEX CONCURRENTLY so a large alerts table stays writable while
+    they are created.
+    """
+    existing = {index['name']: index['column_names'] for index in inspect(engine).get_indexes(table.name)}
+    postgresql = engine.dialect.name == 'postgresql'
+    if postgresql:
+        with engine.connect() as connection:
+            invalid = invalid_indexes(connection, table.name)
+        # CONCURRENTLY is set on copies, the declared indexes are shared by every engine
+        copies = {index.name: index for index in table.to_metadata(MetaData()).indexes}
+    created = []
+    for index in sorted(table.indexes, key=lambda index: index.name):
+        columns = [column.name for column in index.columns]
+        stale = index.name in existing and (existing[index.name] != columns or postgresql and index.name in invalid)
+        if index.name in existing and not stale:
+            continue
+
+        started = time.perf_counter()
+        if postgresql:
+            index = copies[index.name]
+            index.dialect_options['postgresql']['concurrently'] = True
+            # CONCURRENTLY cannot run inside a transaction block
+            with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                if stale:
+                    connection.execute(DropIndex(index, if_exists=True))
+                connection.execute(CreateIndex(index))
+        else:
+            with engine.begin() as connection:
+                if stale:
+                    connection.execute(DropIndex(index, if_exists=True))
+                connection.execute(CreateIndex(index))
+        created.append(index.name)
+        logger.info(f"{'Rebuilt' if stale else 'Created'} index {index.name} on {table.name} in {time.perf_counter() - started:.1f}s")
+    return created
+
+
+def ensure_summary_cluster(engine, table):
+    """Rebuild a daily summary table created before it had a cluster column, return True if it was rebuilt
+
+    The cluster is part of the table's unique constraint, which cannot be
+    changed in place on SQLite. The table only holds a few rows per day,
+    so its rows are read, the table is created again and the rows are
+    written back with an empty cluster, the value of a deployment without
+    CLUSTERS.
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table(table.name):
+        return False
+    if 'cluster' in {column['name'] for column in inspector.get_columns(table.name)}:
+        return False
+
+    # New ids, so a PostgreSQL sequence created with the table does not collide with copied ones
+    columns = [column.name for column in table.columns if column.name not in ('id', 'cluster')]
+    with engine.begin() as connection:
+        rows = connection.execute(select(*[table.c[name] for name in columns])).mappings().all()
+        connection.execute(text(f'DROP TABLE {table.name}'))
+        table.create(connection)
+        if rows:
+            connection.execute(table.insert(), [dict(row, cluster='') for row in rows])
+    logger.info(f"Added column cluster to {table.name}")
+    return True
+
+
+# PostgreSQL trigram indexes for the /api/alerts text search, (name, column)
+TRIGRAM_INDEXES = [
+    ('ix_alerts_resource_name_trgm', 'resource_name'),
+    ('ix_alerts_message_trgm', 'message'),
+]
+
+
+def ensure_trigram_indexes(engine):
+    """Create the pg_trgm GIN indexes used by ILIKE '%...%' searches, if the extension is available"""
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        try:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        except Exception as e:
+            logger.warning(f"pg_trgm extension not available, alert search will not be indexed: {e}")
+            return []
+
+        existing = {index['name'] for index in inspect(connection).get_indexes('alerts')} - invalid_indexes(connection, 'alerts')
+        created = []
+        for name, column in TRIGRAM_INDEXES:
+            if name in existing:
+                continue
+            started = time.perf_counter()
+            # An INVALID index left by an interrupted build would be kept by IF NOT EXISTS
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            connection.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON alerts USING gin ({column} gin_trgm_ops)"
+            ))
+            created.append(name)
+            logger.info(f"Created index {name} on alerts in {time.perf_counter() - started:.1f}s")
+        return created
+
+
+def run_migrations(engine, metadata):
+    """Bring an existing database up to date with the models"""
+    try:
+        if 'alert_daily_summaries' in metadata.tables:
+            ensure_summary_cluster(engine, metadata.tables['alert_daily_summaries'])
+        for table in metadata.sorted_tables:
+            ensure_columns(engine, table)
+            ensure_indexes(engine, table)
+        if engine.dialect.name == 'postgresql':
+            ensure_trigram_indexes(engine)
+    except Exception as e:
+        logger.error(f"Database migration failed: {e}")
@@ -1,16 +1,29 @@
 import logging
 import uuid
+import random
 from datetime import datetime
 from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional
 
 # Mock Kubernetes sınıfları
+@dataclass
+class V1OwnerReference:
+    kind: str
+    name: str
+
 @dataclass
 class V1ObjectMeta:
     name: str
     namespace: str = "default"
     labels: Dict[str, str] = field(default_factory=dict)
     uid: str = field(default_factory=lambda: str(uuid.uuid4()))
+    resource_version: Optional[str] = None
+    owner_references: Optional[List[V1OwnerReference]] = None
+
+@dataclass
+class V1ListMeta:
+    resource_version: Optional[str] = None
+    _continue: Optional[str] = None
 
 @dataclass
 class V1NodeSystemInfo:
@@ -103,6 +116,22 @@ class V1Pod:
     status: V1PodStatus
     spec: V1PodSpec
 
+@dataclass
+class SyntheticPodStatus(V1PodStatus):
+    # Failed pods carry why, e.g. Evicted
+    reason: Optional[str] = None
+    message: Optional[str] = None
+
+@dataclass
+class V1NodeList:
+    items: List[V1Node]
+    metadata: V1ListMeta = field(default_factory=V1ListMeta)
+
+@dataclass
+class V1PodList:
+    items: List[V1Pod]
+    metadata: V1ListMeta = field(default_factory=V1ListMeta)
+
 logger = logging.getLogger(__name__)
 
 def get_mock_nodes():
@@ -265,4 +294,310 @@ def get_mock_pods():
             mock_pods.append(pod)
     
     logger.info(f"Created {len(mock_pods)} mock pods for demonstration")
-    return mock_pods
\ No newline at end of file
+    return mock_pods
+def generate_mock_pods(count, namespaces=50, nodes=100, unhealthy_ratio=0.05, seed=0):
+    """Generate a large synthetic pod list for benchmarks
+
+    The same count and namespaces always give the same pods; a different
+    seed changes which of them are unhealthy, so two seeds in a row
+    produce alerts as well as recoveries.
+    """
+    rng = random.Random(seed)
+    waiting_reasons = ["CrashLoopBackOff", "ImagePullBackOff", "ErrImagePull", "CreateContainerError"]
+    pods = []
+    for i in range(count):
+        namespace = f"namespace-{i % namespaces}"
+        node_name = f"node-{i % nodes}"
+        unhealthy = rng.random() < unhealthy_ratio
+
+        container_statuses = []
+        for j in range(1 + i % 3):
+            if unhealthy and j == 0:
+                reason = rng.choice(waiting_reasons)
+                state = V1ContainerState(waiting=V1ContainerStateWaiting(reason=reason, message=f"Back-off in {reason}"))
+                ready = False
+                restart_count = rng.randint(0, 12)
+            else:
+                state = V1ContainerState(running=V1ContainerStateRunning(started_at="2024-01-01T00:00:00"))
+                ready = True
+                restart_count = 0
+            container_statuses.append(V1ContainerStatus(
+                name=f"container-{j+1}", ready=ready, restart_count=restart_count, state=state,
+                container_id=f"containerd://{i}-{j}"
+            ))
+
+        phase = "Running"
+        if unhealthy:
+            phase = rng.choice(["Running", "Pending", "Failed"])
+
+        pods.append(V1Pod(
+            metadata=V1ObjectMeta(name=f"pod-{i}", namespace=namespace, uid=f"uid-{i}"),
+            status=V1PodStatus(phase=phase, pod_ip=f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+                               container_statuses=container_statuses),
+            spec=V1PodSpec(node_name=node_name, containers=[V1Container(name=cs.name) for cs in container_statuses])
+        ))
+    return pods
+
+
+# Failure modes of synthetic pods and the share of pods in each, the rest is healthy
+DEFAULT_FAILURE_MIX = {
+    "crashloop": 0.01,
+    "image_pull": 0.005,
+    "pending": 0.005,
+    "oom": 0.003,
+    "failed": 0.003,
+    "evicted": 0.002,
+    "restarts": 0.005,
+}
+
+
+class SyntheticPod:
+    """State of one synthetic pod, turned into a V1Pod when listed"""
+    __slots__ = ('index', 'app', 'name', 'namespace', 'owner', 'node', 'mode', 'version', 'containers')
+
+    def __init__(self, index, app, name, namespace, owner, node, mode, version, containers):
+        self.index = index
+        self.app = app
+        self.name = name
+        self.namespace = namespace
+        self.owner = owner
+        self.node = node
+        self.mode = mode
+        self.version = version
+        self.containers = containers
+
+
+class SyntheticCluster:
+    """A parameterized large cluster for benchmarks: N nodes, M pods and a mix of failure modes
+
+    The same parameters and seed always give the same cluster. step()
+    applies churn: pods change failure mode (alerts and recoveries) or are
+    replaced under a new name like in a rollout. The storms node_loss() and
+    bad_rollout() break many pods at once, recover() undoes them. Every
+    changed object gets a new resourceVersion, so the monitor's skipping of
+    unchanged objects works as against a real API server; core_v1() serves
+    the cluster through the list calls of CoreV1Api.
+    """
+
+    def __init__(self, nodes=100, pods=5000, namespaces=50, apps=500, failure_mix=None,
+                 node_failure_ratio=0.01, churn=0.0, seed=0):
+        self.rng = random.Random(seed)
+        self.node_count = nodes
+        self.namespace_count = namespaces
+        self.app_count = apps
+        self.failure_mix = dict(DEFAULT_FAILURE_MIX if failure_mix is None else failure_mix)
+        self.churn = churn
+        self._version = 0
+        self._generation = 0
+        self._lists = None
+        self.lost_nodes = set()
+        self.broken_apps = set()
+
+        self.node_states = {}  # node name -> (ready, version)
+        for i in range(nodes):
+            self.node_states[f"node-{i}"] = (self.rng.random() >= node_failure_ratio, self._next_version())
+
+        self.pods = {}
+        for i in range(pods):
+            self._add_pod(i)
+        self._next_pod = pods
+
+    def _next_version(self):
+        self._version += 1
+        return str(self._version)
+
+    def _sample_mode(self):
+        value = self.rng.random()
+        for mode, ratio in self.failure_mix.items():
+            if value < ratio:
+                return mode
+            value -= ratio
+        return "healthy"
+
+    def _add_pod(self, i):
+        app = i % self.app_count
+        pod = SyntheticPod(
+            index=i, app=app, name=f"app-{app}-{i:07d}", namespace=f"namespace-{app % self.namespace_count}",
+            owner=f"app-{app}-{self._generation:x}", node=f"node-{self.rng.randrange(self.node_count)}",
+            mode=self._sample_mode(), version=self._next_version(), containers=1 + i % 3
+        )
+        self.pods[pod.name] = pod
+        return pod
+
+    def _touch(self, pod, mode):
+        pod.mode = mode
+        pod.version = self._next_version()
+
+    def step(self, churn=None):
+        """Apply one interval of churn, return (pods changed, pods replaced)"""
+        churn = self.churn if churn is None else churn
+        count = int(len(self.pods) * churn)
+        if not count:
+            return 0, 0
+        self._lists = None
+        names = self.rng.sample(list(self.pods), count)
+        changed = replaced = 0
+        for name in names[:count // 2]:
+            pod = self.pods[name]
+            if pod.node not in self.lost_nodes:
+                self._touch(pod, self._sample_mode())
+                changed += 1
+        for name in names[count // 2:]:
+            del self.pods[name]
+            self._add_pod(self._next_pod)
+            self._next_pod += 1
+            replaced += 1
+        return changed, replaced
+
+    def node_loss(self, count):
+        """Storm: count ready nodes stop responding and their pods fail with NodeLost"""
+        self._lists = None
+        lost = [name for name, (ready, _) in self.node_states.items() if ready and name not in self.lost_nodes][:count]
+        for name in lost:
+            self.lost_nodes.add(name)
+            self.node_states[name] = (False, self._next_version())
+        affected = 0
+        for pod in self.pods.values():
+            if pod.node in self.lost_nodes and pod.mode != "node_lost":
+                self._touch(pod, "node_lost")
+                affected += 1
+        return affected
+
+    def bad_rollout(self, apps):
+        """Storm: every pod of apps applications goes into CrashLoopBackOff"""
+        self._lists = None
+        self.broken_apps.update(self.rng.sample(range(self.app_count), apps))
+        affected = 0
+        for pod in self.pods.values():
+            if pod.app in self.broken_apps and pod.mode != "crashloop":
+                self._touch(pod, "crashloop")
+                affected += 1
+        return affected
+
+    def recover(self):
+        """End the storms: lost nodes come back, their pods and broken rollouts are replaced by healthy pods"""
+        self._lists = None
+        self._generation += 1
+        for name in self.lost_nodes:
+            self.node_states[name] = (True, self._next_version())
+        replaced = 0
+        for name, pod in list(self.pods.items()):
+            if pod.node in self.lost_nodes or pod.app in self.broken_apps:
+                del self.pods[name]
+                self._add_pod(self._next_pod).mode = "healthy"
+                self._next_pod += 1
+                replaced += 1
+        self.lost_nodes = set()
+        self.broken_apps = set()
+        return replaced
+
+    def node_objects(self):
+        nodes = []
+        for i, (name, (ready, version)) in enumerate(self.node_states.items()):
+            labels = {"kubernetes.io/hostname": name,
+                      "node-role.kubernetes.io/master" if i < 3 else "node-role.kubernetes.io/worker": ""}
+            condition = (V1NodeCondition(type="Ready", status="True", last_transition_time="2024-01-01T00:00:00")
+                         if ready else
+                         V1NodeCondition(type="Ready", status="Unknown", reason="NodeStatusUnknown",
+                                         message="Kubelet stopped posting node status.",
+                                         last_transition_time="2024-01-01T00:00:00"))
+            nodes.append(V1Node(
+                metadata=V1ObjectMeta(name=name, namespace=None, labels=labels, uid=f"node-uid-{i}", resource_version=version),
+                status=V1NodeStatus(conditions=[condition],
+                                    node_info=V1NodeSystemInfo(kubelet_version="v1.29.0", boot_id=f"boot-{i}"),
+                                    capacity={"cpu": "16", "memory": "64Gi"})
+            ))
+        return nodes
+
+    def pod_object(self, pod):
+        mode = pod.mode
+        phase, reason, message, node = "Running", None, None, pod.node
+        container_statuses = []
+        for j in range(pod.containers):
+            ready, restart_count = True, 0
+            state = V1ContainerState(running=V1ContainerStateRunning(started_at="2024-01-01T00:00:00"))
+            if j == 0 and mode != "healthy":
+                ready = False
+                if mode == "crashloop":
+                    restart_count = 12
+                    state = V1ContainerState(waiting=V1ContainerStateWaiting(
+                        reason="CrashLoopBackOff", message="back-off 5m0s restarting failed container"))
+                elif mode == "image_pull":
+                    phase = "Pending"
+                    state = V1ContainerState(waiting=V1ContainerStateWaiting(
+                        reason="ImagePullBackOff", message=f"Back-off pulling image registry.example.com/{pod.owner}"))
+                elif mode == "pending":
+                    phase, node = "Pending", None
+                    state = V1ContainerState(waiting=V1ContainerStateWaiting(
+                        reason="ContainerCreating", message="0/100 nodes are available: insufficient cpu"))
+                elif mode == "oom":
+                    restart_count = 3
+                    state = V1ContainerState(terminated=V1ContainerStateTerminated(
+                        reason="OOMKilled", exit_code=137, message="Container exceeded its memory limit",
+                        started_at="2024-01-01T00:00:00", finished_at="2024-01-01T01:00:00"))
+                elif mode in ("failed", "node_lost"):
+                    phase = "Failed"
+                    reason = "NodeLost" if mode == "node_lost" else "Error"
+                    message = f"Node {pod.node} which was running pod {pod.name} is unresponsive" if mode == "node_lost" else "Container exited with error"
+                    state = V1ContainerState(terminated=V1ContainerStateTerminated(
+                        reason="Error", exit_code=1, message="Container exited with error",
+                        started_at="2024-01-01T00:00:00", finished_at="2024-01-01T01:00:00"))
+                elif mode == "evicted":
+                    phase, reason = "Failed", "Evicted"
+                    message = "The node was low on resource: memory."
+                    state = V1ContainerState(terminated=V1ContainerStateTerminated(
+                        reason="Evicted", exit_code=137, message=message,
+                        started_at="2024-01-01T00:00:00", finished_at="2024-01-01T01:00:00"))
+                elif mode == "restarts":
+                    ready, restart_count = True, 8
+            container_statuses.append(V1ContainerStatus(
+                name=f"container-{j + 1}", ready=ready, restart_count=restart_count, state=state,
+                container_id=f"containerd://{pod.name}-{j}"
+            ))
+
+        return V1Pod(
+            metadata=V1ObjectMeta(name=pod.name, namespace=pod.namespace, uid=f"uid-{pod.name}",
+                                  resource_version=pod.version,
+                                  owner_references=[V1OwnerReference(kind="ReplicaSet", name=pod.owner)]),
+            status=SyntheticPodStatus(phase=phase, pod_ip=None if node is None else f"10.{pod.index // 65536 % 256}.{pod.index // 256 % 256}.{pod.index % 256}",
+                                      container_statuses=container_statuses, reason=reason, message=message),
+            spec=V1PodSpec(node_name=node, containers=[V1Container(name=cs.name) for cs in container_statuses])
+        )
+
+    def lists(self):
+        """(nodes, pods) as listed right now, built once per state of the cluster"""
+        if self._lists is None:
+            self._lists = (self.node_objects(), [self.pod_object(pod) for pod in self.pods.values()])
+        return self._lists
+
+    def core_v1(self):
+        return SyntheticCoreV1(self)
+
+
+class SyntheticCoreV1:
+    """The node and pod list calls of CoreV1Api served from a SyntheticCluster
+
+    limit/_continue paging is supported, selectors are ignored. calls
+    counts the list requests.
+    """
+
+    def __init__(self, cluster):
+        self.cluster = cluster
+        self.calls = 0
+
+    def _page(self, list_type, items, limit=None, _continue=None):
+        self.calls += 1
+        start = int(_continue or 0)
+        end = min(len(items), start + limit) if limit else len(items)
+        return list_type(items=items[start:end], metadata=V1ListMeta(
+            resource_version=str(self.cluster._version), _continue=str(end) if end < len(items) else None))
+
+    def list_node(self, limit=None, _continue=None, **kwargs):
+        return self._page(V1NodeList, self.cluster.lists()[0], limit, _continue)
+
+    def list_pod_for_all_namespaces(self, limit=None, _continue=None, **kwargs):
+        return self._page(V1PodList, self.cluster.lists()[1], limit, _continue)
+
+    def list_namespaced_pod(self, namespace, limit=None, _continue=None, **kwargs):
+        pods = [pod for pod in self.cluster.lists()[1] if pod.metadata.namespace == namespace]
+        return self._page(V1PodList, pods, limit, _continue)
@@ -1,8 +1,11 @@
 import os
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Date, Text, Index, UniqueConstraint
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql import func
+from sqlalchemy.dialects import sqlite
 from flask_sqlalchemy import SQLAlchemy
 from flask import Flask
+from clusters import split_alert_key
 
 # create the app
 app = Flask(__name__)
@@ -30,19 +33,61 @@ class Alert(db.Model):
     resource_type = Column(String(50), nullable=False)
     resource_name = Column(String(255), nullable=False)
     resource_namespace = Column(String(255), nullable=True)
+    # Name of the monitored cluster, empty for the single cluster of a deployment without CLUSTERS
+    cluster = Column(String(255), nullable=True)
     status = Column(String(50), nullable=False)
     message = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=func.now(), nullable=False)
+    # On SQLite keep bound values in the CURRENT_TIMESTAMP format, so comparisons
+    # against stored timestamps (keyset pagination) work on the raw strings
+    created_at = Column(DateTime().with_variant(sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"), 'sqlite'),
+        default=func.now(), nullable=False)
     resolved_at = Column(DateTime, nullable=True)
     is_resolved = Column(Integer, default=0, nullable=False)
+
+    # Indexes for the hot queries; created on existing databases by migrations.py
+    __table_args__ = (
+        # Alert list filtered by status, newest first (/api/alerts)
+        Index('ix_alerts_is_resolved_created_at', 'is_resolved', 'created_at'),
+        # Keyset pagination over all alerts
+        Index('ix_alerts_created_at_id', 'created_at', 'id'),
+        # Resolving the alerts of a recovered or deleted resource, always looked up within its cluster
+        Index('ix_alerts_resource', 'cluster', 'resource_type', 'resource_name', 'resource_namespace', 'is_resolved'),
+        # Active alerts are a tiny part of the table, partial indexes keep them cheap to find
+        Index('ix_alerts_active_created_at', 'created_at',
+              postgresql_where=(is_resolved == 0), sqlite_where=(is_resolved == 0)),
+        Index('ix_alerts_active_alert_key', 'alert_key',
+              postgresql_where=(is_resolved == 0), sqlite_where=(is_resolved == 0)),
+        # Finding resolved alerts past their retention period (retention.py)
+        Index('ix_alerts_resolved_at', 'resolved_at'),
+        # Alert list of one cluster (/api/alerts?cluster=)
+        Index('ix_alerts_cluster_is_resolved_created_at', 'cluster', 'is_resolved', 'created_at'),
+    )
     
     def __repr__(self):
         return f'<Alert {self.alert_key}>'
+
+    def to_dict(self):
+        """Return the alert in the API response format"""
+        return {
+            'id': self.id,
+            'alert_key': self.alert_key,
+            'resource_type': self.resource_type,
+            'resource_name': self.resource_name,
+            'resource_namespace': self.resource_namespace,
+            'cluster': self.cluster,
+            # If 'status' value is 'None' or similar, replace with 'Unknown'
+            'status': self.status if self.status else 'Unknown',
+            'message': self.message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
+            'is_resolved': bool(self.is_resolved)
+        }
     
     @staticmethod
     def parse_alert_key(alert_key):
-        """Parse an alert key into its components"""
-        parts = alert_key.split(':')
+        """Parse an alert key into its components, without the cluster prefix"""
+        parts = split_alert_key(alert_key)[1].split(':')
         
         resource_type = parts[0]
         resource_name = parts[1]
@@ -61,13 +106,13 @@ class Alert(db.Model):
             resource_type=resource_type,
             resource_name=resource_name,
             resource_namespace=namespace,
+            cluster=split_alert_key(alert_key)[0],
             status=status,
             message=message
         )
     
     def resolve(self):
         """Mark the alert as resolved and send resolution notification email"""
-        from datetime import datetime
         import logging
         logger = logging.getLogger(__name__)
         
@@ -76,65 +121,133 @@ class Alert(db.Model):
             try:
                 self.is_resolved = 1
                 self.resolved_at = func.now()
-                
-                # Generate an informative message
-                resource_info = f"{self.resource_namespace}/{self.resource_name}" if self.resource_namespace else self.resource_name
-                resolved_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                
-                # Prepare notification message
-                subject = f"RESOLVED: {self.resource_type.capitalize()} alert for {resource_info}"
-                message = f"""
-                <h2>Kubernetes Alert Resolved</h2>
-                <p>The following alert has been resolved:</p>
-                <table border="1" cellpadding="5" style="border-collapse: collapse;">
-                    <tr>
-                        <th style="text-align: right; background-color: #f0f0f0;">Resource Type:</th>
-                        <td><strong>{self.resource_type}</strong></td>
-                    </tr>
-                    <tr>
-                        <th style="text-align: right; background-color: #f0f0f0;">Resource Name:</th>
-                        <td>{self.resource_name}</td>
-                    </tr>
-                    <tr>
-                        <th style="text-align: right; background-color: #f0f0f0;">Namespace:</th>
-                        <td>{self.resource_namespace or 'N/A'}</td>
-                    </tr>
-                    <tr>
-                        <th style="text-align: right; background-color: #f0f0f0;">Status:</th>
-                        <td>{self.status}</td>
-                    </tr>
-                    <tr>
-                        <th style="text-align: right; background-color: #f0f0f0;">Created At:</th>
-                        <td>{self.created_at}</td>
-                    </tr>
-                    <tr>
-                        <th style="text-align: right; background-color: #f0f0f0;">Resolved At:</th>
-                        <td>{resolved_time}</td>
-                    </tr>
-                </table>
-                <p>No further action is required for this alert.</p>
-                """
-                
-                # Try to import and use the email function
-                try:
-                    from sendgrid_util import send_email
-                    
-                    # Get recipient email from environment variable
-                    to_email = os.environ.get('SENDGRID_TO_EMAIL')
-                    if to_email:
-                        send_email(
-                            to_email=to_email,
-                            subject=subject,
-                            html_content=message
-                        )
-                        logger.info(f"Resolution notification sent for alert: {self.alert_key}")
-                    else:
-                        logger.warning("SENDGRID_TO_EMAIL not set, skipping resolution notification")
-                except Exception as e:
-                    logger.error(f"Error sending resolution notification: {e}")
+                send_resolution_notification(self.alert_key, *self.resolution_notice())
             except Exception as e:
                 logger.error(f"Error resolving alert: {e}")
+    
+    def resolution_notice(self):
+        """Return the (subject, html message) of the resolution notification email"""
+        from datetime import datetime
+        
+        # Generate an informative message
+        resource_info = f"{self.resource_namespace}/{self.resource_name}" if self.resource_namespace else self.resource_name
+        if self.cluster:
+            resource_info = f"{resource_info} in cluster {self.cluster}"
+        resolved_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        # Prepare notification message
+        subject = f"RESOLVED: {self.resource_type.capitalize()} alert for {resource_info}"
+        message = f"""
+        <h2>Kubernetes Alert Resolved</h2>
+        <p>The following alert has been resolved:</p>
+        <table border="1" cellpadding="5" style="border-collapse: collapse;">
+            <tr>
+                <th style="text-align: right; background-color: #f0f0f0;">Resource Type:</th>
+                <td><strong>{self.resource_type}</strong></td>
+            </tr>
+            <tr>
+                <th style="text-align: right; background-color: #f0f0f0;">Resource Name:</th>
+                <td>{self.resource_name}</td>
+            </tr>
+            <tr>
+                <th style="text-align: right; background-color: #f0f0f0;">Cluster:</th>
+                <td>{self.cluster or 'N/A'}</td>
+            </tr>
+            <tr>
+                <th style="text-align: right; background-color: #f0f0f0;">Namespace:</th>
+                <td>{self.resource_namespace or 'N/A'}</td>
+            </tr>
+            <tr>
+                <th style="text-align: right; background-color: #f0f0f0;">Status:</th>
+                <td>{self.status}</td>
+            </tr>
+            <tr>
+                <th style="text-align: right; background-color: #f0f0f0;">Created At:</th>
+                <td>{self.created_at}</td>
+            </tr>
+            <tr>
+                <th style="text-align: right; background-color: #f0f0f0;">Resolved At:</th>
+                <td>{resolved_time}</td>
+            </tr>
+        </table>
+        <p>No further action is required for this alert.</p>
+        """
+        return subject, message
+
+class AlertDailySummary(db.Model):
+    """Alert counts per day, cluster, namespace, resource type and status, kept after the alerts are deleted"""
+    __tablename__ = 'alert_daily_summaries'
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+    # Empty for the single cluster of a deployment without CLUSTERS, like the namespace of nodes
+    cluster = Column(String(255), nullable=False, default='')
+    # Empty for resources without a namespace, so the unique constraint also covers nodes
+    resource_namespace = Column(String(255), nullable=False, default='')
+    resource_type = Column(String(50), nullable=False)
+    status = Column(String(50), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Renamed with the cluster column, see migrations.ensure_summary_cluster()
+        UniqueConstraint('day', 'cluster', 'resource_namespace', 'resource_type', 'status',
+                         name='uq_alert_daily_summary_cluster'),
+    )
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat(),
+            'cluster': self.cluster or None,
+            'resource_namespace': self.resource_namespace or None,
+            'resource_type': self.resource_type,
+            'status': self.status,
+            'count': self.count
+        }
+
+
+class AlertRevision(db.Model):
+    """A single row counting the transactions that changed alerts, so replicas notice each other's changes"""
+    __tablename__ = 'alert_revisions'
+
+    id = Column(Integer, primary_key=True)
+    revision = Column(BigInteger, nullable=False, default=0)
+
+
+def send_resolution_notification(alert_key, subject, message):
+    """Send a resolution notification email through SendGrid"""
+    import logging
+    logger = logging.getLogger(__name__)
+    
+    # Try to import and use the email function
+    try:
+        from sendgrid_util import send_email
+        
+        # Get recipient email from environment variable
+        to_email = os.environ.get('SENDGRID_TO_EMAIL')
+        if to_email:
+            send_email(
+                to_email=to_email,
+                subject=subject,
+                html_content=message
+            )
+            logger.info(f"Resolution notification sent for alert: {alert_key}")
+        else:
+            logger.warning("SENDGRID_TO_EMAIL not set, skipping resolution notification")
+    except Exception as e:
+        logger.error(f"Error sending resolution notification: {e}")
 
 # Initialize the database
 with app.app_context():
-    db.create_all()
\ No newline at end of file
+    db.create_all()
+
+    # create_all() does not add new columns and indexes to an existing table
+    from migrations import run_migrations
+    run_migrations(db.engine, db.metadata)
+
+    # The alert revision counter row, created once by whichever replica starts first
+    if db.session.get(AlertRevision, 1) is None:
+        try:
+            db.session.add(AlertRevision(id=1, revision=0))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
@@ -0,0 +1,503 @@
+import os
+import sys
+import zlib
+import heapq
+import logging
+import multiprocessing
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+EVAL_WORKERS = int(os.environ.get('EVAL_WORKERS', '1'))  # pod evaluation shards, 1 evaluates in the monitor thread
+EVAL_MODE = os.environ.get('EVAL_MODE', 'thread')  # 'thread' or 'process' workers for the shards
+EVAL_PROCESS_START = os.environ.get('EVAL_PROCESS_START', 'forkserver')  # 'forkserver' or 'spawn', how process workers start
+EVAL_PARALLEL_MIN_PODS = int(os.environ.get('EVAL_PARALLEL_MIN_PODS', '2000'))  # smaller thread mode cycles run their shards serially
+
+# Phases and waiting reasons that raise alerts, and the ones a container can recover from
+ALERT_PHASES = ("Failed", "Pending")
+WAITING_ALERT_REASONS = ("CrashLoopBackOff", "ImagePullBackOff", "ErrImagePull",
+                         "CreateContainerConfigError", "CreateContainerError")
+CONTAINER_RECOVERY_REASONS = ("ImagePullBackOff", "CrashLoopBackOff", "ErrImagePull", "CreateContainerError")
+RESTART_ALERT_THRESHOLD = 5
+
+
+def container_record(container):
+    """Reduce a V1ContainerStatus to a plain tuple
+
+    (name, ready, restart_count, state, reason, waiting_reason, waiting_message)
+    where state is Running, Waiting, Terminated or Unknown. Tuples are much
+    cheaper than objects to create, to pickle and for the garbage collector.
+    """
+    state = container.state
+    waiting = state.waiting
+    if waiting and hasattr(waiting, 'reason'):
+        waiting_reason = waiting.reason
+        waiting_message = getattr(waiting, 'message', 'No message')
+    else:
+        waiting_reason = waiting_message = None
+
+    if state.running:
+        kind, reason = "Running", ""
+    elif waiting and hasattr(waiting, 'reason'):
+        kind, reason = "Waiting", waiting_reason
+    elif state.terminated:
+        kind, reason = "Terminated", getattr(state.terminated, 'reason', "")
+    else:
+        kind, reason = "Unknown", ""
+    return (container.name, container.ready, container.restart_count, kind, reason, waiting_reason, waiting_message)
+
+
+def container_record_from_dict(container):
+    """container_record() of a containerStatuses entry of raw pod JSON
+
+    Absent fields read as None, like the attributes of a deserialized model.
+    """
+    state = container.get('state') or {}
+    waiting = state.get('waiting')
+    if waiting is not None:
+        waiting_reason = waiting.get('reason')
+        waiting_message = waiting.get('message')
+    else:
+        waiting_reason = waiting_message = None
+
+    # An empty state object ({}) counts, as the model of it would
+    if state.get('running') is not None:
+        kind, reason = "Running", ""
+    elif waiting is not None:
+        kind, reason = "Waiting", waiting_reason
+    elif state.get('terminated') is not None:
+        kind, reason = "Terminated", state['terminated'].get('reason')
+    else:
+        kind, reason = "Unknown", ""
+    return (container.get('name'), container.get('ready'), container.get('restartCount'), kind, reason,
+            waiting_reason, waiting_message)
+
+
+class PodRecord:
+    """A pod reduced to plain values, cheap to evaluate and to send to a worker process"""
+    __slots__ = ('key', 'name', 'namespace', 'phase', 'node', 'owner', 'ip', 'containers', 'phase_details')
+
+    def __init__(self, name, namespace, phase, node=None, owner=None, ip=None, containers=(), phase_details=None):
+        self.key = f"{namespace}/{name}"
+        self.name = name
+        self.namespace = namespace
+        self.phase = phase
+        self.node = node
+        self.owner = owner
+        self.ip = ip
+        self.containers = containers  # container_record() tuples
+        # (reason, message) for the alert body and (reason, message) for the stored alert, alert phases only
+        self.phase_details = phase_details
+
+    def __reduce__(self):
+        return (PodRecord, (self.name, self.namespace, self.phase, self.node, self.owner, self.ip,
+                            self.containers, self.phase_details))
+
+    @classmethod
+    def from_pod(cls, pod):
+        """Extract a record from a Kubernetes V1Pod"""
+        metadata = pod.metadata
+        status = pod.status
+        phase = status.phase
+
+        # Labels used to group alert emails
+        owner_references = getattr(metadata, 'owner_references', None)
+        owner = f"{owner_references[0].kind}/{owner_references[0].name}" if owner_references else None
+
+        phase_details = None
+        if phase in ALERT_PHASES:
+            phase_details = (
+                getattr(status, 'reason', 'Not available'),
+                getattr(status, 'message', 'Not available'),
+                getattr(status, 'reason', 'Unknown reason'),
+                getattr(status, 'message', 'No details')
+            )
+
+        containers = tuple([container_record(container) for container in status.container_statuses or ()])
+        return cls(metadata.name, metadata.namespace, phase, getattr(pod.spec, 'node_name', None), owner,
+                   getattr(status, 'pod_ip', None), containers, phase_details)
+
+    @classmethod
+    def from_dict(cls, pod):
+        """Extract a record from a pod parsed from raw API JSON, the same record from_pod makes of its model"""
+        metadata = pod['metadata']
+        status = pod.get('status') or {}
+        phase = status.get('phase')
+
+        owner_references = metadata.get('ownerReferences')
+        owner = f"{owner_references[0].get('kind')}/{owner_references[0].get('name')}" if owner_references else None
+
+        phase_details = None
+        if phase in ALERT_PHASES:
+            reason = status.get('reason')
+            message = status.get('message')
+            phase_details = (reason, message, reason, message)
+
+        containers = tuple([container_record_from_dict(container)
+                            for container in status.get('containerStatuses') or ()])
+        return cls(metadata.get('name'), metadata.get('namespace'), phase, (pod.get('spec') or {}).get('nodeName'),
+                   owner, status.get('podIP'), containers, phase_details)
+
+    @classmethod
+    def from_object(cls, pod):
+        """Extract a record from a V1Pod or a raw JSON pod"""
+        if pod.__class__ is dict:
+            return cls.from_dict(pod)
+        return cls.from_pod(pod)
+
+    def summary(self):
+        """Return the dashboard representation of the pod"""
+        return {
+            "name": self.name,
+            "namespace": self.namespace,
+            "phase": self.phase,
+            "containers": [{
+                "name": name,
+                "ready": ready,
+                "restarts": restart_count,
+                "state": state,
+                "reason": reason
+            } for name, ready, restart_count, state, reason, _, _ in self.containers],
+            "node": self.node,
+            "ip": self.ip
+        }
+
+
+def record_fingerprint(record):
+    """Hash of everything in a record the evaluation and the dashboard summary depend on"""
+    return hash((record.phase, record.containers, record.phase_details, record.node, record.owner, record.ip))
+
+
+class PodState:
+    """What is kept of a pod between two evaluations
+
+    The phase and one (name, state, reason, ready) tuple per container,
+    with interned strings, plus the fingerprint of the record they were
+    taken from. Tuples of plain values are dropped from the garbage
+    collector's tracking, so 50k stored pods cost little memory and GC time.
+    """
+    __slots__ = ('phase', 'containers', 'fingerprint')
+
+    def __init__(self, phase, containers=(), fingerprint=None):
+        self.phase = phase
+        self.containers = containers
+        self.fingerprint = fingerprint
+
+    def __reduce__(self):
+        return (PodState, (self.phase, self.containers, self.fingerprint))
+
+    @classmethod
+    def from_record(cls, record, fingerprint):
+        intern = sys.intern
+        phase = record.phase
+        return cls(
+            intern(phase) if phase.__class__ is str else phase,
+            tuple([
+                (intern(name), state, intern(reason) if reason.__class__ is str else reason, ready)
+                for name, ready, _, state, reason, _, _ in record.containers
+            ]),
+            fingerprint
+        )
+
+    def container_states(self):
+        """{container name: (name, state, reason, ready)}"""
+        return {container[0]: container for container in self.containers}
+
+
+def next_pod_state(record, previous_state):
+    """The PodState to keep for a record, the previous one itself when the pod did not change"""
+    fingerprint = record_fingerprint(record)
+    if previous_state is not None and previous_state.fingerprint == fingerprint:
+        return previous_state
+    return PodState.from_record(record, fingerprint)
+
+
+class AlertCandidate:
+    """An alert the evaluation wants to raise; the monitor still applies the cool down"""
+    __slots__ = ('alert_key', 'subject', 'message', 'db_message', 'node', 'owner')
+
+    def __init__(self, alert_key, subject, message, db_message=None, node=None, owner=None):
+        self.alert_key = alert_key
+        self.subject = subject
+        self.message = message
+        # Message stored on the alert when it is raised
+        self.db_message = db_message
+        self.node = node
+        self.owner = owner
+
+    def __reduce__(self):
+        return (AlertCandidate, (self.alert_key, self.subject, self.message, self.db_message, self.node, self.owner))
+
+
+def evaluate_pod_record(record, previous_state):
+    """Evaluate one pod against its previous PodState (None for a new pod) without side effects
+
+    Returns (alert candidates in the order they must be applied, the new
+    PodState to keep for the pod). When the record's fingerprint did not
+    change, the previous PodState is returned as is and the recovery
+    checks, which need a state change, are skipped.
+    """
+    pod_key = record.key
+    pod_name = record.name
+    namespace = record.namespace
+    phase = record.phase
+    node = record.node
+    owner = record.owner
+    candidates = []
+
+    # Check for problematic pod phases
+    if phase in ALERT_PHASES:
+        reason, message, db_reason, db_message = record.phase_details
+        # Ayrıntılı hata mesajı
+        detailed_message = f"""
+            Kubernetes Pod Alert: {pod_key} is in {phase} state
+
+            Pod: {pod_name}
+            Namespace: {namespace}
+            Phase: {phase}
+            Reason: {reason}
+            Message: {message}
+            """
+        candidates.append(AlertCandidate(
+            f"pod:{pod_key}:{phase}", f"Pod {pod_name} is {phase}", detailed_message,
+            f"Pod {phase}: {db_reason} - {db_message}", node, owner
+        ))
+
+    current_state = next_pod_state(record, previous_state)
+    changed = current_state is not previous_state
+    # Recoveries are transitions, so an unchanged pod or a new pod has none
+    previous_containers = previous_state.container_states() if changed and previous_state else None
+
+    # One pass over the containers: alerts and recoveries
+    container_recoveries = []
+    for container_name, ready, restart_count, state, reason, wait_reason, wait_message in record.containers:
+
+        # Check for container restart issues
+        if restart_count > RESTART_ALERT_THRESHOLD:
+            message = f"""
+                    Kubernetes Container Alert: {container_name} in pod {pod_key} has restarted {restart_count} times
+
+                    Pod: {pod_name}
+                    Namespace: {namespace}
+                    Container: {container_name}
+                    Restart Count: {restart_count}
+                    """
+            candidates.append(AlertCandidate(
+                f"pod:{pod_key}:{container_name}:restarts", f"Container {container_name} has excessive restarts",
+                message, None, node, owner
+            ))
+
+        # Konteyner durum kontrolü (Waiting durumundaysa)
+        if wait_reason in WAITING_ALERT_REASONS:
+            # Ayrıntılı hata mesajı
+            detailed_message = f"""
+                    Kubernetes Container Alert: {container_name} in pod {pod_key} is in {wait_reason}
+
+                    Pod: {pod_name}
+                    Namespace: {namespace}
+                    Container: {container_name}
+                    Status: {wait_reason}
+                    Message: {wait_message}
+                    """
+            candidates.append(AlertCandidate(
+                f"pod:{pod_key}:{container_name}:{wait_reason}", f"Container {container_name} is in {wait_reason}",
+                detailed_message, f"Container {wait_reason}: {wait_message}", node, owner
+            ))
+
+        # Eğer konteyner bir hata durumundan Running durumuna geçtiyse
+        if state == "Running" and previous_containers:
+            previous_info = previous_containers.get(container_name)
+            if previous_info and previous_info[1] == "Waiting" and previous_info[2] in CONTAINER_RECOVERY_REASONS:
+                message = f"""
+                    Kubernetes Container Recovery: {container_name} in pod {pod_key} is now Running
+
+                    Pod: {pod_name}
+                    Namespace: {namespace}
+                    Container: {container_name}
+                    Previous Status: {previous_info[2]}
+                    Current Status: Running
+                    """
+                container_recoveries.append(AlertCandidate(
+                    f"pod:{pod_key}:{container_name}:ContainerRecovery", f"Container {container_name} recovered",
+                    message, None, node, owner
+                ))
+
+    # İyileşme durumunu kontrol et (Pod Running durumuna geçtiyse)
+    previous_phase = previous_state.phase if changed and previous_state else None
+    if phase == "Running" and previous_phase in ALERT_PHASES:
+        message = f"""
+                Kubernetes Pod Recovery: {pod_key} is now Running
+
+                Pod: {pod_name}
+                Namespace: {namespace}
+                Previous Status: {previous_phase}
+                Current Status: Running
+                """
+        candidates.append(AlertCandidate(f"pod:{pod_key}:Recovery", f"Pod {pod_name} recovered", message, None, node, owner))
+
+    # Container recoveries are sent after the pod recovery
+    candidates.extend(container_recoveries)
+    return candidates, current_state
+
+
+def shard_of(namespace, shards):
+    """Stable shard number of a namespace (the same in every process, unlike hash())"""
+    return zlib.crc32(namespace.encode('utf-8')) % shards
+
+
+class PodShard:
+    """The PodStates of the pods in one shard, only ever touched by the shard's worker"""
+
+    def __init__(self):
+        self.statuses = {}
+
+    def evaluate(self, batch, deleted=()):
+        """Evaluate the (index, record) pairs of a cycle and forget the deleted pod keys
+
+        Returns [(index, candidates)] in index order, with an entry for
+        every record, so the caller can tell which pods have alerts.
+        """
+        results = []
+        statuses = self.statuses
+        for index, record in batch:
+            candidates, statuses[record.key] = evaluate_pod_record(record, statuses.get(record.key))
+            results.append((index, candidates))
+
+        for key in deleted:
+            statuses.pop(key, None)
+        return results
+
+
+def _shard_process_main(connection):
+    """Worker process owning one shard, evaluating the batches it receives"""
+    shard = PodShard()
+    while True:
+        work = connection.recv()
+        if work is None:
+            break
+        connection.send(shard.evaluate(*work))
+
+
+class ShardProcess:
+    """A PodShard living in its own process, fed through a pipe"""
+
+    def __init__(self, context, number):
+        self.context = context
+        self.number = number
+        self.start()
+
+    def start(self):
+        self.connection, child = self.context.Pipe()
+        self.process = self.context.Process(target=_shard_process_main, args=(child,),
+                                            name=f"pod-shard-{self.number}", daemon=True)
+        self.process.start()
+        child.close()
+
+    def submit(self, batch, deleted):
+        self.connection.send((batch, deleted))
+
+    def result(self):
+        return self.connection.recv()
+
+    def restart(self):
+        """Replace a dead worker; its shard starts again without previous statuses"""
+        self.connection.close()
+        if self.process.is_alive():
+            self.process.terminate()
+        self.start()
+
+    def stop(self):
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+
+
+class ShardedPodEvaluator:
+    """Evaluates the pods of a cycle in shards partitioned by namespace
+
+    Every shard owns the previous statuses of its pods, so workers never
+    share state. Their alert candidates are merged back into the order
+    the pods were listed in, which makes the result identical to a serial
+    evaluation. Workers are started on the first evaluation. Process
+    workers come from a forkserver (or spawn), never from a fork of the
+    threaded monitor process; in thread mode cycles with fewer than
+    parallel_min_pods pods run their shards in the calling thread.
+    """
+
+    def __init__(self, workers=EVAL_WORKERS, mode=EVAL_MODE, start_method=EVAL_PROCESS_START,
+                 parallel_min_pods=EVAL_PARALLEL_MIN_PODS):
+        self.workers = max(1, workers)
+        self.mode = mode if self.workers > 1 else 'serial'
+        self.start_method = start_method
+        self.parallel_min_pods = parallel_min_pods
+        self._executor = None
+        self._processes = None
+        self._shards = None if self.mode == 'process' else [PodShard() for _ in range(self.workers)]
+        logger.info(f"Evaluating pods in {self.workers} shard(s) ({self.mode})")
+
+    def _start_workers(self):
+        if self.mode == 'process':
+            context = multiprocessing.get_context(self.start_method)
+            if self.start_method == 'forkserver':
+                # The workers only need this module
+                context.set_forkserver_preload([__name__])
+            self._processes = [ShardProcess(context, i) for i in range(self.workers)]
+        elif self.mode == 'thread':
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pod-shard")
+
+    def evaluate(self, records, deleted=()):
+        """Evaluate pod records and forget the statuses of the deleted pod keys
+
+        Returns [(index in records, alert candidates)] in record order.
+        """
+        batches = [[] for _ in range(self.workers)]
+        for index, record in enumerate(records):
+            batches[self.shard_of(record.namespace)].append((index, record))
+        deleted_keys = [[] for _ in range(self.workers)]
+        for key in deleted:
+            deleted_keys[self.shard_of(key.split('/', 1)[0])].append(key)
+
+        if self.mode == 'process':
+            if self._processes is None:
+                self._start_workers()
+            outputs = self._evaluate_in_processes(batches, deleted_keys)
+        elif self.mode == 'thread' and len(records) >= self.parallel_min_pods:
+            if self._executor is None:
+                self._start_workers()
+            outputs = list(self._executor.map(PodShard.evaluate, self._shards, batches, deleted_keys))
+        else:
+            outputs = list(map(PodShard.evaluate, self._shards, batches, deleted_keys))
+
+        # The ordered sink: each shard's results are sorted by index already
+        return list(heapq.merge(*outputs, key=itemgetter(0)))
+
+    def shard_of(self, namespace):
+        return shard_of(namespace, self.workers) if self.workers > 1 else 0
+
+    def _evaluate_in_processes(self, batches, deleted_keys):
+        for process, batch, deleted in zip(self._processes, batches, deleted_keys):
+            process.submit(batch, deleted)
+
+        outputs = []
+        failed = None
+        for process in self._processes:
+            try:
+                outputs.append(process.result())
+            except (EOFError, OSError) as e:
+                logger.error(f"Pod shard worker {process.number} failed, restarting it: {e}")
+                process.restart()
+                failed = e
+        if failed is not None:
+            raise RuntimeError(f"Pod evaluation worker failed: {failed}")
+        return outputs
+
+    def stop(self):
+        if self._processes:
+            for process in self._processes:
+                process.stop()
+        if self._executor:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,248 @@
+import os
+import sys
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+PROFILING = os.environ.get('PROFILING', 'false').lower() in ('1', 'true', 'yes')  # record cycle traces and allow sampling
+PROFILE_SLOWEST_TRACES = int(os.environ.get('PROFILE_SLOWEST_TRACES', '10'))  # slowest traces kept per kind
+PROFILE_MAX_SPANS = int(os.environ.get('PROFILE_MAX_SPANS', '20000'))  # spans recorded per trace, later ones are counted only
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', '0.005'))  # seconds between stack samples
+PROFILE_MAX_SECONDS = float(os.environ.get('PROFILE_MAX_SECONDS', '60'))  # longest on-demand sampling profile
+PROFILE_THREADS = os.environ.get('PROFILE_THREADS', 'monitor-,asyncio_,pod-shard')  # thread name prefixes sampled by default
+
+_NO_SPAN = nullcontext()
+
+# The trace of the running cycle; asyncio tasks and asyncio.to_thread() inherit it
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+
+
+class Trace:
+    """The spans of one cycle (or request), timed with perf_counter"""
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.wall_started = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.spans = []  # (name, lane, start, duration, args)
+        self.lanes = {}  # lane -> thread (and asyncio task) name
+        self.dropped_spans = 0
+        self._lock = threading.Lock()
+
+    def add(self, name, started, duration, args):
+        if self.duration is not None:
+            # Work that outlived its cycle, e.g. a background flush
+            return
+        lane = _lane()
+        with self._lock:
+            if len(self.spans) < PROFILE_MAX_SPANS:
+                self.spans.append((name, lane, started, duration, args))
+                if lane not in self.lanes:
+                    self.lanes[lane] = _lane_name()
+            else:
+                self.dropped_spans += 1
+
+
+def _current_task():
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+def _lane():
+    """Spans of one thread, or of one asyncio task, which overlap those of other tasks on the loop"""
+    task = _current_task()
+    return threading.get_ident(), id(task) if task is not None else 0
+
+
+def _lane_name():
+    task = _current_task()
+    name = threading.current_thread().name
+    return f"{name} {task.get_name()}" if task is not None else name
+
+
+def _set(args):
+    return {key: value for key, value in args.items() if value is not None}
+
+
+class CycleTracer:
+    """Opt-in spans of monitor cycles, keeping the slowest traces of every kind
+
+    trace() starts a trace, span() records a phase of the running trace and
+    does nothing outside of one or when profiling is disabled, so the hooks
+    can stay in the monitor. The slowest PROFILE_SLOWEST_TRACES traces of
+    every name are kept and exported as Chrome trace-event JSON, which
+    chrome://tracing and https://ui.perfetto.dev open.
+    """
+
+    def __init__(self, enabled=PROFILING, keep=PROFILE_SLOWEST_TRACES):
+        self.enabled = enabled
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._slowest = {}  # trace name -> min-heap of (duration, sequence, Trace)
+        self._sequence = itertools.count()
+        self.traces_recorded = 0
+
+    @contextmanager
+    def trace(self, name, **args):
+        """Record a trace around the block, nested spans of any thread of its context belong to it"""
+        if not self.enabled:
+            yield None
+            return
+        trace = Trace(name, args)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+            trace.duration = time.perf_counter() - trace.started
+            self._keep(trace)
+
+    def span(self, name, **args):
+        """Context manager recording a span of the running trace"""
+        if not self.enabled:
+            return _NO_SPAN
+        trace = _current_trace.get()
+        if trace is None:
+            return _NO_SPAN
+        return self._span(trace, name, args)
+
+    @contextmanager
+    def _span(self, trace, name, args):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            trace.add(name, started, time.perf_counter() - started, args)
+
+    def traced(self, name, root=False):
+        """Decorator recording every call as a span; with root, calls outside of a trace get their own trace"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                if root and _current_trace.get() is None:
+                    with self.trace(name):
+                        return func(*args, **kwargs)
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _keep(self, trace):
+        with self._lock:
+            self.traces_recorded += 1
+            heap = self._slowest.setdefault(trace.name, [])
+            entry = (trace.duration, next(self._sequence), trace)
+            if len(heap) < self.keep:
+                heapq.heappush(heap, entry)
+            elif trace.duration > heap[0][0]:
+                heapq.heapreplace(heap, entry)
+
+    def slowest(self, name=None):
+        """Return the kept traces, slowest first, of one name or all"""
+        with self._lock:
+            entries = [entry for trace_name, heap in self._slowest.items() if name in (None, trace_name)
+                       for entry in heap]
+        return [trace for _, _, trace in sorted(entries, key=lambda entry: entry[0], reverse=True)]
+
+    def chrome_trace(self, name=None):
+        """Return the kept traces as Chrome trace-event JSON data, one process row per trace"""
+        events = []
+        for pid, trace in enumerate(self.slowest(name), 1):
+            started_at = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(trace.wall_started))
+            label = ' '.join([trace.name, *(str(value) for value in trace.args.values() if value), started_at])
+            events.append({"name": "process_name", "ph": "M", "pid": pid,
+                           "args": {"name": f"{label} ({trace.duration * 1000:.0f} ms)"}})
+            events.append({"name": "process_sort_index", "ph": "M", "pid": pid, "args": {"sort_index": pid}})
+            origin = trace.wall_started * 1e6
+            with trace._lock:
+                spans = list(trace.spans)
+                lanes = dict(trace.lanes)
+            events.append({"name": trace.name, "cat": "trace", "ph": "X", "pid": pid, "tid": 0, "ts": origin,
+                           "dur": trace.duration * 1e6, "args": dict(_set(trace.args), dropped_spans=trace.dropped_spans)})
+            tids = {}
+            for span_name, lane, started, duration, args in spans:
+                tid = tids.setdefault(lane, len(tids) + 1)
+                events.append({"name": span_name, "cat": "span", "ph": "X", "pid": pid, "tid": tid,
+                               "ts": origin + (started - trace.started) * 1e6, "dur": duration * 1e6, "args": _set(args)})
+            for lane, tid in tids.items():
+                events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": lanes[lane]}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+class ProfilerBusy(Exception):
+    """Raised when a sampling profile is requested while another one runs"""
+    pass
+
+
+class SamplingProfiler:
+    """On-demand sampling profiler of running threads, one profile at a time
+
+    Samples the stacks of the threads whose names start with one of the
+    given prefixes (the monitor threads by default) every interval seconds
+    through sys._current_frames(), and returns them as collapsed stacks
+    (frames separated by ';', then the sample count), the input of
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def profile(self, seconds, interval=PROFILE_SAMPLE_INTERVAL, thread_prefixes=None):
+        """Sample for seconds, return (Counter of collapsed stacks, number of samples)"""
+        if thread_prefixes is None:
+            thread_prefixes = [prefix for prefix in PROFILE_THREADS.split(',') if prefix]
+        thread_prefixes = tuple(thread_prefixes)
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A sampling profile is already running")
+        try:
+            stacks = Counter()
+            samples = 0
+            own_thread = threading.get_ident()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    name = names.get(thread_id, str(thread_id))
+                    if thread_id != own_thread and name.startswith(thread_prefixes):
+                        stacks[self._collapse(name, frame)] += 1
+                frame = None
+                samples += 1
+                time.sleep(interval)
+            return stacks, samples
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _collapse(thread_name, frame):
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        frames.append(thread_name)
+        return ';'.join(name.replace(';', ',') for name in reversed(frames))
+
+    @staticmethod
+    def collapsed(stacks):
+        """Render collapsed stacks, most sampled first"""
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+TRACER = CycleTracer()
+SAMPLER = SamplingProfiler()
@@ -0,0 +1,98 @@
+import gzip
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from flask import Response
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_SIZE = 1024
+
+
+class CachedResponse:
+    """Pre-encoded JSON body with its gzip variant and ETags"""
+    __slots__ = ('body', 'gzip_body', 'etag', 'gzip_etag')
+
+    def __init__(self, data=None, body=None):
+        self.body = body if body is not None else json.dumps(data, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.blake2b(self.body, digest_size=16).hexdigest()
+        self.etag = f'"{digest}"'
+        if len(self.body) >= GZIP_MIN_SIZE:
+            self.gzip_body = gzip.compress(self.body, compresslevel=6)
+            self.gzip_etag = f'"{digest}-gzip"'
+        else:
+            self.gzip_body = None
+            self.gzip_etag = None
+
+    def matches(self, if_none_match):
+        """Check an If-None-Match header value against both representations"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        tags = {tag.strip() for tag in if_none_match.split(',')}
+        return self.etag in tags or (self.gzip_etag is not None and self.gzip_etag in tags)
+
+
+class ResponseCache:
+    """Small LRU cache of CachedResponse objects
+
+    Keys must contain everything the response depends on (a data version and
+    the query parameters), so entries never need to be invalidated: a new
+    version simply produces a new key and old entries fall out of the LRU.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build, encoded=False):
+        """Return the cached response for key, calling build() to create the data on a miss
+
+        With encoded set, build() returns the already encoded JSON body.
+        """
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+
+        # Build outside the lock, concurrent misses for the same key are harmless
+        cached = CachedResponse(body=build()) if encoded else CachedResponse(build())
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = cached
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cached
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def cached_json_response(cached, request):
+    """Turn a CachedResponse into a Flask response, honouring If-None-Match and gzip"""
+    use_gzip = cached.gzip_body is not None and 'gzip' in request.headers.get('Accept-Encoding', '')
+
+    if cached.matches(request.headers.get('If-None-Match')):
+        response = Response(status=304)
+    elif use_gzip:
+        response = Response(cached.gzip_body, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(cached.body, mimetype='application/json')
+
+    response.headers['ETag'] = cached.gzip_etag if use_gzip else cached.etag
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
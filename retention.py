@@ -0,0 +1,209 @@
+import os
+import json
+import gzip
+import time
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, or_, delete
+from models import db, Alert, AlertDailySummary, app
+from alert_store import alert_revisions
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+ALERT_RETENTION_DAYS = float(os.environ.get('ALERT_RETENTION_DAYS', '30'))  # resolved alerts older than this are removed, 0 keeps everything
+RETENTION_INTERVAL = int(os.environ.get('RETENTION_INTERVAL', '3600'))  # seconds between retention runs
+RETENTION_CHUNK_SIZE = int(os.environ.get('RETENTION_CHUNK_SIZE', '1000'))  # rows deleted per transaction
+RETENTION_CHUNK_PAUSE = float(os.environ.get('RETENTION_CHUNK_PAUSE', '0.1'))  # seconds between chunks, lets the monitor write
+RETENTION_ARCHIVE_DIR = os.environ.get('RETENTION_ARCHIVE_DIR', '')  # gzipped JSONL archives of deleted alerts, required for any deletion
+RETENTION_SUMMARIZE = os.environ.get('RETENTION_SUMMARIZE', 'true').lower() in ('1', 'true', 'yes')
+
+
+class RetentionJob:
+    """Removes resolved alerts past their retention period in small transactions
+
+    Every chunk is written to a gzipped JSONL archive file and counted into
+    AlertDailySummary before it is deleted; without an archive directory
+    nothing is deleted. Each chunk runs in its own short transaction so the
+    alerts table is never locked for long. Active alerts are never removed.
+    """
+
+    def __init__(self, retention_days=ALERT_RETENTION_DAYS, interval=RETENTION_INTERVAL,
+                 chunk_size=RETENTION_CHUNK_SIZE, archive_dir=RETENTION_ARCHIVE_DIR,
+                 summarize=RETENTION_SUMMARIZE, on_change=None, should_run=None):
+        self.retention_days = retention_days
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.archive_dir = archive_dir
+        self.summarize = summarize
+        # Called after a run removed alerts, e.g. to invalidate cached responses
+        self.on_change = on_change
+        # Asked before every scheduled run, e.g. so only the leader of several replicas removes alerts
+        self.should_run = should_run
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.runs = 0
+        self.rows_deleted_total = 0
+        self.rows_archived_total = 0
+        self.last_run_at = None
+        self.last_run_seconds = 0.0
+        self.last_rows_deleted = 0
+        self.last_rows_per_second = 0.0
+        self.last_archive = None
+        self.last_error = None
+
+    @property
+    def enabled(self):
+        # Alerts are only deleted once they can be archived
+        return self.retention_days > 0 and bool(self.archive_dir)
+
+    def start(self):
+        if self.retention_days > 0 and not self.archive_dir:
+            logger.warning("RETENTION_ARCHIVE_DIR is not set, resolved alerts are kept instead of being deleted without an archive")
+        if self._thread or not self.enabled:
+            return
+        self._thread = threading.Thread(target=self._run, name="alert-retention", daemon=True)
+        self._thread.start()
+        logger.info(f"Removing resolved alerts older than {self.retention_days:g} days every {self.interval}s")
+
+    def _run(self):
+        while True:
+            try:
+                if self.should_run is None or self.should_run():
+                    self.run_once()
+            except Exception as e:
+                logger.error(f"Error in alert retention run: {e}")
+            time.sleep(self.interval)
+
+    def cutoff(self):
+        """Resolved alerts before this naive UTC time are expired"""
+        return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=self.retention_days)
+
+    def run_once(self):
+        """Remove every expired alert, chunk by chunk, return the number of rows removed"""
+        if not self.enabled:
+            return 0
+
+        # One run at a time, also when called from outside the retention thread
+        with self._lock:
+            started = time.perf_counter()
+            cutoff = self.cutoff()
+            archive_path = self._archive_path()
+            deleted = 0
+            self.last_error = None
+            try:
+                while True:
+                    removed = self._remove_chunk(cutoff, archive_path)
+                    if not removed:
+                        break
+                    deleted += removed
+                    time.sleep(RETENTION_CHUNK_PAUSE)
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                self.runs += 1
+                self.last_run_at = time.time()
+                self.last_run_seconds = elapsed
+                self.last_rows_deleted = deleted
+                self.last_rows_per_second = deleted / elapsed if elapsed > 0 else 0.0
+                self.rows_deleted_total += deleted
+                if deleted:
+                    self.last_archive = archive_path
+
+            if deleted:
+                logger.info(f"Removed {deleted} resolved alerts older than {cutoff:%Y-%m-%d %H:%M} "
+                            f"in {elapsed:.1f}s ({self.last_rows_per_second:.0f} rows/s)")
+                if self.on_change:
+                    self.on_change()
+            return deleted
+
+    def _expired_query(self, cutoff):
+        return Alert.query.filter(
+            Alert.is_resolved == 1,
+            or_(
+                Alert.resolved_at < cutoff,
+                # Alerts resolved before resolved_at was recorded
+                and_(Alert.resolved_at.is_(None), Alert.created_at < cutoff)
+            )
+        )
+
+    def _remove_chunk(self, cutoff, archive_path):
+        with app.app_context():
+            try:
+                alerts = self._expired_query(cutoff).order_by(Alert.id).limit(self.chunk_size).all()
+                if not alerts:
+                    return 0
+
+                # Archive first: once the file is closed the rows can safely go
+                self._archive(archive_path, alerts)
+                if self.summarize:
+                    self._add_to_summaries(alerts)
+
+                ids = [alert.id for alert in alerts]
+                db.session.execute(
+                    delete(Alert).where(Alert.id.in_(ids)),
+                    execution_options={'synchronize_session': False}
+                )
+                revision = alert_revisions.bump()
+                db.session.commit()
+                alert_revisions.committed(revision)
+                return len(ids)
+            except Exception:
+                db.session.rollback()
+                raise
+
+    def _archive_path(self):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        return os.path.join(self.archive_dir, f"alerts-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.jsonl.gz")
+
+    def _archive(self, path, alerts):
+        # Every chunk is appended as its own gzip member, readers see one stream
+        with gzip.open(path, 'at', encoding='utf-8') as archive:
+            for alert in alerts:
+                archive.write(json.dumps(alert.to_dict(), separators=(',', ':')))
+                archive.write('\n')
+            archive.flush()
+            os.fsync(archive.fileno())
+        self.rows_archived_total += len(alerts)
+
+    def _add_to_summaries(self, alerts):
+        """Add the chunk's alerts to the daily counts, in the chunk's transaction"""
+        counts = Counter(
+            ((alert.created_at or alert.resolved_at).date(), alert.cluster or '', alert.resource_namespace or '',
+             alert.resource_type, alert.status or 'Unknown')
+            for alert in alerts
+        )
+        days = {key[0] for key in counts}
+        existing = {
+            (summary.day, summary.cluster, summary.resource_namespace, summary.resource_type, summary.status): summary
+            for summary in AlertDailySummary.query.filter(AlertDailySummary.day.in_(days)).all()
+        }
+        for key, count in counts.items():
+            summary = existing.get(key)
+            if summary is None:
+                day, cluster, namespace, resource_type, status = key
+                db.session.add(AlertDailySummary(day=day, cluster=cluster, resource_namespace=namespace,
+                                                 resource_type=resource_type, status=status, count=count))
+            else:
+                summary.count += count
+
+    def stats(self):
+        """Counters of the retention runs"""
+        return {
+            'enabled': self.enabled,
+            'retention_days': self.retention_days,
+            'runs': self.runs,
+            'last_run_at': self.last_run_at,
+            'last_run_seconds': round(self.last_run_seconds, 3),
+            'last_rows_deleted': self.last_rows_deleted,
+            'last_rows_per_second': round(self.last_rows_per_second, 1),
+            'rows_deleted_total': self.rows_deleted_total,
+            'rows_archived_total': self.rows_archived_total,
+            'last_archive': self.last_archive,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,220 @@
+import os
+import time
+import secrets
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Number of per-version deltas kept for /api/resources/changes
+DELTA_HISTORY = int(os.environ.get('DELTA_HISTORY', '120'))
+
+
+def node_key(node):
+    cluster = node.get("cluster")
+    return f"{cluster}/{node['name']}" if cluster else node["name"]
+
+
+def pod_key(pod):
+    cluster = pod.get("cluster")
+    return f"{cluster}/{pod['namespace']}/{pod['name']}" if cluster else f"{pod['namespace']}/{pod['name']}"
+
+
+def alert_key(alert):
+    return alert["id"]
+
+
+def diff_items(previous, current, key_func):
+    """Compare two sequences of dicts, returning (added, modified, deleted keys)"""
+    previous_by_key = {key_func(item): item for item in previous}
+    added = []
+    modified = []
+    seen = set()
+    for item in current:
+        key = key_func(item)
+        seen.add(key)
+        old = previous_by_key.get(key)
+        if old is None:
+            added.append(item)
+        elif old != item:
+            modified.append(item)
+    deleted = [key for key in previous_by_key if key not in seen]
+    return added, modified, deleted
+
+
+def diff_snapshots(previous, current):
+    """Return the changes that turn one snapshot into the next
+
+    Alerts only have "new" (added or changed) and "resolved" (ids that left
+    the active alert list) since the dashboard never edits them in place.
+    """
+    delta = {}
+    for name, key_func in (("nodes", node_key), ("pods", pod_key)):
+        added, modified, deleted = diff_items(getattr(previous, name), getattr(current, name), key_func)
+        delta[name] = {"added": added, "modified": modified, "deleted": deleted}
+
+    added, modified, resolved = diff_items(previous.alerts, current.alerts, alert_key)
+    delta["alerts"] = {"new": added + modified, "resolved": resolved}
+    return delta
+
+
+def merge_deltas(deltas):
+    """Merge consecutive deltas into one, later changes winning"""
+    merged = {}
+    for name, key_func in (("nodes", node_key), ("pods", pod_key)):
+        changes = {}  # key -> (operation, item)
+        for delta in deltas:
+            part = delta[name]
+            for item in part["added"]:
+                changes[key_func(item)] = ("added", item)
+            for item in part["modified"]:
+                key = key_func(item)
+                operation = "added" if changes.get(key, (None,))[0] == "added" else "modified"
+                changes[key] = (operation, item)
+            for key in part["deleted"]:
+                changes[key] = ("deleted", key)
+        merged[name] = {
+            "added": [item for operation, item in changes.values() if operation == "added"],
+            "modified": [item for operation, item in changes.values() if operation == "modified"],
+            "deleted": [item for operation, item in changes.values() if operation == "deleted"]
+        }
+
+    alerts = {}  # id -> alert dict, or None when resolved
+    for delta in deltas:
+        for alert in delta["alerts"]["new"]:
+            alerts[alert_key(alert)] = alert
+        for alert_id in delta["alerts"]["resolved"]:
+            alerts[alert_id] = None
+    merged["alerts"] = {
+        "new": [alert for alert in alerts.values() if alert is not None],
+        "resolved": [alert_id for alert_id, alert in alerts.items() if alert is None]
+    }
+    return merged
+
+
+@dataclass(frozen=True)
+class ResourceSnapshot:
+    """Immutable view of the cluster as seen by the last monitor cycle
+
+    nodes, pods and alerts are tuples of plain dicts in the /api/resources
+    format. They are shared between request threads and must be treated as
+    read-only.
+    """
+    version: int
+    nodes: tuple = ()
+    pods: tuple = ()
+    alerts: tuple = ()
+    refreshed_at: float = 0.0  # last time a monitor cycle confirmed this data
+
+    def age(self):
+        """Seconds since the monitor last refreshed the data, None if it never did"""
+        if not self.refreshed_at:
+            return None
+        return max(0.0, time.time() - self.refreshed_at)
+
+    def to_dict(self, include_freshness=True):
+        """Return the snapshot in the /api/resources response format
+
+        include_freshness=False leaves out the time dependent fields so the
+        result only depends on the version and can be cached.
+        """
+        data = {
+            "nodes": list(self.nodes),
+            "pods": list(self.pods),
+            "alerts": list(self.alerts),
+            "snapshot_version": self.version
+        }
+        if include_freshness:
+            age = self.age()
+            data["snapshot_time"] = datetime.fromtimestamp(self.refreshed_at, timezone.utc).isoformat() if self.refreshed_at else None
+            data["snapshot_age"] = round(age, 1) if age is not None else None
+        return data
+
+
+class SnapshotStore:
+    """Holds the latest ResourceSnapshot, replaced atomically by the monitor thread
+
+    The version only increases when the content actually changes, so readers
+    can use it to tell whether anything happened since they last looked.
+    Every process starts counting at a random version, so a version (or
+    stream event id) of another replica or of an earlier run is outside
+    this store's history and makes the client resync.
+    """
+
+    def __init__(self, history=DELTA_HISTORY, first_version=None):
+        self._lock = threading.Lock()
+        if first_version is None:
+            # Multiples of 2**32 below 2**52, versions stay exact in JavaScript numbers
+            first_version = secrets.randbelow(1 << 20) << 32
+        self._current = ResourceSnapshot(version=first_version)
+        # (version, delta from version - 1), oldest first
+        self._deltas = deque(maxlen=history)
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Call callback(snapshot, delta) whenever a new version is published"""
+        self._listeners.append(callback)
+
+    @property
+    def current(self):
+        return self._current
+
+    def publish(self, nodes=None, pods=None, alerts=None, refreshed=True):
+        """Publish new content, keeping the previous value of any part left as None
+
+        refreshed=False is used for alert-only updates coming from the API, which
+        must not make the cluster data look fresher than it is.
+        """
+        with self._lock:
+            previous = self._current
+            nodes = previous.nodes if nodes is None else tuple(nodes)
+            pods = previous.pods if pods is None else tuple(pods)
+            alerts = previous.alerts if alerts is None else tuple(alerts)
+
+            refreshed_at = time.time() if refreshed else previous.refreshed_at
+
+            if (nodes, pods, alerts) == (previous.nodes, previous.pods, previous.alerts):
+                snapshot = replace(previous, refreshed_at=refreshed_at)
+            else:
+                snapshot = ResourceSnapshot(
+                    version=previous.version + 1,
+                    nodes=nodes,
+                    pods=pods,
+                    alerts=alerts,
+                    refreshed_at=refreshed_at
+                )
+                delta = diff_snapshots(previous, snapshot)
+                self._deltas.append((snapshot.version, delta))
+            self._current = snapshot
+
+        if snapshot.version != previous.version:
+            for callback in self._listeners:
+                try:
+                    callback(snapshot, delta)
+                except Exception as e:
+                    logger.error(f"Error in snapshot listener: {e}")
+        return snapshot
+
+    def changes_since(self, since):
+        """Return the merged changes after version since, or a resync marker
+
+        The client has to fetch the full snapshot again when its version is
+        older than the oldest kept delta or newer than the current version
+        (for example after a server restart or from another replica).
+        """
+        with self._lock:
+            current = self._current
+            deltas = list(self._deltas)
+
+        if since == current.version:
+            return {"version": current.version, "resync": False, **merge_deltas([])}
+
+        oldest_base = deltas[0][0] - 1 if deltas else current.version
+        if since > current.version or since < oldest_base:
+            return {"version": current.version, "resync": True}
+
+        pending = [delta for version, delta in deltas if version > since]
+        return {"version": current.version, "resync": False, **merge_deltas(pending)}
@@ -20,14 +20,19 @@ let podChart = null;
 let autoRefreshEnabled = true;
 let refreshInterval = 30000; // 30 seconds
 let refreshTimer = null;
+let eventSource = null;
 
 // Store the current data
 let currentData = {
     nodes: [],
     pods: [],
-    alerts: []
+    alerts: [],
+    snapshotAlerts: []
 };
 
+// Snapshot version of currentData, null until the first full load
+let currentVersion = null;
+
 function initializeAutoRefresh() {
     const autoRefreshSwitch = document.getElementById('autoRefreshSwitch');
     
@@ -38,27 +43,86 @@ function initializeAutoRefresh() {
             autoRefreshEnabled = this.checked;
             
             if (autoRefreshEnabled) {
-                startRefreshTimer();
+                startLiveUpdates();
             } else {
-                stopRefreshTimer();
+                stopLiveUpdates();
             }
         });
         
         if (autoRefreshEnabled) {
-            startRefreshTimer();
+            startLiveUpdates();
         }
     }
 }
 
-function startRefreshTimer() {
+function startLiveUpdates() {
+    // Prefer the push stream, polling is only the fallback
+    if (window.EventSource) {
+        startEventStream();
+    } else {
+        startRefreshTimer();
+    }
+}
+
+function stopLiveUpdates() {
+    stopEventStream();
     stopRefreshTimer();
-    refreshTimer = setInterval(refreshData, refreshInterval);
 }
 
-function stopRefreshTimer() {
-    if (refreshTimer) {
-        clearInterval(refreshTimer);
-        refreshTimer = null;
+function startEventStream() {
+    stopEventStream();
+    eventSource = new EventSource('/api/stream');
+    
+    eventSource.onopen = function() {
+        // Connected (or reconnected), polling is no longer needed
+        stopRefreshTimer();
+    };
+    
+    eventSource.onerror = function() {
+        // EventSource reconnects by itself, poll until it does
+        if (autoRefreshEnabled && !refreshTimer) {
+            startRefreshTimer();
+        }
+    };
+    
+    eventSource.addEventListener('resources', function(event) {
+        const changes = JSON.parse(event.data);
+        if (currentVersion === null || changes.version <= currentVersion) {
+            return;
+        }
+        
+        if (changes.version === currentVersion + 1) {
+            applyResourceChanges(changes);
+            currentVersion = changes.version;
+        } else {
+            // We missed a version, ask for everything since ours
+            fetchResourceChanges().catch(error => console.error('Error fetching resource changes:', error));
+        }
+        updateSnapshotAge(0);
+    });
+    
+    eventSource.addEventListener('alerts', function() {
+        refreshAlerts();
+    });
+    
+    eventSource.addEventListener('resync', function() {
+        currentVersion = null;
+        refreshData();
+    });
+    
+    eventSource.addEventListener('heartbeat', function(event) {
+        const status = JSON.parse(event.data);
+        updateSnapshotAge(status.snapshot_age);
+        if (currentVersion !== null && status.version !== currentVersion) {
+            fetchResourceChanges().catch(error => console.error('Error fetching resource changes:', error));
+        }
+    });
+}
+
+function stopEventStream() {
+    if (eventSource) {
+        eventSource.close();
+        eventSource = null;
     }
 }
 
@@ -96,41 +160,66 @@ function setupEventListeners() {
     }
 }
 
-function refreshData() {
-    // Show the refreshing indicator
-    const refreshIndicator = document.getElementById('refresh-indicator');
-    if (refreshIndicator) {
-        refreshIndicator.classList.add('refreshing');
+// ETags of the last responses, sent back as If-None-Match so unchanged data costs a 304
+const responseEtags = {};
+
+function conditionalFetch(url) {
+    const headers = {};
+    if (responseEtags[url]) {
+        headers['If-None-Match'] = responseEtags[url];
     }
     
-    // Fetch the latest resource data
-    fetch('/api/resources')
+    // Bypass the browser cache so that 304 responses reach us
+    return fetch(url, { headers: headers, cache: 'no-store' })
         .then(response => {
+            if (response.status === 304) {
+                return { response: response, notModified: true, data: null };
+            }
             if (!response.ok) {
                 throw new Error('Network response was not ok');
             }
-            return response.json();
-        })
-        .then(data => {
-            currentData.nodes = data.nodes;
-            currentData.pods = data.pods;
-            updateDashboard(data);
-            updateResourcesTables(data);
-        })
-        .catch(error => {
-            console.error('Error fetching resource data:', error);
-            updateStatusError(error.message);
+            return response.json().then(data => {
+                const etag = response.headers.get('ETag');
+                if (etag) {
+                    responseEtags[url] = etag;
+                }
+                return { response: response, notModified: false, data: data };
+            });
         });
+}
+
+function refreshData() {
+    // Show the refreshing indicator
+    const refreshIndicator = document.getElementById('refresh-indicator');
+    if (refreshIndicator) {
+        refreshIndicator.classList.add('refreshing');
+    }
+    
+    // Fetch only the changes once we have a full snapshot
+    const resourcesRequest = currentVersion === null ? fetchFullResources() : fetchResourceChanges();
+    resourcesRequest.catch(error => {
+        console.error('Error fetching resource data:', error);
+        updateStatusError(error.message);
+    });
         
     // Fetch the latest alerts data
-    fetch('/api/alerts?status=active')
-        .then(response => {
-            if (!response.ok) {
-                throw new Error('Network response was not ok');
+    refreshAlerts()
+        .finally(() => {
+            // Hide the refreshing indicator
+            if (refreshIndicator) {
+                refreshIndicator.classList.remove('refreshing');
             }
-            return response.json();
-        })
-        .then(data => {
+        });
+}
+
+function refreshAlerts() {
+    return conditionalFetch('/api/alerts?status=active')
+        .then(result => {
+            if (result.notModified) {
+                return;
+            }
+            
+            const data = result.data;
             console.log('Alerts data:', data); // Debug log
             // Only update if data is in the correct format
             if (data.alerts && Array.isArray(data.alerts) && data.alerts.length > 0 && data.alerts[0].id) {
@@ -147,15 +236,184 @@ function refreshData() {
         .catch(error => {
             console.error('Error fetching alerts data:', error);
             updateStatusError(error.message);
+        });
+}
+
+function fetchFullResources() {
+    return conditionalFetch('/api/resources')
+        .then(result => {
+            updateSnapshotAgeFromResponse(result.response);
+            
+            if (result.notModified) {
+                return;
+            }
+            
+            const data = result.data;
+            currentVersion = data.snapshot_version;
+            currentData.nodes = data.nodes;
+            currentData.pods = data.pods;
+            currentData.snapshotAlerts = data.alerts;
+            updateDashboard(data);
+            updateResourcesTables(data);
+        });
+}
+
+function fetchResourceChanges() {
+    return fetch(`/api/resources/changes?since=${currentVersion}`, { cache: 'no-store' })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Network response was not ok');
+            }
+            updateSnapshotAgeFromResponse(response);
+            return response.json();
         })
-        .finally(() => {
-            // Hide the refreshing indicator
-            if (refreshIndicator) {
-                refreshIndicator.classList.remove('refreshing');
+        .then(changes => {
+            if (changes.resync) {
+                // Our version is too old (or the server restarted), start over
+                currentVersion = null;
+                return fetchFullResources();
+            }
+            
+            if (changes.version !== currentVersion) {
+                applyResourceChanges(changes);
+                currentVersion = changes.version;
             }
         });
 }
 
+function applyResourceChanges(changes) {
+    currentData.nodes = applyItemChanges(currentData.nodes, changes.nodes, nodeKey);
+    currentData.pods = applyItemChanges(currentData.pods, changes.pods, podKey);
+    
+    // Alerts only have new and resolved entries
+    const alertsById = new Map(currentData.snapshotAlerts.map(alert => [alert.id, alert]));
+    changes.alerts.resolved.forEach(id => alertsById.delete(id));
+    changes.alerts.new.forEach(alert => alertsById.set(alert.id, alert));
+    currentData.snapshotAlerts = [...alertsById.values()];
+    
+    updateDashboard({ nodes: currentData.nodes, pods: currentData.pods, alerts: currentData.snapshotAlerts });
+    
+    if (changes.pods.added.length > 0 || changes.pods.deleted.length > 0) {
+        updateNamespacesDropdown(currentData.pods);
+    }
+    
+    // With an active search the visible rows depend on the filter, so rebuild the filtered tables
+    if (nodeFilterActive()) {
+        filterNodes();
+    } else {
+        patchTableRows('nodes-table', changes.nodes, nodeKey, renderNodeRow);
+    }
+    
+    if (podFilterActive()) {
+        filterPods();
+    } else {
+        patchTableRows('pods-table', changes.pods, podKey, renderPodRow);
+    }
+}
+
+function applyItemChanges(items, changes, keyFn) {
+    const itemsByKey = new Map(items.map(item => [keyFn(item), item]));
+    changes.deleted.forEach(key => itemsByKey.delete(key));
+    changes.added.forEach(item => itemsByKey.set(keyFn(item), item));
+    changes.modified.forEach(item => itemsByKey.set(keyFn(item), item));
+    return [...itemsByKey.values()];
+}
+
+function patchTableRows(tableId, changes, keyFn, renderRow) {
+    const table = document.getElementById(tableId);
+    if (!table) return;
+    
+    const findRow = key => table.querySelector(`tr[data-key="${CSS.escape(key)}"]`);
+    
+    changes.deleted.forEach(key => {
+        const row = findRow(key);
+        if (row) {
+            row.remove();
+        }
+    });
+    
+    changes.modified.forEach(item => {
+        const row = findRow(keyFn(item));
+        if (row) {
+            row.replaceWith(renderRow(item));
+        } else {
+            insertRowSorted(table, renderRow(item));
+        }
+    });
+    
+    changes.added.forEach(item => {
+        const existing = findRow(keyFn(item));
+        if (existing) {
+            existing.replaceWith(renderRow(item));
+        } else {
+            insertRowSorted(table, renderRow(item));
+        }
+    });
+    
+    enableTooltips(table);
+}
+
+function insertRowSorted(table, newRow) {
+    // Drop the "No ... found" placeholder row
+    [...table.querySelectorAll('tr:not([data-key])')].forEach(row => row.remove());
+    
+    const next = [...table.rows].find(row => compareRowKeys(row.dataset.key, newRow.dataset.key) > 0);
+    table.insertBefore(newRow, next || null);
+}
+
+function compareRowKeys(a, b) {
+    // Keys are "name" for nodes and "namespace/name" for pods, prefixed with "cluster/" when clusters are configured
+    const aParts = a.split('/');
+    const bParts = b.split('/');
+    for (let i = 0; i < Math.max(aParts.length, bParts.length); i++) {
+        const compare = (aParts[i] || '').localeCompare(bParts[i] || '');
+        if (compare !== 0) {
+            return compare;
+        }
+    }
+    return 0;
+}
+
+function nodeKey(node) {
+    return node.cluster ? `${node.cluster}/${node.name}` : node.name;
+}
+
+function podKey(pod) {
+    return pod.cluster ? `${pod.cluster}/${pod.namespace}/${pod.name}` : `${pod.namespace}/${pod.name}`;
+}
+
+function clusterBadge(item) {
+    return item.cluster ? `<span class="badge bg-secondary me-1">${item.cluster}</span>` : '';
+}
+
+function nodeFilterActive() {
+    const searchInput = document.getElementById('node-search');
+    return !!(searchInput && searchInput.value.trim());
+}
+
+function podFilterActive() {
+    const searchInput = document.getElementById('pod-search');
+    const namespaceFilter = document.getElementById('namespace-filter');
+    return !!((searchInput && searchInput.value.trim()) ||
+              (namespaceFilter && namespaceFilter.value !== 'all'));
+}
+
+function updateSnapshotAgeFromResponse(response) {
+    const age = response.headers.get('X-Snapshot-Age');
+    updateSnapshotAge(age !== null ? parseFloat(age) : null);
+}
+
+function updateSnapshotAge(age) {
+    // Show how old the monitor's snapshot of the cluster is
+    if (age === null || age === undefined || isNaN(age)) {
+        updateElementText('snapshot-age', 'Waiting for first monitor cycle');
+    } else if (age < 60) {
+        updateElementText('snapshot-age', `Updated ${Math.round(age)}s ago`);
+    } else {
+        updateElementText('snapshot-age', `Updated ${Math.round(age / 60)}m ago`);
+    }
+}
+
 function updateDashboard(data) {
     // Update summary counts
     updateElementText('nodes-count', data.nodes.length);
@@ -211,34 +469,11 @@ function updateResourcesTables(data) {
         // Populate namespaces dropdown
         updateNamespacesDropdown(data.pods);
         
-        // Sort nodes by name
-        const sortedNodes = [...data.nodes].sort((a, b) => a.name.localeCompare(b.name));
+        // Sort nodes by cluster and name
+        const sortedNodes = [...data.nodes].sort((a, b) => compareRowKeys(nodeKey(a), nodeKey(b)));
         
         sortedNodes.forEach(node => {
-            const row = document.createElement('tr');
-            
-            // Apply class based on status
-            if (node.status !== 'Ready') {
-                row.classList.add('table-danger');
-            }
-            
-            row.innerHTML = `
-                <td>
-                    <div class="d-flex align-items-center">
-                        <span class="status-badge ${node.status === 'Ready' ? 'status-ready' : 'status-notready'}"></span>
-                        ${node.name}
-                    </div>
-                </td>
-                <td>
-                    <span class="badge ${node.status === 'Ready' ? 'bg-success' : 'bg-danger'}">${node.status}</span>
-                </td>
-                <td>${node.roles ? node.roles.join(', ') : 'none'}</td>
-                <td>${node.version || 'N/A'}</td>
-                <td>${node.cpu || 'N/A'}</td>
-                <td>${node.memory || 'N/A'}</td>
-            `;
-            
-            nodesTable.appendChild(row);
+            nodesTable.appendChild(renderNodeRow(node));
         });
     }
     
@@ -252,91 +487,125 @@ function updateResourcesTables(data) {
             return;
         }
         
-        // Sort pods by namespace and name
-        const sortedPods = [...data.pods].sort((a, b) => {
-            const nsCompare = a.namespace.localeCompare(b.namespace);
-            return nsCompare !== 0 ? nsCompare : a.name.localeCompare(b.name);
-        });
+        // Sort pods by cluster, namespace and name
+        const sortedPods = [...data.pods].sort((a, b) => compareRowKeys(podKey(a), podKey(b)));
         
         sortedPods.forEach(pod => {
-            const row = document.createElement('tr');
+            podsTable.appendChild(renderPodRow(pod));
+        });
+        
+        enableTooltips(podsTable);
+    }
+}
+
+function renderNodeRow(node) {
+    const row = document.createElement('tr');
+    row.dataset.key = nodeKey(node);
+    
+    // Apply class based on status
+    if (node.status !== 'Ready') {
+        row.classList.add('table-danger');
+    }
+    
+    row.innerHTML = `
+        <td>
+            <div class="d-flex align-items-center">
+                <span class="status-badge ${node.status === 'Ready' ? 'status-ready' : 'status-notready'}"></span>
+                ${clusterBadge(node)}${node.name}
+            </div>
+        </td>
+        <td>
+            <span class="badge ${node.status === 'Ready' ? 'bg-success' : 'bg-danger'}">${node.status}</span>
+        </td>
+        <td>${node.roles ? node.roles.join(', ') : 'none'}</td>
+        <td>${node.version || 'N/A'}</td>
+        <td>${node.cpu || 'N/A'}</td>
+        <td>${node.memory || 'N/A'}</td>
+    `;
+    
+    return row;
+}
+
+function renderPodRow(pod) {
+    const row = document.createElement('tr');
+    row.dataset.key = podKey(pod);
+    
+    // Apply class based on phase
+    if (pod.phase === 'Failed') {
+        row.classList.add('table-danger');
+    } else if (pod.phase === 'Pending') {
+        row.classList.add('table-warning');
+    }
+    
+    // Create container status HTML
+    let containerStatusHtml = '';
+    if (pod.containers && pod.containers.length > 0) {
+        containerStatusHtml = pod.containers.map(container => {
+            let statusClass = 'bg-secondary';
+            let displayState = container.state;
             
-            // Apply class based on phase
-            if (pod.phase === 'Failed') {
-                row.classList.add('table-danger');
-            } else if (pod.phase === 'Pending') {
-                row.classList.add('table-warning');
+            if (container.state === 'Running' && container.ready) {
+                statusClass = 'bg-success';
+            } else if (container.state === 'Waiting') {
+                // Özel bekleyen durumları kontrol et
+                if (container.reason === 'CrashLoopBackOff' || 
+                    container.reason === 'ImagePullBackOff' || 
+                    container.reason === 'ErrImagePull' || 
+                    container.reason === 'CreateContainerError') {
+                    statusClass = 'bg-danger';
+                    displayState = container.reason; // Durum görüntüsünü spesifik hataya güncelle
+                } else if (container.reason === 'ContainerCreating') {
+                    statusClass = 'bg-info';
+                    displayState = 'Creating';
+                } else {
+                    statusClass = 'bg-warning';
+                }
+            } else if (container.state === 'Terminated') {
+                statusClass = 'bg-danger';
             }
             
-            // Create container status HTML
-            let containerStatusHtml = '';
-            if (pod.containers && pod.containers.length > 0) {
-                containerStatusHtml = pod.containers.map(container => {
-                    let statusClass = 'bg-secondary';
-                    let displayState = container.state;
-                    
-                    if (container.state === 'Running' && container.ready) {
-                        statusClass = 'bg-success';
-                    } else if (container.state === 'Waiting') {
-                        // Özel bekleyen durumları kontrol et
-                        if (container.reason === 'CrashLoopBackOff' || 
-                            container.reason === 'ImagePullBackOff' || 
-                            container.reason === 'ErrImagePull' || 
-                            container.reason === 'CreateContainerError') {
-                            statusClass = 'bg-danger';
-                            displayState = container.reason; // Durum görüntüsünü spesifik hataya güncelle
-                        } else if (container.reason === 'ContainerCreating') {
-                            statusClass = 'bg-info';
-                            displayState = 'Creating';
-                        } else {
-                            statusClass = 'bg-warning';
-                        }
-                    } else if (container.state === 'Terminated') {
-                        statusClass = 'bg-danger';
-                    }
-                    
-                    let tooltip = '';
-                    if (container.reason) {
-                        tooltip = ` data-bs-toggle="tooltip" title="${container.reason}"`;
-                    }
-                    
-                    const restartBadge = container.restarts > 0 
-                        ? `<span class="badge bg-warning" data-bs-toggle="tooltip" title="${container.restarts} restarts">↻${container.restarts}</span>` 
-                        : '';
-                    
-                    return `<div class="container-status"${tooltip}>
-                        ${container.name} <span class="badge ${statusClass}">${displayState}</span> ${restartBadge}
-                    </div>`;
-                }).join('');
-            } else {
-                containerStatusHtml = '<span class="text-muted">No containers</span>';
+            let tooltip = '';
+            if (container.reason) {
+                tooltip = ` data-bs-toggle="tooltip" title="${container.reason}"`;
             }
             
-            row.innerHTML = `
-                <td>
-                    <div class="d-flex align-items-center">
-                        <span class="status-badge status-${pod.phase.toLowerCase()}"></span>
-                        ${pod.name}
-                    </div>
-                </td>
-                <td>${pod.namespace}</td>
-                <td>
-                    <span class="badge ${getStatusBadgeClass(pod.phase)}">${pod.phase}</span>
-                </td>
-                <td>${containerStatusHtml}</td>
-                <td>${pod.node || 'N/A'}</td>
-                <td>${pod.ip || 'N/A'}</td>
-            `;
+            const restartBadge = container.restarts > 0 
+                ? `<span class="badge bg-warning" data-bs-toggle="tooltip" title="${container.restarts} restarts">↻${container.restarts}</span>` 
+                : '';
             
-            podsTable.appendChild(row);
-        });
-        
-        // Enable tooltips
-        const tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
-        tooltipTriggerList.map(function (tooltipTriggerEl) {
-            return new bootstrap.Tooltip(tooltipTriggerEl);
-        });
+            return `<div class="container-status"${tooltip}>
+                ${container.name} <span class="badge ${statusClass}">${displayState}</span> ${restartBadge}
+            </div>`;
+        }).join('');
+    } else {
+        containerStatusHtml = '<span class="text-muted">No containers</span>';
     }
+    
+    row.innerHTML = `
+        <td>
+            <div class="d-flex align-items-center">
+                <span class="status-badge status-${pod.phase.toLowerCase()}"></span>
+                ${clusterBadge(pod)}${pod.name}
+            </div>
+        </td>
+        <td>${pod.namespace}</td>
+        <td>
+            <span class="badge ${getStatusBadgeClass(pod.phase)}">${pod.phase}</span>
+        </td>
+        <td>${containerStatusHtml}</td>
+        <td>${pod.node || 'N/A'}</td>
+        <td>${pod.ip || 'N/A'}</td>
+    `;
+    
+    return row;
+}
+
+function enableTooltips(container) {
+    // Enable tooltips
+    const tooltipTriggerList = [].slice.call(container.querySelectorAll('[data-bs-toggle="tooltip"]'));
+    tooltipTriggerList.map(function (tooltipTriggerEl) {
+        return bootstrap.Tooltip.getOrCreateInstance(tooltipTriggerEl);
+    });
 }
 
 function updateNamespacesDropdown(pods) {
@@ -417,93 +686,37 @@ function filterPods() {
     updateResourcesTables(tempData);
 }
 
+// Lazy paging of the alerts tab, pages come from /api/alerts with a keyset cursor
+const ALERTS_PAGE_SIZE = 50;
+let alertsPager = { cursor: null, pages: 0, loading: false, generation: 0, firstPageUrl: null };
+let alertsObserver = null;
+let alertSearchTimer = null;
+
 function updateAlertsTable(alerts) {
     const alertsTable = document.getElementById('alerts-table');
     if (!alertsTable) return;
     
-    alertsTable.innerHTML = '';
-    
-    if (!alerts || alerts.length === 0) {
-        alertsTable.innerHTML = '<tr><td colspan="9" class="text-center text-muted">No alerts found</td></tr>';
+    // In the resource view the alerts tab has its own filters and pages through the whole history
+    // on the server. In the main dashboard we only show the active alerts we were given.
+    const isResourceView = !!document.getElementById('alert-status-filter');
+    if (isResourceView) {
+        setupAlertFilters();
+        // Keep the pages the user scrolled to, only a lone first page is refreshed
+        if (alertsPager.pages <= 1) {
+            loadAlertsPage(true);
+        }
         return;
     }
     
-    // Get the status filter
-    const statusFilter = document.getElementById('alert-status-filter');
-    const statusValue = statusFilter ? statusFilter.value : 'all';
-    
-    // Get the search value
-    const searchInput = document.getElementById('alert-search');
-    const searchQuery = searchInput ? searchInput.value.toLowerCase().trim() : '';
-    
-    // Check if we're in the resource view or main dashboard
-    // In resource view, we have the alert-status-filter and we'll show all alerts (including resolved ones)
-    // In main dashboard, we only show active alerts
-    const isResourceView = !!statusFilter;
-    
-    // If we need to fetch all alerts for the resource view tab
-    if (isResourceView && (statusValue === 'all' || statusValue === 'resolved')) {
-        // Fetch all alerts (including resolved) for the resource view
-        fetch('/api/alerts?status=all')
-            .then(response => response.json())
-            .then(data => {
-                if (data.alerts && Array.isArray(data.alerts)) {
-                    populateAlertsTable(data.alerts, statusValue, searchQuery);
-                }
-            })
-            .catch(error => {
-                console.error('Error fetching all alerts:', error);
-                // Fall back to current alerts
-                populateFilteredAlertsTable(alerts, statusValue, searchQuery);
-            });
-    } else {
-        // Just filter the current alerts (which are already active-only for the dashboard)
-        populateFilteredAlertsTable(alerts, statusValue, searchQuery);
-    }
-}
-
-function populateAlertsTable(alerts, statusValue, searchQuery) {
-    // We've received alerts directly from the API, just apply filtering
-    populateFilteredAlertsTable(alerts, statusValue, searchQuery);
-}
-
-function populateFilteredAlertsTable(alerts, statusValue, searchQuery) {
-    const alertsTable = document.getElementById('alerts-table');
-    if (!alertsTable) return;
-    
-    // Clear the table before populating
     alertsTable.innerHTML = '';
     
-    // Filter alerts based on status and search query
-    let filteredAlerts = [...alerts];
-    
-    // Apply status filter if the data has is_resolved property
-    if (statusValue === 'active') {
-        filteredAlerts = filteredAlerts.filter(alert => alert && alert.is_resolved === false);
-    } else if (statusValue === 'resolved') {
-        filteredAlerts = filteredAlerts.filter(alert => alert && alert.is_resolved === true);
-    }
-    
-    // Apply search query filter if search term exists
-    if (searchQuery) {
-        filteredAlerts = filteredAlerts.filter(alert => {
-            if (!alert) return false;
-            
-            // Safely check properties before using them
-            const resourceType = (alert.resource_type || '').toLowerCase();
-            const resourceName = (alert.resource_name || '').toLowerCase();
-            const resourceNamespace = (alert.resource_namespace || '').toLowerCase();
-            const status = (alert.status || '').toLowerCase();
-            
-            return resourceType.includes(searchQuery) ||
-                   resourceName.includes(searchQuery) ||
-                   resourceNamespace.includes(searchQuery) ||
-                   status.includes(searchQuery);
-        });
+    if (!alerts || alerts.length === 0) {
+        alertsTable.innerHTML = '<tr><td colspan="9" class="text-center text-muted">No alerts found</td></tr>';
+        return;
     }
     
     // Sort alerts by creation date (newest first)
-    filteredAlerts.sort((a, b) => {
+    const sortedAlerts = [...alerts].sort((a, b) => {
         // Handle missing dates
         if (!a || !a.created_at) return 1;
         if (!b || !b.created_at) return -1;
@@ -511,153 +724,287 @@ function populateFilteredAlertsTable(alerts, statusValue, searchQuery) {
         return new Date(b.created_at) - new Date(a.created_at);
     });
     
-    // Render filtered alerts
-    filteredAlerts.forEach(alert => {
-        const row = document.createElement('tr');
-        
-        // Apply class based on status
-        if (!alert.is_resolved && alert.status) {
-            const status = alert.status.toString();
-            if (status.includes('NotReady') || 
-                status.includes('Failed') || 
-                status.includes('CrashLoopBackOff') || 
-                status.includes('ImagePullBackOff')) {
-                row.classList.add('table-danger');
-            } else if (status.includes('Pending')) {
-                row.classList.add('table-warning');
-            }
+    sortedAlerts.forEach(alert => {
+        const row = renderAlertRow(alert);
+        if (row) {
+            alertsTable.appendChild(row);
         }
-        
-        // Format dates
-        const createdDate = new Date(alert.created_at);
-        const resolvedDate = alert.resolved_at ? new Date(alert.resolved_at) : null;
-        
-        const formatDate = (date) => {
-            if (!date) return 'N/A';
-            
-            const today = new Date();
-            const yesterday = new Date(today);
-            yesterday.setDate(yesterday.getDate() - 1);
-            
-            const isToday = date.toDateString() === today.toDateString();
-            const isYesterday = date.toDateString() === yesterday.toDateString();
-            
-            if (isToday) {
-                return `Today ${date.toTimeString().substring(0, 8)}`;
-            } else if (isYesterday) {
-                return `Yesterday ${date.toTimeString().substring(0, 8)}`;
-            } else {
-                return `${date.toLocaleDateString()} ${date.toTimeString().substring(0, 8)}`;
-            }
-        };
-        
-        // Make sure we have a valid alert object with required fields
-        if (!alert || !alert.id) {
-            // Do not log these warnings to avoid console clutter
-            // The system may occasionally send temporary monitoring data
-            return;
-        }
-        
-        const resourceType = alert.resource_type || 'Unknown';
-        const resourceName = alert.resource_name || 'Unknown';
-        const resourceNamespace = alert.resource_namespace || 'N/A';
-        const status = alert.status || 'Unknown';
-        const isResolved = Boolean(alert.is_resolved);
-        const alertId = alert.id;
-        
-        // Generate status badge class
-        let statusBadgeClass = 'bg-info';
-        if (status.includes('Recovery')) {
-            statusBadgeClass = 'bg-success';
-        } else if (status.includes('NotReady') || 
-                  status.includes('Failed') || 
-                  status.includes('CrashLoopBackOff') || 
-                  status.includes('ImagePullBackOff')) {
-            statusBadgeClass = 'bg-danger';
-        } else if (status.includes('Pending')) {
-            statusBadgeClass = 'bg-warning';
-        }
-        
-        // Get error message from the alert
-        const errorMessage = alert.message || 'No additional details available';
-        
-        row.innerHTML = `
-            <td>${resourceType}</td>
-            <td>${resourceName}</td>
-            <td>${resourceNamespace}</td>
-            <td>
-                <span class="badge ${statusBadgeClass}">
-                    ${status}
-                </span>
-            </td>
-            <td>
-                <small class="text-muted">${errorMessage}</small>
-            </td>
-            <td>${formatDate(createdDate)}</td>
-            <td>${isResolved ? formatDate(resolvedDate) : 'N/A'}</td>
-            <td>
-                <span class="badge ${isResolved ? 'bg-success' : 'bg-warning'}">
-                    ${isResolved ? 'Resolved' : 'Active'}
-                </span>
-            </td>
-            <td>
-                <div class="btn-group btn-group-sm" role="group">
-                    ${!isResolved ? 
-                        `<button type="button" class="btn btn-outline-success btn-sm resolve-alert" data-alert-id="${alertId}" title="Mark as resolved">
-                            <i data-feather="check"></i>
-                         </button>` : ''}
-                    <button type="button" class="btn btn-outline-danger btn-sm delete-alert" data-alert-id="${alertId}" title="Delete alert">
-                        <i data-feather="trash-2"></i>
-                    </button>
-                </div>
-            </td>
-        `;
-        
-        alertsTable.appendChild(row);
     });
     
-    // Event listeners for alerts tab
+    bindAlertActions(alertsTable);
+    
+    // Initialize icons for newly added buttons
+    feather.replace();
+}
+
+function setupAlertFilters() {
     const alertStatusFilter = document.getElementById('alert-status-filter');
     if (alertStatusFilter && !alertStatusFilter.hasListenerSet) {
-        alertStatusFilter.addEventListener('change', () => updateAlertsTable(alerts));
+        alertStatusFilter.addEventListener('change', () => loadAlertsPage(true));
         alertStatusFilter.hasListenerSet = true;
     }
     
     const alertSearch = document.getElementById('alert-search');
     if (alertSearch && !alertSearch.hasListenerSet) {
-        alertSearch.addEventListener('input', () => updateAlertsTable(alerts));
+        alertSearch.addEventListener('input', () => {
+            // The search runs on the server, wait until the user stops typing
+            clearTimeout(alertSearchTimer);
+            alertSearchTimer = setTimeout(() => loadAlertsPage(true), 300);
+        });
         alertSearch.hasListenerSet = true;
     }
     
     const refreshAlertsButton = document.getElementById('btn-refresh-alerts-list');
     if (refreshAlertsButton && !refreshAlertsButton.hasListenerSet) {
-        refreshAlertsButton.addEventListener('click', refreshData);
+        refreshAlertsButton.addEventListener('click', () => {
+            alertsPager.pages = 0;
+            loadAlertsPage(true);
+        });
         refreshAlertsButton.hasListenerSet = true;
     }
+}
+
+function alertsPageUrl(cursor) {
+    const params = new URLSearchParams();
     
-    // Initialize icons for newly added buttons
-    feather.replace();
+    const statusFilter = document.getElementById('alert-status-filter');
+    params.set('status', statusFilter ? statusFilter.value : 'all');
     
-    // Add event listeners for delete buttons
-    const deleteButtons = document.querySelectorAll('.delete-alert');
-    deleteButtons.forEach(button => {
-        button.addEventListener('click', function() {
-            const alertId = this.getAttribute('data-alert-id');
-            if (confirm('Are you sure you want to delete this alert?')) {
-                deleteAlert(alertId);
+    const searchInput = document.getElementById('alert-search');
+    const searchQuery = searchInput ? searchInput.value.trim() : '';
+    if (searchQuery) {
+        params.set('q', searchQuery);
+    }
+    
+    params.set('limit', ALERTS_PAGE_SIZE);
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+    return `/api/alerts?${params.toString()}`;
+}
+
+function loadAlertsPage(reset) {
+    const alertsTable = document.getElementById('alerts-table');
+    if (!alertsTable) return Promise.resolve();
+    if (!reset && (alertsPager.loading || !alertsPager.cursor)) return Promise.resolve();
+    
+    if (reset) {
+        // Pages of an older filter are ignored when they arrive
+        alertsPager.generation += 1;
+    }
+    const generation = alertsPager.generation;
+    const url = alertsPageUrl(reset ? null : alertsPager.cursor);
+    alertsPager.loading = true;
+    
+    // Re-polling the page on screen is a cheap 304, anything else is a plain fetch
+    const samePage = reset && alertsPager.pages > 0 && url === alertsPager.firstPageUrl;
+    const request = samePage ? conditionalFetch(url) : fetch(url, { cache: 'no-store' })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Network response was not ok');
             }
+            return response.json().then(data => ({ response: response, notModified: false, data: data }));
         });
-    });
     
-    // Add event listeners for resolve buttons
-    const resolveButtons = document.querySelectorAll('.resolve-alert');
-    resolveButtons.forEach(button => {
-        button.addEventListener('click', function() {
-            const alertId = this.getAttribute('data-alert-id');
-            resolveAlert(alertId);
+    return request
+        .then(result => {
+            if (generation !== alertsPager.generation || result.notModified) {
+                return;
+            }
+            
+            const data = result.data;
+            if (reset) {
+                alertsTable.innerHTML = '';
+                alertsPager.pages = 0;
+                alertsPager.firstPageUrl = url;
+            }
+            
+            const sentinel = document.getElementById('alerts-load-more');
+            if (sentinel) {
+                sentinel.remove();
+            }
+            
+            (data.alerts || []).forEach(alert => {
+                const row = renderAlertRow(alert);
+                if (row) {
+                    alertsTable.appendChild(row);
+                }
+            });
+            alertsPager.pages += 1;
+            alertsPager.cursor = data.next_cursor;
+            
+            if (alertsTable.rows.length === 0) {
+                alertsTable.innerHTML = '<tr><td colspan="9" class="text-center text-muted">No alerts found</td></tr>';
+            }
+            
+            updateAlertsSentinel(alertsTable);
+            bindAlertActions(alertsTable);
+            feather.replace();
+        })
+        .catch(error => {
+            console.error('Error fetching alerts page:', error);
+        })
+        .finally(() => {
+            if (generation === alertsPager.generation) {
+                alertsPager.loading = false;
+            }
         });
-    });
+}
 
+function updateAlertsSentinel(alertsTable) {
+    // The last row loads the next page when it scrolls into view (or is clicked)
+    if (!alertsPager.cursor) {
+        if (alertsObserver) {
+            alertsObserver.disconnect();
+        }
+        return;
+    }
+    
+    const sentinel = document.createElement('tr');
+    sentinel.id = 'alerts-load-more';
+    sentinel.innerHTML = `
+        <td colspan="9" class="text-center">
+            <button type="button" class="btn btn-sm btn-outline-secondary">Load more</button>
+        </td>
+    `;
+    sentinel.querySelector('button').addEventListener('click', () => loadAlertsPage(false));
+    alertsTable.appendChild(sentinel);
+    
+    if (window.IntersectionObserver) {
+        if (!alertsObserver) {
+            alertsObserver = new IntersectionObserver(entries => {
+                if (entries.some(entry => entry.isIntersecting)) {
+                    loadAlertsPage(false);
+                }
+            });
+        }
+        alertsObserver.disconnect();
+        alertsObserver.observe(sentinel);
+    }
+}
+
+function formatAlertDate(date) {
+    if (!date) return 'N/A';
+    
+    const today = new Date();
+    const yesterday = new Date(today);
+    yesterday.setDate(yesterday.getDate() - 1);
+    
+    const isToday = date.toDateString() === today.toDateString();
+    const isYesterday = date.toDateString() === yesterday.toDateString();
+    
+    if (isToday) {
+        return `Today ${date.toTimeString().substring(0, 8)}`;
+    } else if (isYesterday) {
+        return `Yesterday ${date.toTimeString().substring(0, 8)}`;
+    } else {
+        return `${date.toLocaleDateString()} ${date.toTimeString().substring(0, 8)}`;
+    }
+}
+
+function renderAlertRow(alert) {
+    // Make sure we have a valid alert object with required fields
+    if (!alert || !alert.id) {
+        // Do not log these warnings to avoid console clutter
+        // The system may occasionally send temporary monitoring data
+        return null;
+    }
+    
+    const row = document.createElement('tr');
+    
+    // Apply class based on status
+    if (!alert.is_resolved && alert.status) {
+        const status = alert.status.toString();
+        if (status.includes('NotReady') || 
+            status.includes('Failed') || 
+            status.includes('CrashLoopBackOff') || 
+            status.includes('ImagePullBackOff')) {
+            row.classList.add('table-danger');
+        } else if (status.includes('Pending')) {
+            row.classList.add('table-warning');
+        }
+    }
+    
+    // Format dates
+    const createdDate = new Date(alert.created_at);
+    const resolvedDate = alert.resolved_at ? new Date(alert.resolved_at) : null;
+    
+    const resourceType = alert.resource_type || 'Unknown';
+    const resourceName = alert.resource_name || 'Unknown';
+    const resourceNamespace = alert.resource_namespace || 'N/A';
+    const status = alert.status || 'Unknown';
+    const isResolved = Boolean(alert.is_resolved);
+    const alertId = alert.id;
+    
+    // Generate status badge class
+    let statusBadgeClass = 'bg-info';
+    if (status.includes('Recovery')) {
+        statusBadgeClass = 'bg-success';
+    } else if (status.includes('NotReady') || 
+              status.includes('Failed') || 
+              status.includes('CrashLoopBackOff') || 
+              status.includes('ImagePullBackOff')) {
+        statusBadgeClass = 'bg-danger';
+    } else if (status.includes('Pending')) {
+        statusBadgeClass = 'bg-warning';
+    }
+    
+    // Get error message from the alert
+    const errorMessage = alert.message || 'No additional details available';
+    
+    row.innerHTML = `
+        <td>${resourceType}</td>
+        <td>${clusterBadge(alert)}${resourceName}</td>
+        <td>${resourceNamespace}</td>
+        <td>
+            <span class="badge ${statusBadgeClass}">
+                ${status}
+            </span>
+        </td>
+        <td>
+            <small class="text-muted">${errorMessage}</small>
+        </td>
+        <td>${formatAlertDate(createdDate)}</td>
+        <td>${isResolved ? formatAlertDate(resolvedDate) : 'N/A'}</td>
+        <td>
+            <span class="badge ${isResolved ? 'bg-success' : 'bg-warning'}">
+                ${isResolved ? 'Resolved' : 'Active'}
+            </span>
+        </td>
+        <td>
+            <div class="btn-group btn-group-sm" role="group">
+                ${!isResolved ? 
+                    `<button type="button" class="btn btn-outline-success btn-sm resolve-alert" data-alert-id="${alertId}" title="Mark as resolved">
+                        <i data-feather="check"></i>
+                     </button>` : ''}
+                <button type="button" class="btn btn-outline-danger btn-sm delete-alert" data-alert-id="${alertId}" title="Delete alert">
+                    <i data-feather="trash-2"></i>
+                </button>
+            </div>
+        </td>
+    `;
+    return row;
+}
+
+function bindAlertActions(alertsTable) {
+    // One delegated listener serves the buttons of every page
+    if (alertsTable.hasListenerSet) return;
+    
+    alertsTable.addEventListener('click', function(event) {
+        const deleteButton = event.target.closest('.delete-alert');
+        if (deleteButton) {
+            if (confirm('Are you sure you want to delete this alert?')) {
+                deleteAlert(deleteButton.getAttribute('data-alert-id'));
+            }
+            return;
+        }
+        
+        const resolveButton = event.target.closest('.resolve-alert');
+        if (resolveButton) {
+            resolveAlert(resolveButton.getAttribute('data-alert-id'));
+        }
+    });
+    alertsTable.hasListenerSet = true;
 }
 
 function updateNodeChart(nodes) {
@@ -869,7 +1216,8 @@ function deleteAlert(alertId) {
                 bsAlert.close();
             }, 5000);
             
-            // Refresh the alerts list
+            // Refresh the alerts list from its first page
+            alertsPager.pages = 0;
             refreshData();
         } else {
             console.error(data.error);
@@ -918,7 +1266,8 @@ function resolveAlert(alertId) {
                 bsAlert.close();
             }, 5000);
             
-            // Refresh the alerts list
+            // Refresh the alerts list from its first page
+            alertsPager.pages = 0;
             refreshData();
         } else {
             console.error(data.error);
@@ -0,0 +1,4 @@
+import os
+
+# Modules importing models need a database, an in-memory SQLite one is enough for the tests
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
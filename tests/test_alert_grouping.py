@@ -0,0 +1,45 @@
+from alert_grouping import AlertGrouper, AlertNotification
+
+
+def notification(name, reason='CrashLoopBackOff'):
+    return AlertNotification.from_alert_key(f"pod:apps/{name}:app:{reason}", f"Pod {name}: {reason}", "details")
+
+
+def test_first_alert_is_sent_right_away_and_follow_ups_batched():
+    sent = []
+    grouper = AlertGrouper(lambda subject, message: sent.append(subject) or True, group_by=['namespace', 'reason'],
+                           group_wait=0, group_interval=300)
+
+    assert grouper.submit(notification('web-1'))
+    assert sent == ["Pod web-1: CrashLoopBackOff"]
+
+    grouper.submit(notification('web-2'))
+    grouper.submit(notification('web-3'))
+    grouper.flush()
+    assert len(sent) == 1
+
+    grouper.flush(force=True)
+    assert sent[1] == "2 alerts for namespace=apps reason=CrashLoopBackOff"
+
+
+def test_group_wait_collects_the_first_alerts():
+    sent = []
+    grouper = AlertGrouper(lambda subject, message: sent.append(subject) or True, group_by=['namespace'],
+                           group_wait=30, group_interval=300)
+
+    grouper.submit(notification('web-1'))
+    grouper.submit(notification('web-2', reason='OOMKilled'))
+    grouper.flush()
+    assert sent == []
+
+    grouper.flush(force=True)
+    assert sent == ["2 alerts for namespace=apps"]
+
+
+def test_zero_interval_disables_grouping():
+    sent = []
+    grouper = AlertGrouper(lambda subject, message: sent.append(subject) or True, group_wait=30, group_interval=0)
+
+    grouper.submit(notification('web-1'))
+    grouper.submit(notification('web-2'))
+    assert sent == ["Pod web-1: CrashLoopBackOff", "Pod web-2: CrashLoopBackOff"]
@@ -0,0 +1,83 @@
+import pytest
+
+from email_queue import EmailDeliveryQueue
+from fake_smtp import start_server
+
+
+@pytest.fixture
+def smtp_server():
+    server = start_server()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def delivery_queue(server, **options):
+    options = dict(dict(workers=1, max_attempts=5, retry_delay=0.1, idle_timeout=5), **options)
+    email_queue = EmailDeliveryQueue('127.0.0.1', server.port, 'monitor', 'secret', 'monitor@example.com',
+                                     ['ops@example.com', ' '], use_starttls=False, **options)
+    email_queue.start()
+    return email_queue
+
+
+def test_connection_is_reused_across_sends(smtp_server):
+    email_queue = delivery_queue(smtp_server)
+    for i in range(5):
+        assert email_queue.enqueue(f"Alert {i}", "body")
+    assert email_queue.wait_idle(timeout=10)
+
+    assert [message.subject for message in smtp_server.messages] == [f"Alert {i}" for i in range(5)]
+    assert smtp_server.messages[0].recipients == ['<ops@example.com>']
+    assert smtp_server.connections == 1
+    assert email_queue.stats()['connections_opened'] == 1
+    assert email_queue.stats()['sent'] == 5
+
+
+def test_transient_failure_is_retried_with_backoff(smtp_server):
+    smtp_server.fail_data(2, 451)
+    email_queue = delivery_queue(smtp_server)
+    email_queue.enqueue("Alert", "body")
+    assert email_queue.wait_idle(timeout=10)
+
+    stats = email_queue.stats()
+    assert stats['sent'] == 1
+    assert stats['failed_attempts'] == 2
+    assert not email_queue.dead_letters
+    assert [message.subject for message in smtp_server.messages] == ["Alert"]
+
+    # The delay doubles with every attempt: 0.1s, then 0.2s
+    first, second, third = smtp_server.data_attempts
+    assert second - first >= 0.09
+    assert third - second >= 0.19
+
+
+def test_email_is_dead_lettered_after_max_attempts(smtp_server):
+    smtp_server.fail_data(10, 451)
+    email_queue = delivery_queue(smtp_server, max_attempts=3, retry_delay=0.01)
+    email_queue.enqueue("Alert", "body")
+    assert email_queue.wait_idle(timeout=10)
+
+    assert len(smtp_server.data_attempts) == 3
+    assert not smtp_server.messages
+    assert email_queue.stats()['sent'] == 0
+    [dead] = email_queue.dead_letters
+    assert dead.subject == "Alert"
+    assert dead.attempts == 3
+    assert '451' in dead.last_error
+
+
+def test_reconnects_after_the_server_dropped_the_connection(smtp_server):
+    email_queue = delivery_queue(smtp_server)
+    email_queue.enqueue("Before", "body")
+    assert email_queue.wait_idle(timeout=10)
+
+    smtp_server.drop_connections()
+    email_queue.enqueue("After", "body")
+    assert email_queue.wait_idle(timeout=10)
+
+    assert [message.subject for message in smtp_server.messages] == ["Before", "After"]
+    stats = email_queue.stats()
+    # The dropped connection is replaced within the same attempt, not retried later
+    assert stats['failed_attempts'] == 0
+    assert stats['connections_opened'] == 2
+    assert smtp_server.connections == 2
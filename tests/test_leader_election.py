@@ -0,0 +1,168 @@
+import pytest
+
+import leader_election
+from leader_election import HashRing, LeaderElector, LeaseRecord, ShardMembership, SQLiteLeaseLock
+
+
+class FakeClock:
+    """Stands in for the time module of leader_election, advanced by the tests"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(leader_election, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def lock(tmp_path):
+    return SQLiteLeaseLock(str(tmp_path / 'leases.db'))
+
+
+def elector(lock, identity):
+    return LeaderElector(lock, name='test', identity=identity, lease_duration=10, renew_deadline=6)
+
+
+def test_first_replica_acquires_the_lease(clock, lock):
+    a = elector(lock, 'a')
+    a.step()
+    assert a.is_leader
+    record = lock.get('test')
+    assert record.holder == 'a'
+    assert record.transitions == 0
+
+
+def test_leader_renews_and_follower_waits(clock, lock):
+    a, b = elector(lock, 'a'), elector(lock, 'b')
+    a.step()
+    for _ in range(5):
+        clock.advance(4)
+        a.step()
+        b.step()
+        assert a.is_leader
+        assert not b.is_leader
+    record = lock.get('test')
+    assert record.renew_time == clock.now
+    assert b.holder == 'a'
+
+
+def test_second_holder_takes_over_an_expired_lease(clock, lock):
+    a, b = elector(lock, 'a'), elector(lock, 'b')
+    a.step()
+    b.step()
+
+    # a stops renewing, b only takes over once the lease duration passed since it saw the last renewal
+    clock.advance(9)
+    b.step()
+    assert not b.is_leader
+    clock.advance(1)
+    b.step()
+    assert b.is_leader
+    record = lock.get('test')
+    assert record.holder == 'b'
+    assert record.transitions == 1
+
+    # The old leader sees the new holder and steps down
+    a.step()
+    assert not a.is_leader
+
+
+def test_leader_steps_down_after_renew_deadline(clock, lock, monkeypatch):
+    a = elector(lock, 'a')
+    a.step()
+    monkeypatch.setattr(lock, 'update', lambda *args, **kwargs: False)
+    clock.advance(5)
+    a.step()
+    assert a.is_leader
+    clock.advance(1)
+    a.step()
+    assert not a.is_leader
+
+
+def test_release_hands_over_right_away(clock, lock):
+    a, b = elector(lock, 'a'), elector(lock, 'b')
+    changes = []
+    a.on_change = changes.append
+    a.step()
+    b.step()
+    a.release()
+    assert not a.is_leader
+    assert changes == [True, False]
+    b.step()
+    assert b.is_leader
+
+
+def test_update_of_a_stale_version_fails(lock):
+    lock.create('test', LeaseRecord('a', 1.0, 1.0, 10))
+    stale = lock.get('test')
+    assert lock.update('test', LeaseRecord('b', 2.0, 2.0, 10, version=stale.version))
+    assert not lock.update('test', LeaseRecord('c', 3.0, 3.0, 10, version=stale.version))
+    assert lock.get('test').holder == 'b'
+
+
+def test_hash_ring_moves_only_the_namespaces_of_a_changed_member():
+    namespaces = [f"namespace-{i}" for i in range(2000)]
+    three = HashRing(['a', 'b', 'c'])
+    four = HashRing(['a', 'b', 'c', 'd'])
+    before = {namespace: three.owner(namespace) for namespace in namespaces}
+    after = {namespace: four.owner(namespace) for namespace in namespaces}
+
+    moved = [namespace for namespace in namespaces if before[namespace] != after[namespace]]
+    assert all(after[namespace] == 'd' for namespace in moved)
+    assert 0.15 < len(moved) / len(namespaces) < 0.35
+
+    # Leaving again gives d's namespaces back to their previous owners
+    assert {namespace: HashRing(['c', 'b', 'a']).owner(namespace) for namespace in namespaces} == before
+
+
+def test_hash_ring_spreads_namespaces_evenly():
+    ring = HashRing(['a', 'b', 'c'])
+    counts = {}
+    for i in range(3000):
+        owner = ring.owner(f"namespace-{i}")
+        counts[owner] = counts.get(owner, 0) + 1
+    assert set(counts) == {'a', 'b', 'c'}
+    assert all(700 < count < 1300 for count in counts.values())
+
+
+def test_shard_membership_follows_live_replicas(clock, lock):
+    members = {identity: ShardMembership(lock, group='test', identity=identity, lease_duration=10)
+               for identity in ('a', 'b', 'c')}
+
+    # The first step only publishes the member lease, nobody owns anything yet
+    for membership in members.values():
+        membership.step()
+        assert membership.ring is None
+        assert not membership.owns('default')
+    for membership in members.values():
+        membership.step()
+    assert all(membership.ring.members == ('a', 'b', 'c') for membership in members.values())
+    owners = [identity for identity, membership in members.items() if membership.owns('default')]
+    assert len(owners) == 1
+
+    # c stops renewing and drops out once its lease expired
+    for _ in range(3):
+        clock.advance(5)
+        members['a'].step()
+        members['b'].step()
+    assert members['a'].ring.members == ('a', 'b')
+    assert members['b'].ring.members == ('a', 'b')
+
+    # A released member lease leaves the ring at the next refresh
+    members['b'].release()
+    members['a'].step()
+    assert members['a'].ring.members == ('a',)
+    assert members['a'].owns('default')
@@ -0,0 +1,52 @@
+import datetime
+
+from sqlalchemy import create_engine, inspect, text
+
+from migrations import ensure_indexes, ensure_summary_cluster
+from models import Alert, AlertDailySummary
+
+
+def index_columns(engine, table):
+    return {index['name']: index['column_names'] for index in inspect(engine).get_indexes(table)}
+
+
+def test_index_with_other_columns_is_rebuilt():
+    engine = create_engine('sqlite://')
+    Alert.__table__.create(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_alerts_resource"))
+        connection.execute(text("CREATE INDEX ix_alerts_resource ON alerts (resource_type, resource_name)"))
+
+    assert ensure_indexes(engine, Alert.__table__) == ['ix_alerts_resource']
+    assert index_columns(engine, 'alerts')['ix_alerts_resource'][0] == 'cluster'
+    assert ensure_indexes(engine, Alert.__table__) == []
+
+
+def test_missing_index_is_created():
+    engine = create_engine('sqlite://')
+    Alert.__table__.create(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_alerts_resolved_at"))
+
+    assert ensure_indexes(engine, Alert.__table__) == ['ix_alerts_resolved_at']
+
+def test_summary_table_without_cluster_keeps_its_rows():
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE alert_daily_summaries (id INTEGER PRIMARY KEY, day DATE NOT NULL,"
+            " resource_namespace VARCHAR(255) NOT NULL, resource_type VARCHAR(50) NOT NULL,"
+            " status VARCHAR(50) NOT NULL, count INTEGER NOT NULL,"
+            " CONSTRAINT uq_alert_daily_summary UNIQUE (day, resource_namespace, resource_type, status))"))
+        connection.execute(text("INSERT INTO alert_daily_summaries VALUES (7, '2026-10-01', 'apps', 'pod', 'Resolved', 3)"))
+
+    table = AlertDailySummary.__table__
+    assert ensure_summary_cluster(engine, table)
+    assert not ensure_summary_cluster(engine, table)
+    with engine.begin() as connection:
+        # The same day and namespace in another cluster is a row of its own
+        connection.execute(table.insert(), [{'day': datetime.date(2026, 10, 1), 'cluster': 'prod',
+                                             'resource_namespace': 'apps', 'resource_type': 'pod',
+                                             'status': 'Resolved', 'count': 1}])
+        rows = connection.execute(table.select().order_by(table.c.cluster)).mappings().all()
+    assert [(row['cluster'], row['count']) for row in rows] == [('', 3), ('prod', 1)]
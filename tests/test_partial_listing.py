@@ -0,0 +1,81 @@
+import json
+
+import pytest
+import urllib3
+from kubernetes.client.rest import ApiException
+
+import k8s_monitor
+from clusters import ClusterConfig
+from k8s_fetch import ResourceFetcher
+from mock_k8s_data import SyntheticCluster
+
+# Errors a page after the first can raise: an expired continue token, a dropped connection, a broken raw JSON page
+PAGE_ERRORS = [
+    pytest.param(lambda: ApiException(status=410, reason='Gone'), id='expired-continue'),
+    pytest.param(lambda: urllib3.exceptions.ProtocolError('Connection aborted'), id='connection'),
+    pytest.param(lambda: json.JSONDecodeError('Expecting value', '', 0), id='json'),
+]
+
+
+class FailingCoreV1:
+    """Lists of a SyntheticCluster whose continued pages raise while failure is set"""
+
+    def __init__(self, cluster):
+        self.core_v1 = cluster.core_v1()
+        self.failure = None
+
+    def _list(self, list_func, **kwargs):
+        if self.failure and kwargs.get('_continue'):
+            raise self.failure()
+        return list_func(**kwargs)
+
+    def list_node(self, **kwargs):
+        return self._list(self.core_v1.list_node, **kwargs)
+
+    def list_pod_for_all_namespaces(self, **kwargs):
+        return self._list(self.core_v1.list_pod_for_all_namespaces, **kwargs)
+
+
+@pytest.fixture
+def monitor():
+    k8s_monitor.sent_alerts.clear()
+    monitor = k8s_monitor.KubernetesMonitor(ClusterConfig(), registry=k8s_monitor.MonitorRegistry(monitors=[]))
+    monitor.core_v1 = FailingCoreV1(SyntheticCluster(nodes=12, pods=60, namespaces=3))
+    monitor.fetcher = ResourceFetcher(monitor.core_v1, namespaces=[], exclude_namespaces=[], pod_label_selector='',
+                                      pod_field_selector='', node_label_selector='', page_size=5)
+    monitor.deleted = []
+    monitor.handle_deleted_node = monitor.deleted.append
+    monitor.handle_deleted_pod = monitor.deleted.append
+    return monitor
+
+
+@pytest.mark.parametrize('error', PAGE_ERRORS)
+def test_failed_later_page_keeps_unseen_objects(monitor, error):
+    monitor.monitor_nodes()
+    monitor.monitor_pods()
+    nodes, pods = dict(monitor.node_summaries), dict(monitor.pod_summaries)
+    assert (len(nodes), len(pods)) == (12, 60)
+
+    monitor.core_v1.failure = error
+    # Neither call raises into the monitor loop's 60 second back off
+    monitor.monitor_nodes()
+    monitor.monitor_pods()
+
+    assert monitor.deleted == []
+    assert monitor.node_summaries == nodes
+    assert monitor.pod_summaries == pods
+
+
+def test_complete_listing_resolves_vanished_pods(monitor):
+    monitor.monitor_pods()
+    cluster = monitor.core_v1.core_v1.cluster
+    vanished = cluster.pods.pop(next(iter(cluster.pods)))
+    cluster._lists = None
+
+    monitor.core_v1.failure = PAGE_ERRORS[0].values[0]
+    monitor.monitor_pods()
+    assert monitor.deleted == []
+
+    monitor.core_v1.failure = None
+    monitor.monitor_pods()
+    assert monitor.deleted == [f"{vanished.namespace}/{vanished.name}"]
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+from kubernetes import client
+
+import k8s_raw
+from fake_k8s_api import start_server
+from k8s_fetch import ResourceFetcher
+from mock_k8s_data import SyntheticCluster
+from pod_evaluation import PodRecord, evaluate_pod_record
+
+# Far more failing pods than a real cluster, so every state the monitor tells apart is listed
+FAILURE_MIX = {"crashloop": 0.1, "image_pull": 0.1, "pending": 0.1, "oom": 0.1,
+               "failed": 0.1, "evicted": 0.1, "restarts": 0.1}
+
+PARSERS = [pytest.param(json.loads, id='json')]
+try:
+    import orjson
+    PARSERS.append(pytest.param(orjson.loads, id='orjson'))
+except ImportError:
+    pass
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = start_server(SyntheticCluster(nodes=10, pods=1000, namespaces=10, failure_mix=FAILURE_MIX))
+    yield server
+    server.shutdown()
+
+
+def fetcher_for(server, raw_pods):
+    configuration = client.Configuration()
+    configuration.host = f"http://127.0.0.1:{server.server_address[1]}"
+    return ResourceFetcher(client.CoreV1Api(client.ApiClient(configuration)), namespaces=[], exclude_namespaces=[],
+                           pod_label_selector='', pod_field_selector='', node_label_selector='', page_size=300,
+                           raw_pods=raw_pods)
+
+
+def records(server, raw_pods):
+    return [PodRecord.from_object(pod) for pod in fetcher_for(server, raw_pods).iter_pods()]
+
+
+def record_fields(record):
+    return (record.key, record.name, record.namespace, record.phase, record.node, record.owner, record.ip,
+            record.containers, record.phase_details, record.summary())
+
+
+def alerts_of(record):
+    candidates, _ = evaluate_pod_record(record, None)
+    return [(candidate.alert_key, candidate.subject, candidate.message, candidate.db_message, candidate.node,
+             candidate.owner) for candidate in candidates]
+
+
+@pytest.mark.parametrize('loads', PARSERS)
+def test_raw_json_records_and_alerts_match_the_models(server, monkeypatch, loads):
+    monkeypatch.setattr(k8s_raw, 'loads', loads)
+    model = records(server, raw_pods=False)
+    raw = records(server, raw_pods=True)
+
+    assert len(model) == 1000
+    assert [record_fields(record) for record in raw] == [record_fields(record) for record in model]
+    assert [alerts_of(record) for record in raw] == [alerts_of(record) for record in model]
+    # The synthetic failures did reach the evaluation
+    assert sum(1 for record in model if alerts_of(record)) > 100
@@ -0,0 +1,74 @@
+import math
+import threading
+
+
+class TimerWheel:
+    """Hashed timing wheel of keys that become due at a point in time
+
+    Timers are bucketed by tick (tick seconds wide) into a fixed ring of
+    slots, so scheduling and cancelling are O(1) and advance() only looks
+    at the slots of the ticks that passed since its last call. A timer
+    further away than one turn of the wheel simply stays in its slot until
+    the wheel reaches its tick. Every key has at most one timer,
+    scheduling it again moves it.
+    """
+
+    def __init__(self, tick=1.0, slots=512):
+        self.tick = tick
+        self._slots = [{} for _ in range(slots)]  # key -> due tick
+        self._timers = {}  # key -> due tick
+        self._current = None  # last tick advance() handled
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._timers)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._timers
+
+    def schedule(self, key, due):
+        """Make key due at the time.time() value due, replacing an earlier timer of the key"""
+        # Rounded up, a timer never fires early
+        tick = math.ceil(due / self.tick)
+        with self._lock:
+            if self._current is not None and tick <= self._current:
+                tick = self._current + 1
+            self._cancel(key)
+            self._timers[key] = tick
+            self._slots[tick % len(self._slots)][key] = tick
+
+    def cancel(self, key):
+        with self._lock:
+            self._cancel(key)
+
+    def _cancel(self, key):
+        tick = self._timers.pop(key, None)
+        if tick is not None:
+            del self._slots[tick % len(self._slots)][key]
+
+    def advance(self, now):
+        """Remove and return the set of keys due at time now"""
+        target = math.floor(now / self.tick)
+        due = set()
+        with self._lock:
+            if self._current is None:
+                self._current = target - 1
+            if target <= self._current:
+                return due
+
+            slot_count = len(self._slots)
+            # More ticks than slots passed: every slot is visited once
+            ticks = range(self._current + 1, target + 1) if target - self._current < slot_count \
+                else range(target - slot_count + 1, target + 1)
+            for tick in ticks:
+                slot = self._slots[tick % slot_count]
+                if not slot:
+                    continue
+                for key in [key for key, key_tick in slot.items() if key_tick <= target]:
+                    del slot[key]
+                    del self._timers[key]
+                    due.add(key)
+            self._current = target
+        return due